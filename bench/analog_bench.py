@@ -0,0 +1,203 @@
+# アナログ読み取り（analog_sensor.py）と2値読み取り（sensor_array.py）の比較
+# 1. 1周期あたりの処理時間[us]（読み取り + PD制御の1ステップ）をオーバーサンプリング回数ごとに比較
+# 2. （PC）線が左右にゆっくり動く擬似センサーで、位置の誤差・D項の揺れを比較
+#
+#   Pico W: sensor_array.py, analog_sensor.py, control.py と一緒に転送して実行
+#           （実機のADCを読む。処理時間のみ）
+#   PC:     python bench/analog_bench.py [--noise 1500] [--ticks 2000]
+import sys
+import time
+
+if sys.implementation.name != "micropython":
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import control
+import sensor_array
+import analog_sensor
+
+SENSOR_PINS = [22, 21, 28, 27, 26, 18, 17, 16]
+WEIGHTS = [-7, -5, -3, -1, 1, 3, 5, 7]
+BASE_SPEED = 8000
+KP = 9000
+KD = 3000
+WHITE = 60000
+BLACK = 20000
+OVERSAMPLES = (1, 4, 8, 16)
+ITERATIONS = 1000
+
+if hasattr(time, "ticks_us"):
+    def now_us():
+        return time.ticks_us()
+
+    def elapsed_us(start):
+        return time.ticks_diff(time.ticks_us(), start)
+else:
+    def now_us():
+        return time.perf_counter_ns() // 1000
+
+    def elapsed_us(start):
+        return now_us() - start
+
+
+class Track:
+    """
+    擬似センサー: 位置 x（重みの単位, 右が正）の線に対する各センサーの ADC 値
+
+    線から幅 width 以内のセンサーは距離に応じて黒に近づき、一様ノイズ ±noise が乗る。
+    """
+
+    def __init__(self, noise, width=1.6, seed=1):
+        self.x = 0.0
+        self.noise = noise
+        self.width = width
+        self.state = seed
+
+    def rand(self):
+        # 線形合同法（実行ごとに同じ結果にするため）
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return self.state / 0x7FFFFFFF
+
+    def adc(self, pin):
+        i = SENSOR_PINS.index(pin)
+        dist = abs(self.x - WEIGHTS[i])
+        dark = max(0.0, 1.0 - dist / self.width)
+        v = WHITE - (WHITE - BLACK) * dark + (self.rand() * 2 - 1) * self.noise
+        return max(0, min(65535, int(v)))
+
+
+class FakeADC:
+    def __init__(self, track, pin):
+        self.track = track
+        self.pin = pin
+
+    def read_u16(self):
+        return self.track.adc(self.pin)
+
+
+class FakePin:
+    """2値入力: ADC 値を 40000（sensor_test.py の閾値）で2値にする"""
+
+    def __init__(self, track, pin):
+        self.track = track
+        self.pin = pin
+
+    def value(self):
+        return 1 if self.track.adc(self.pin) > (WHITE + BLACK) // 2 else 0
+
+
+def make_sensors(track, oversample):
+    if track is None:
+        digital = sensor_array.SensorArray(SENSOR_PINS)
+        analog = analog_sensor.AnalogSensorArray(SENSOR_PINS, WEIGHTS, oversample, WHITE, BLACK)
+        return digital, analog
+    digital = sensor_array.SensorArray(SENSOR_PINS, pin_factory=lambda p: FakePin(track, p), bulk=False)
+    analog = analog_sensor.AnalogSensorArray(
+        SENSOR_PINS, WEIGHTS, oversample, WHITE, BLACK,
+        adc_factory=lambda p: FakeADC(track, p), digital=digital
+    )
+    return digital, analog
+
+
+def make_controller():
+    return control.LineController(BASE_SPEED, KP, KD, WEIGHTS, 0.77, 1.0, 0.3, 10)
+
+
+def time_digital(digital):
+    ctl = make_controller()
+    start = now_us()
+    for _ in range(ITERATIONS):
+        ctl.step(digital.read())
+    return elapsed_us(start) / ITERATIONS
+
+
+def time_analog(analog):
+    ctl = make_controller()
+    start = now_us()
+    for _ in range(ITERATIONS):
+        analog.read()
+        ctl.step_error(analog.error)
+    return elapsed_us(start) / ITERATIONS
+
+
+def sweep(track, read, ticks):
+    """
+    線を ±3 の範囲で正弦波状に動かしながら読み、
+    (位置のRMS誤差, Δerror の揺れ, D項 |KD×Δerror| の最大, 誤差の値の種類数) を返す
+
+    Δerror の揺れは、周期ごとの誤差の変化と真の位置の変化の差のRMS（D項のばたつきの目安）。
+    """
+    import math
+    last = None
+    last_x = 0.0
+    sq = 0.0
+    diff_sq = 0.0
+    kd_max = 0
+    values = set()
+    for t in range(ticks):
+        track.x = 3.0 * math.sin(2 * math.pi * t / 400)
+        e = read()
+        if e is None:
+            e = last if last is not None else 0
+        sq += (e / control.ERROR_DEN + track.x) ** 2   # error は線の位置の符号反転
+        if last is not None:
+            diff_sq += ((e - last) / control.ERROR_DEN + (track.x - last_x)) ** 2
+            kd_max = max(kd_max, abs(KD * (e - last) // control.ERROR_DEN))
+        values.add(e)
+        last = e
+        last_x = track.x
+    return (sq / ticks) ** 0.5, (diff_sq / (ticks - 1)) ** 0.5, kd_max, len(values)
+
+
+def main(noise=1500, ticks=2000):
+    host = sys.implementation.name != "micropython"
+    track = Track(noise) if host else None
+
+    print("=" * 60)
+    print("アナログ読み取りベンチマーク（{}）".format("擬似センサー, ノイズ ±{}".format(noise) if host else "実機ADC"))
+    print("=" * 60)
+    digital, analog = make_sensors(track, 1)
+    print("アナログのチャンネル: センサー {}（GP{}）".format(
+        analog.channels, [SENSOR_PINS[i] for i in analog.channels]))
+    print("処理時間（読み取り + PD 1ステップ, {} 回平均）".format(ITERATIONS))
+    digital_us = time_digital(digital)
+    print("   2値:                    {:>8.2f}us".format(digital_us))
+    for os_n in OVERSAMPLES:
+        _, analog = make_sensors(track, os_n)
+        us = time_analog(analog)
+        print("   アナログ x{:<2}:           {:>8.2f}us（2値の {:.1f} 倍, 1読み取りあたり {:.2f}us）".format(
+            os_n, us, us / digital_us, (us - digital_us) / (os_n * len(analog.channels))))
+
+    if not host:
+        return
+
+    print("線の位置（±3 を {} 周期で往復, 真の位置との比較）".format(400))
+    print("方式              RMS誤差   Δerrorの揺れ   D項最大   誤差の種類")
+    digital, _ = make_sensors(track, 1)
+    ctl = make_controller()
+
+    def read_digital():
+        ctl.step(digital.read())
+        return ctl.error
+    rms, diff, kd_max, kinds = sweep(track, read_digital, ticks)
+    print("2値              {:>7.3f}   {:>12.3f}   {:>7}   {:>8}".format(rms, diff, kd_max, kinds))
+    for os_n in OVERSAMPLES:
+        _, analog = make_sensors(track, os_n)
+
+        def read_analog():
+            analog.read()
+            return analog.error
+        rms, diff, kd_max, kinds = sweep(track, read_analog, ticks)
+        print("アナログ x{:<2}      {:>7.3f}   {:>12.3f}   {:>7}   {:>8}".format(os_n, rms, diff, kd_max, kinds))
+    print("（単位は重み。真の位置の変化は1周期あたり最大 {:.3f}）".format(3.0 * 2 * 3.14159 / 400))
+
+
+if sys.implementation.name == "micropython":
+    main()
+elif __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="アナログ読み取りと2値読み取りの比較")
+    parser.add_argument("--noise", type=int, default=1500, help="ADC値のノイズ幅（±）")
+    parser.add_argument("--ticks", type=int, default=2000, help="線の位置の比較の周期数")
+    args = parser.parse_args()
+    main(args.noise, args.ticks)
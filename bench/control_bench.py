@@ -0,0 +1,85 @@
+# PD制御ステップの等価性確認とベンチマーク
+# LineController（テーブル + 整数演算）と ReferenceController（従来の浮動小数点版）を
+#   1. 全パターン対（直前パターン × 現在パターン = 65536通り）で比較し、最大差を表示
+#   2. 1ステップあたりの処理時間[us]を比較
+# Pico W（MicroPython）とホストPC（CPython）の両方で実行可能
+#
+#   Pico W: control.py と一緒に転送して実行（等価性確認に数十秒かかる）
+#   PC:     python bench/control_bench.py
+import sys
+import time
+
+if sys.implementation.name != "micropython":
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import control
+
+# src/main.py と同じパラメータ
+PARAMS = dict(
+    base_speed=8000, kp=9000, kd=3000,
+    weights=[-7, -5, -3, -1, 1, 3, 5, 7],
+    left_correction=0.77, right_correction=1.0,
+)
+ITERATIONS = 2000
+
+if hasattr(time, "ticks_us"):
+    def now_us():
+        return time.ticks_us()
+
+    def elapsed_us(start):
+        return time.ticks_diff(time.ticks_us(), start)
+else:
+    def now_us():
+        return time.perf_counter_ns() // 1000
+
+    def elapsed_us(start):
+        return now_us() - start
+
+
+def check_equivalence():
+    fast = control.LineController(**PARAMS)
+    ref = control.ReferenceController(**PARAMS)
+    max_turn = max_left = max_right = 0
+    mismatches = 0
+    for prev in range(256):
+        for cur in range(256):
+            # 直前に未検出が続いた場合も含めるため、prev の後に cur を2回与える
+            fast.reset()
+            ref.reset()
+            for mask in (prev, cur, cur):
+                fast.step(mask)
+                ref.step(mask)
+                d_turn = abs(fast.turn - ref.turn)
+                d_left = abs(fast.left - ref.left)
+                d_right = abs(fast.right - ref.right)
+                if d_turn or d_left or d_right:
+                    mismatches += 1
+                max_turn = max(max_turn, d_turn)
+                max_left = max(max_left, d_left)
+                max_right = max(max_right, d_right)
+    return mismatches, max_turn, max_left, max_right
+
+
+def measure(ctl):
+    masks = [0xE7, 0xF3, 0xF9, 0xFC, 0xFE, 0xFF, 0xCF, 0x9F]
+    start = now_us()
+    for i in range(ITERATIONS):
+        ctl.step(masks[i & 7])
+    return elapsed_us(start) / ITERATIONS
+
+
+mismatches, max_turn, max_left, max_right = check_equivalence()
+ref_us = measure(control.ReferenceController(**PARAMS))
+fast_us = measure(control.LineController(**PARAMS))
+
+print("=" * 50)
+print("PD制御ステップ ベンチマーク")
+print("=" * 50)
+print("等価性（65536パターン対 x 3ステップ）")
+print("   不一致ステップ: {}".format(mismatches))
+print("   最大差: turn {} / 左duty {} / 右duty {}".format(max_turn, max_left, max_right))
+print("処理時間（{} 回平均）".format(ITERATIONS))
+print("   浮動小数点版: {:.2f}us".format(ref_us))
+print("   テーブル版:   {:.2f}us".format(fast_us))
+print("   速度比: {:.1f}x".format(ref_us / fast_us))
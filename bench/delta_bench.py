@@ -0,0 +1,161 @@
+# 変化時のみの送信（delta_telemetry.py）のベンチマーク
+# 全周期のフレーム（バッチ送信）と比べた送信サイズ・圧縮率と、エンコード/デコードの処理時間を計測する
+# 記録がなければ擬似走行データ（直線 → カーブ → 直線 ...）を使う
+#
+#   Pico W: telemetry_frame.py, sample_ring.py, delta_telemetry.py, control.py と一緒に転送して実行
+#   PC:     python bench/delta_bench.py [sensors.slog | run.bin] [--hz 100] [--error-step 1]
+#           .slog は tools/replay.py と同じく制御則に流してdutyを求め、
+#           .bin（tools/udp_receiver.py の保存ファイル）はフレームの値をそのまま使う
+import sys
+import time
+
+if sys.implementation.name != "micropython":
+    import os
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(here, "..", "src"))
+    sys.path.insert(0, os.path.join(here, "..", "tools"))
+
+import telemetry_frame
+import sample_ring
+import delta_telemetry
+import control
+
+BASE_SPEED = 8000
+WEIGHTS = [-7, -5, -3, -1, 1, 3, 5, 7]
+
+if hasattr(time, "ticks_us"):
+    def now_us():
+        return time.ticks_us()
+
+    def elapsed_us(start):
+        return time.ticks_diff(time.ticks_us(), start)
+else:
+    def now_us():
+        return time.perf_counter_ns() // 1000
+
+    def elapsed_us(start):
+        return now_us() - start
+
+
+def run_controller(masks, period_ms):
+    """マスクの列を main.py と同じ制御則に通して (時刻, マスク, 左, 右, error × ERROR_SCALE, turn) の列にする"""
+    ctl = control.LineController(BASE_SPEED, 9000, 3000, WEIGHTS, 0.77, 1.0, 0.3, 10)
+    trace = []
+    for i in range(len(masks)):
+        ctl.step(masks[i])
+        trace.append((i * period_ms, masks[i], ctl.left, ctl.right,
+                      int(ctl.error / control.ERROR_DEN * telemetry_frame.ERROR_SCALE), ctl.turn))
+    return trace
+
+
+def make_masks():
+    """擬似走行データ: 直線（数百周期同じパターン）とカーブ（2パターンを行き来）の繰り返し、20秒分"""
+    masks = []
+    for lap in range(4):
+        masks += [0xE7] * 300
+        for i in range(100):
+            masks.append(0xCF if (i // 7) % 2 else 0x9F)
+        masks += [0xE7] * 50
+        for i in range(50):
+            masks.append(0xF3 if (i // 5) % 2 else 0xE7)
+    return masks
+
+
+def load_trace(path, period_ms):
+    """記録ファイルから走行データを読む（PC専用）"""
+    if path.endswith(".slog"):
+        import sensor_log
+        from replay import resample
+        return run_controller([m for _, m in resample(sensor_log.load(path), period_ms)], period_ms)
+    import telemetry_decode
+    with open(path, "rb") as f:
+        frames = telemetry_decode.decode_batch(f.read())
+    return [(d["timestamp"], telemetry_frame.pack_sensors(d["sensors"]),
+             d["motor"]["left_speed"], d["motor"]["right_speed"],
+             int(d["control"]["error"] * telemetry_frame.ERROR_SCALE), d["control"]["turn"]) for d in frames]
+
+
+def main(path=None, hz=100, error_step=1):
+    period_ms = 1000 // hz
+    if path is None:
+        trace = run_controller(make_masks(), period_ms)
+        source = "擬似走行データ"
+    else:
+        trace = load_trace(path, period_ms)
+        source = path
+    n = len(trace)
+
+    # 全周期のフレーム（バッチ送信と同じ）
+    ring = sample_ring.SampleRing(n)
+    start = now_us()
+    for t, mask, left, right, error, turn in trace:
+        ring.push(t, mask, left, right, error, turn, BASE_SPEED)
+    ring_us = elapsed_us(start)
+    frames = bytearray(n * telemetry_frame.FRAME_SIZE)
+    ring.read_into(frames, n)
+
+    # 変化時のみ（全周期を1バッチに収まる大きさのバッファで記録）
+    capacity = min(delta_telemetry.HEADER_SIZE + 0xFFFF,
+                   delta_telemetry.HEADER_SIZE + n * delta_telemetry.MAX_RECORD)
+    capacity = max(capacity, delta_telemetry.HEADER_SIZE + 2 * delta_telemetry.MAX_RECORD)
+    enc = delta_telemetry.DeltaEncoder(capacity, period_ms * 1000, error_step)
+    out = bytearray(capacity)
+    chunks = []
+    start = now_us()
+    for t, mask, left, right, error, turn in trace:
+        enc.push(t, mask, left, right, error, turn, BASE_SPEED)
+        if enc.full:
+            chunks.append(bytes(memoryview(out)[:enc.read_into(out)]))
+    chunks.append(bytes(memoryview(out)[:enc.read_into(out)]))
+    delta_us = elapsed_us(start)
+    delta = b"".join(chunks)
+
+    frames_z = len(sample_ring.compress(frames))
+    delta_z = len(sample_ring.compress(delta))
+
+    print("=" * 60)
+    print("変化時のみの送信ベンチマーク（{}, {} 周期 = {:.1f}s）".format(source, n, n * period_ms / 1000))
+    print("=" * 60)
+    print("方式                      サイズ[byte]   フレーム比")
+    print("フレーム（無圧縮）        {:>12}   {:>8.1f}x".format(len(frames), 1.0))
+    print("フレーム（deflate）       {:>12}   {:>8.1f}x".format(frames_z, len(frames) / frames_z))
+    print("変化時のみ（無圧縮）      {:>12}   {:>8.1f}x".format(len(delta), len(frames) / len(delta)))
+    print("変化時のみ（deflate）     {:>12}   {:>8.1f}x".format(delta_z, len(frames) / delta_z))
+    print("レコード数: {}（1レコード平均 {:.1f} 周期） / 破棄 {}".format(
+        enc.records, n / max(enc.records, 1), enc.dropped))
+    print("エンコード: フレーム {:.2f}us/周期  変化時のみ {:.2f}us/周期".format(ring_us / n, delta_us / n))
+
+    start = now_us()
+    count = 0
+    for _ in delta_telemetry.iter_ticks(delta):
+        count += 1
+    print("デコード（周期ごとに展開）: {:.2f}us/周期".format(elapsed_us(start) / max(count, 1)))
+
+    # 展開結果がフレームと一致するか（error は量子化幅の分だけ丸める）
+    mismatches = 0
+    i = 0
+    fmt = telemetry_frame.FRAME_FORMAT
+    size = telemetry_frame.FRAME_SIZE
+    import struct
+    for seq, ticks, mask, left, right, error, turn, base in delta_telemetry.iter_ticks(delta):
+        f = struct.unpack_from(fmt, frames, i * size)
+        e = f[6] - f[6] % error_step if error_step > 1 else f[6]
+        if (seq, mask, left, right, error, turn, base) != (f[1], f[3], f[4], f[5], e, f[7], f[8]):
+            mismatches += 1
+        i += 1
+    if i != n or mismatches:
+        print("❌ 展開結果がフレームと一致しません（{} / {} 周期, 不一致 {}）".format(i, n, mismatches))
+    else:
+        print("✅ 展開結果はフレームと一致（{} 周期）".format(n))
+
+
+if sys.implementation.name == "micropython":
+    main()
+elif __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="変化時のみの送信のベンチマーク")
+    parser.add_argument("recording", nargs="?", help="センサー記録（.slog）またはフレームの保存ファイル（.bin）")
+    parser.add_argument("--hz", type=int, default=100, help="制御周波数")
+    parser.add_argument("--error-step", type=int, default=1, help="error の量子化幅（1/256単位）")
+    args = parser.parse_args()
+    main(args.recording, args.hz, args.error_step)
@@ -0,0 +1,46 @@
+# デュアルコア実行時のコア0の制御ループ計測（Pico W専用）
+# src/ 内の全ファイルを転送し、config.py で RUNTIME = "dual_core" にしてから実行する。
+# モーターが回るため、車輪を浮かせた状態で実行すること。
+#
+#   1. コア0のみ（通信なし）で DURATION_MS 間、制御ステップを固定レート実行
+#   2. コア1でWiFi接続・テレメトリ送信を動かしながら同じ計測
+# それぞれの周期ジッタ・オーバーラン・デッドライン未達を表示する。
+import time
+import main
+
+DURATION_MS = 20000
+
+
+def measure(label):
+    main.ctl.reset()
+    main.sched.stats.reset()
+    main.sched.run_blocking(DURATION_MS)
+    main.stop_motors()
+    stats = main.sched.stats
+    print("-" * 50)
+    print(label)
+    stats.report()
+    print("   実効レート: {:.1f}Hz".format(stats.count * 1000 / DURATION_MS))
+    print("   最大開始間隔（送信中）: {}us".format(stats.max_gap_flagged))
+
+
+assert main.snap is not None, 'config.py で RUNTIME = "dual_core" にしてください'
+
+print("=" * 50)
+print("デュアルコア ベンチマーク（{}Hz, 各 {}ms）".format(main.CONTROL_HZ, DURATION_MS))
+print("=" * 50)
+
+measure("コア0のみ（テレメトリなし）")
+
+import _thread
+main.init_telemetry()
+_thread.start_new_thread(main.core1_main, ())
+# WiFi接続が終わるまで待ってから計測
+while main.wlan is None or not main.wlan.isconnected():
+    if main.core1_done:
+        break
+    time.sleep_ms(100)
+measure("コア0 + コア1テレメトリ送信")
+print("   送信成功: {} / 失敗: {}".format(main.telemetry_success_count, main.telemetry_fail_count))
+main.stop_core1()
+print("=" * 50)
@@ -0,0 +1,84 @@
+# テレメトリのJSON形式とバイナリフレームの比較ベンチマーク
+# Pico W（MicroPython）とホストPC（CPython）の両方で実行可能
+#
+#   Pico W: telemetry_frame.py と一緒に転送して実行
+#   PC:     python bench/frame_bench.py
+import sys
+import time
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+if sys.implementation.name != "micropython":
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import telemetry_frame
+
+ITERATIONS = 1000
+
+if hasattr(time, "ticks_us"):
+    def now_us():
+        return time.ticks_us()
+
+    def elapsed_us(start):
+        return time.ticks_diff(time.ticks_us(), start)
+else:
+    def now_us():
+        return time.perf_counter_ns() // 1000
+
+    def elapsed_us(start):
+        return now_us() - start
+
+# 代表的なサンプル（src/README.md の例と同じ値）
+SENSORS = [0, 0, 1, 1, 1, 1, 0, 0]
+LEFT, RIGHT = 6160, 8000
+ERROR, TURN, BASE_SPEED = -2.5, 5000, 8000
+
+
+def encode_json():
+    data = {
+        "timestamp": 12345678,
+        "sensors": SENSORS,
+        "motor": {
+            "left_speed": LEFT,
+            "right_speed": RIGHT
+        },
+        "control": {
+            "error": ERROR,
+            "turn": TURN,
+            "base_speed": BASE_SPEED
+        }
+    }
+    return json.dumps(data)
+
+
+buf = bytearray(telemetry_frame.FRAME_SIZE)
+
+
+def encode_binary():
+    mask = telemetry_frame.pack_sensors(SENSORS)
+    return telemetry_frame.encode_into(buf, 0, 1, 12345678, mask, LEFT, RIGHT, ERROR, TURN, BASE_SPEED)
+
+
+def measure(fn):
+    start = now_us()
+    for _ in range(ITERATIONS):
+        fn()
+    return elapsed_us(start) / ITERATIONS
+
+
+json_size = len(encode_json())
+binary_size = encode_binary()
+json_us = measure(encode_json)
+binary_us = measure(encode_binary)
+
+print("=" * 50)
+print("テレメトリ形式ベンチマーク ({} 回平均)".format(ITERATIONS))
+print("=" * 50)
+print("形式      サイズ[byte]  エンコード[us]")
+print("JSON      {:>12}  {:>14.2f}".format(json_size, json_us))
+print("バイナリ  {:>12}  {:>14.2f}".format(binary_size, binary_us))
+print("サイズ比: {:.1f}x  速度比: {:.1f}x".format(json_size / binary_size, json_us / binary_us))
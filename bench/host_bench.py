@@ -0,0 +1,209 @@
+"""
+src/main.py のホスト上ベンチマーク（PC専用）
+
+tools/host の代替モジュール（machine / network / uasyncio など）と仮想時計の上で
+src/main.py を読み込み、次の処理の 1回あたりの実行時間と回/秒、
+1回あたりのメモリ割り当てを計測する。
+
+  control_step   main() ループの1周期（センサー → PD → モーター → 記録）
+  set_motors     補正・クリップ付きのモーター出力
+  send_telemetry テレメトリ1回分の送信（ローカルの代替サーバー宛, JSON / バイナリ）
+  main_loop      run() を仮想時間で動かしたときの制御ステップ数/実時間秒
+                 （タイマー・デバッグ表示・送信タスクを含む）
+
+メモリ割り当ては tracemalloc で測る。「ピーク」は1回の実行中に一時的に確保された
+最大バイト数、「残留」は実行後も解放されずに残ったバイト数（いずれも1回あたり）。
+CPython のオブジェクトモデルでの値なので、実機の数値ではなくコミット間の比較に使う。
+
+使い方:
+    python bench/host_bench.py --json before.json
+    （変更後）
+    python bench/host_bench.py --against before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "tools", "host"))
+
+import hostenv  # noqa: E402
+
+# 制御ステップに与えるセンサーパターン（直線・緩いカーブ・急カーブ・ライン外）
+PATTERNS = [0xE7, 0xE7, 0xF3, 0xCF, 0xF9, 0x9F, 0xFC, 0x3F, 0xFF, 0xE7]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def time_per_call(fn, iterations, repeat):
+    """repeat 回計測した中で最速の1回あたり時間 [s]"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(iterations)
+        elapsed = (time.perf_counter() - start) / iterations
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def alloc_per_call(fn, iterations):
+    """(1回あたりのピーク確保バイト数, 1回あたりの残留バイト数)"""
+    fn(1)
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        peak_sum = 0
+        for _ in range(iterations):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn(1)
+            peak_sum += tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return peak_sum / iterations, retained / iterations
+
+
+def setup():
+    clock = hostenv.install()
+    import config
+    import machine
+    config.API_URL, server = hostenv.serve_http()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+    pins = main.SENSOR_PINS
+    state = {"i": 0}
+
+    def source(pin):
+        if pin == pins[0]:
+            state["i"] = (state["i"] + 1) % len(PATTERNS)
+        return (PATTERNS[state["i"]] >> pins.index(pin)) & 1 if pin in pins else 1
+
+    machine.input_source = source
+    # ネットワークは接続済みにしておく
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.init_telemetry()
+        main.start_network()
+    while not main.wifi_mgr.isconnected():
+        main.wifi_mgr.step()
+        clock.advance(10000)
+    return clock, main, server
+
+
+def make_cases(clock, main):
+    import uasyncio as asyncio
+
+    def control_step(n):
+        step = main.control_step
+        for _ in range(n):
+            step()
+
+    def set_motors(n):
+        fn = main.set_motors
+        for i in range(n):
+            fn(7000 + (i & 1023), 9000 - (i & 1023))
+
+    def send(fmt):
+        async def loop(n):
+            for _ in range(n):
+                await main.send_telemetry()
+
+        def run(n):
+            main.TELEMETRY_FORMAT = fmt
+            asyncio.run(loop(n))
+        return run
+
+    def main_loop(n):
+        # n 回分の制御周期だけ仮想時間を進める
+        before = main.sched.stats.count
+        loop = asyncio.get_event_loop()
+        existing = asyncio.all_tasks(loop)
+        clock.limit_us = clock.us + n * main.sched.period_us
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                asyncio.run(main.run())
+            except KeyboardInterrupt:
+                pass
+        main.sched.stop()
+        # run() が起動したタスク（デバッグ表示・送信）を片付ける
+        started = asyncio.all_tasks(loop) - existing
+        for task in started:
+            task.cancel()
+        if started:
+            loop.run_until_complete(asyncio.gather(*started, return_exceptions=True))
+        return main.sched.stats.count - before
+
+    return [
+        ("control_step", control_step, 20000),
+        ("set_motors", set_motors, 50000),
+        ("send_telemetry[json]", send("json"), 500),
+        ("send_telemetry[binary]", send("binary"), 500),
+        ("main_loop", main_loop, 5000),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="src/main.py のホスト上ベンチマーク")
+    parser.add_argument("--repeat", type=int, default=5, help="時間計測の繰り返し回数（最速を採用）")
+    parser.add_argument("--alloc-iterations", type=int, default=200)
+    parser.add_argument("--json", help="結果をJSONで保存")
+    parser.add_argument("--against", help="以前のJSON結果と比較")
+    args = parser.parse_args()
+
+    clock, target, server = setup()
+    results = {}
+    for name, fn, iterations in make_cases(clock, target):
+        per_call = time_per_call(fn, iterations, args.repeat)
+        peak, retained = alloc_per_call(fn, min(args.alloc_iterations, iterations))
+        results[name] = {
+            "us_per_call": per_call * 1e6,
+            "calls_per_s": 1 / per_call,
+            "alloc_peak_bytes": peak,
+            "alloc_retained_bytes": retained,
+        }
+
+    baseline = None
+    if args.against:
+        with open(args.against) as f:
+            baseline = json.load(f)
+
+    print("=" * 78)
+    print(f"ホスト上ベンチマーク (commit {git_commit()}, Python {platform.python_version()})")
+    print("=" * 78)
+    print(f"{'対象':<24} {'us/回':>9} {'回/秒':>11} {'ピーク[B/回]':>13} {'残留[B/回]':>11}  比較")
+    for name, r in results.items():
+        diff = ""
+        if baseline and name in baseline["results"]:
+            b = baseline["results"][name]
+            diff = f"{(r['us_per_call'] / b['us_per_call'] - 1) * 100:+.1f}% 時間"
+            diff += f", {r['alloc_peak_bytes'] - b['alloc_peak_bytes']:+.0f}B ピーク"
+        print(f"{name:<24} {r['us_per_call']:>9.2f} {r['calls_per_s']:>11.0f}"
+              f" {r['alloc_peak_bytes']:>13.0f} {r['alloc_retained_bytes']:>11.1f}  {diff}")
+    print(f"代替サーバー受信: {server.requests} 件")
+    if baseline:
+        print(f"比較対象: {args.against} (commit {baseline.get('commit', '?')})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"commit": git_commit(), "python": platform.python_version(),
+                       "results": results}, f, indent=2)
+        print(f"結果を保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
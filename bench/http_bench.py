@@ -0,0 +1,148 @@
+"""
+HTTPクライアントのベンチマーク（ホストPC用）
+
+ローカルに立てた代替サーバー（keep-alive・パイプライン対応）に対して、
+以下の3方式で同じ本文をPOSTし、リクエスト/秒と1件あたりのレイテンシを比較する。
+
+  1. async_http.post()            毎回接続（従来の urequests.post 相当）
+  2. async_http.Client.post()     keep-alive で接続を使い回す
+  3. async_http.Client.post_many() keep-alive + パイプライン
+
+使い方:
+    python bench/http_bench.py [--requests 500] [--depth 8] [--close-every 100]
+
+--close-every N を指定すると、サーバーがN件ごとに接続を閉じ、
+Client の自動再接続も計測に含まれる。ローカル接続はTLSを使わないため、
+実機（HTTPS）ではハンドシェイク分だけ 1 と 2/3 の差がさらに大きくなる。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import async_http  # noqa: E402
+
+BODY = (
+    '{"timestamp": 12345678, "sensors": [0, 0, 1, 1, 1, 1, 0, 0], '
+    '"motor": {"left_speed": 6160, "right_speed": 8000}, '
+    '"control": {"error": -2.5, "turn": 5000, "base_speed": 8000}}'
+).encode()
+
+
+class StandInServer:
+    """/api/telemetry の代替。本文を読み捨てて 200 を返す"""
+
+    def __init__(self, close_every=0):
+        self.close_every = close_every
+        self.received = 0
+
+    async def handle(self, reader, writer):
+        served = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line[15:])
+                await reader.readexactly(length)
+                self.received += 1
+                served += 1
+                closing = self.close_every and served >= self.close_every
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n"
+                    + (b"Connection: close\r\n" if closing else b"")
+                    + b"\r\nok"
+                )
+                await writer.drain()
+                if closing:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def run_oneshot(url, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await async_http.post(url, BODY)
+        latencies.append(time.perf_counter() - start)
+    return latencies, count
+
+
+async def run_keepalive(url, count):
+    client = async_http.Client(url)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await client.post(BODY)
+        latencies.append(time.perf_counter() - start)
+    await client.close()
+    return latencies, client.connects
+
+
+async def run_pipelined(url, count, depth):
+    client = async_http.Client(url)
+    latencies = []
+    for _ in range(count // depth):
+        start = time.perf_counter()
+        await client.post_many([BODY] * depth)
+        # パイプライン1回分の時間を件数で割って1件あたりとする
+        latencies.extend([(time.perf_counter() - start) / depth] * depth)
+    await client.close()
+    return latencies, client.connects
+
+
+async def main(args):
+    server = StandInServer(args.close_every)
+    srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    url = "http://127.0.0.1:{}/api/telemetry".format(port)
+
+    cases = [
+        ("毎回接続", run_oneshot(url, args.requests)),
+        ("keep-alive", run_keepalive(url, args.requests)),
+        ("パイプライン(x{})".format(args.depth), run_pipelined(url, args.requests, args.depth)),
+    ]
+
+    print("=" * 64)
+    print("HTTPクライアントベンチマーク（{} 件, 本文 {} バイト）".format(args.requests, len(BODY)))
+    print("=" * 64)
+    print("{:<18}{:>10}{:>12}{:>12}{:>10}".format("方式", "req/s", "平均[ms]", "p99[ms]", "接続数"))
+    for name, coro in cases:
+        start = time.perf_counter()
+        latencies, connects = await coro
+        elapsed = time.perf_counter() - start
+        print("{:<18}{:>10.0f}{:>12.3f}{:>12.3f}{:>10}".format(
+            name,
+            len(latencies) / elapsed,
+            sum(latencies) / len(latencies) * 1000,
+            percentile(latencies, 99) * 1000,
+            connects,
+        ))
+
+    srv.close()
+    await srv.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--close-every", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,174 @@
+"""
+テレメトリ受信サーバーの負荷ベンチマーク（ホストPC用）
+
+tools/ingest_server.py を別プロセスで起動し、複数台の車体を模した
+keep-alive クライアント（src/async_http.Client）から全速でPOSTして、
+持続サンプル/秒と1リクエストあたりのレイテンシ（p50 / p99）を計測する。
+最後に保存された列ファイルの件数が送信数と一致するかを確認する。
+
+  json   send_telemetry() のJSON（1サンプル/リクエスト）
+  binary バイナリフレーム（1サンプル/リクエスト）
+  batch  256フレームをdeflate圧縮したバッチ（256サンプル/リクエスト）
+
+使い方:
+    python bench/ingest_bench.py [--cars 32] [--procs 4] [--seconds 5] [--formats json,binary,batch]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import async_http  # noqa: E402
+import sample_ring  # noqa: E402
+import telemetry_frame  # noqa: E402
+
+SERVER = os.path.join(ROOT, "tools", "ingest_server.py")
+BATCH = 256
+
+JSON_BODY = (
+    '{"timestamp": 12345678, "sensors": [0, 0, 1, 1, 1, 1, 0, 0], '
+    '"motor": {"left_speed": 6160, "right_speed": 8000}, '
+    '"control": {"error": -2.5, "turn": 5000, "base_speed": 8000}}'
+).encode()
+
+
+def make_body(fmt):
+    """(本文, Content-Type, ヘッダー, サンプル数)"""
+    if fmt == "json":
+        return JSON_BODY, "application/json", {}, 1
+    n = 1 if fmt == "binary" else BATCH
+    buf = bytearray(n * telemetry_frame.FRAME_SIZE)
+    for i in range(n):
+        telemetry_frame.encode_into(buf, i * telemetry_frame.FRAME_SIZE, i, i * 10,
+                                    0x3C, 6160, 8000, -2.5, 5000, 8000)
+    if fmt == "binary":
+        return bytes(buf), telemetry_frame.CONTENT_TYPE, {}, 1
+    return sample_ring.compress(buf), telemetry_frame.CONTENT_TYPE, {"Content-Encoding": "deflate"}, n
+
+
+async def run_car(url, car, fmt, deadline, latencies):
+    body, content_type, headers, samples = make_body(fmt)
+    headers = dict(headers, **{"X-Car-Id": "car{}".format(car)})
+    client = async_http.Client(url, timeout=10)
+    sent = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        status = await client.post(body, content_type, headers)
+        latencies.append(time.perf_counter() - start)
+        if status == 200:
+            sent += samples
+    await client.close()
+    return sent
+
+
+def client_process(args):
+    """1プロセス分の車体を asyncio で並行に動かし (送信サンプル数, レイテンシ) を返す"""
+    url, cars, fmt, start_at, seconds = args
+    latencies = []
+
+    async def main():
+        # 全プロセスで開始時刻を揃える
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        deadline = time.perf_counter() + seconds
+        return await asyncio.gather(*(run_car(url, car, fmt, deadline, latencies) for car in cars))
+
+    sent = asyncio.run(main())
+    return sum(sent), latencies
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(directory, port):
+    proc = subprocess.Popen([sys.executable, SERVER, directory, "--host", "127.0.0.1",
+                             "--port", str(port), "--quiet"],
+                            stdout=subprocess.PIPE, text=True)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("サーバーが起動しません")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def bench(fmt, args, pool):
+    import ingest_server
+    directory = tempfile.mkdtemp(prefix="ingest_bench_")
+    port = free_port()
+    proc = start_server(directory, port)
+    url = "http://127.0.0.1:{}/api/telemetry".format(port)
+    try:
+        start_at = time.time() + 0.5
+        jobs = [(url, range(p, args.cars, args.procs), fmt, start_at, args.seconds)
+                for p in range(min(args.procs, args.cars))]
+        sent = 0
+        latencies = []
+        for n, lat in pool.map(client_process, jobs):
+            sent += n
+            latencies.extend(lat)
+    finally:
+        proc.send_signal(signal.SIGINT)
+        final = proc.communicate(timeout=30)[0].strip()
+
+    stored = len(ingest_server.load(directory)["timestamp"])
+    shutil.rmtree(directory)
+    return {
+        "requests": len(latencies),
+        "sent": sent,
+        "stored": stored,
+        "req_s": len(latencies) / args.seconds,
+        "samples_s": sent / args.seconds,
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "server": final,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cars", type=int, default=32, help="同時に送信する車体数（接続数）")
+    parser.add_argument("--procs", type=int, default=min(4, os.cpu_count() or 1),
+                        help="クライアントのプロセス数")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--formats", default="json,binary,batch")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("受信サーバー負荷ベンチマーク（{} 台, クライアント {} プロセス, 各 {:.0f} 秒）".format(
+        args.cars, args.procs, args.seconds))
+    print("=" * 78)
+    print("{:<8}{:>10}{:>14}{:>11}{:>11}{:>12}{:>12}".format(
+        "形式", "req/s", "サンプル/s", "p50[ms]", "p99[ms]", "送信", "保存"))
+    with multiprocessing.Pool(args.procs) as pool:
+        for fmt in args.formats.split(","):
+            r = bench(fmt, args, pool)
+            print("{:<8}{:>10.0f}{:>14.0f}{:>11.2f}{:>11.2f}{:>12}{:>12}{}".format(
+                fmt, r["req_s"], r["samples_s"], r["p50"], r["p99"], r["sent"], r["stored"],
+                "" if r["sent"] == r["stored"] else "  ← 不一致"))
+            if r["server"]:
+                print("    サーバー: " + r["server"].splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# リングバッファ + バッチ送信のベンチマーク
+# 2秒分（200制御周期）のサンプルを記録し、送信サイズとpush()の処理時間を比較する
+# Pico W（MicroPython）とホストPC（CPython）の両方で実行可能
+#
+#   Pico W: telemetry_frame.py, sample_ring.py と一緒に転送して実行
+#   PC:     python bench/ring_bench.py
+import sys
+import time
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+if sys.implementation.name != "micropython":
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import telemetry_frame
+import sample_ring
+
+SAMPLES = 200  # 10ms周期 × 2000ms
+BASE_SPEED = 8000
+WEIGHTS = [-7, -5, -3, -1, 1, 3, 5, 7]
+
+if hasattr(time, "ticks_us"):
+    def now_us():
+        return time.ticks_us()
+
+    def elapsed_us(start):
+        return time.ticks_diff(time.ticks_us(), start)
+else:
+    def now_us():
+        return time.perf_counter_ns() // 1000
+
+    def elapsed_us(start):
+        return now_us() - start
+
+
+def make_trace():
+    """直線 → 緩いカーブ → 直線 の擬似走行データ（main.pyと同じ制御則）"""
+    trace = []
+    last_error = 0
+    for i in range(SAMPLES):
+        if 60 <= i < 140:
+            pattern = (1, 1, 1, 1, 1, 0, 0, 1) if (i // 10) % 2 else (1, 1, 1, 1, 0, 0, 1, 1)
+        else:
+            pattern = (1, 1, 1, 0, 0, 1, 1, 1)
+        detected = [WEIGHTS[k] for k in range(8) if pattern[k] == 0]
+        error = -(sum(detected) / len(detected))
+        turn = int(9000 * error + 3000 * (error - last_error))
+        last_error = error
+        clamped = max(-BASE_SPEED, min(BASE_SPEED, turn))
+        factor = max(0.3, 1.0 - abs(error) / 10)
+        left = int(int((BASE_SPEED - clamped) * factor) * 0.77)
+        right = int((BASE_SPEED + clamped) * factor)
+        trace.append((i * 10, list(pattern), left, right, error, turn))
+    return trace
+
+
+trace = make_trace()
+
+# 従来: 2秒ごとに最新の1サンプルのみJSONで送信
+ticks, sensors, left, right, error, turn = trace[-1]
+json_size = len(json.dumps({
+    "timestamp": ticks,
+    "sensors": sensors,
+    "motor": {"left_speed": left, "right_speed": right},
+    "control": {"error": error, "turn": turn, "base_speed": BASE_SPEED},
+}))
+
+ring = sample_ring.SampleRing(SAMPLES)
+masks = [telemetry_frame.pack_sensors(s[1]) for s in trace]
+start = now_us()
+for k in range(SAMPLES):
+    ticks, _, left, right, error, turn = trace[k]
+    ring.push(ticks, masks[k], left, right, int(error * telemetry_frame.ERROR_SCALE), turn, BASE_SPEED)
+push_us = elapsed_us(start) / SAMPLES
+
+batch = bytearray(SAMPLES * telemetry_frame.FRAME_SIZE)
+n = ring.read_into(batch, SAMPLES)
+raw_size = n * telemetry_frame.FRAME_SIZE
+start = now_us()
+compressed = sample_ring.compress(memoryview(batch)[:raw_size])
+compress_us = elapsed_us(start)
+
+print("=" * 50)
+print("バッチ送信ベンチマーク（2秒 = {} サンプル）".format(SAMPLES))
+print("=" * 50)
+print("方式                 サンプル数  サイズ[byte]")
+print("JSON（最新1件のみ）  {:>10}  {:>12}".format(1, json_size))
+print("バッチ（無圧縮）     {:>10}  {:>12}".format(n, raw_size))
+print("バッチ（deflate）    {:>10}  {:>12}".format(n, len(compressed)))
+print("push(): {:.2f}us/サンプル  圧縮: {}us/バッチ".format(push_us, compress_us))
@@ -0,0 +1,102 @@
+# センサー読み取りの一括読み取り（GPIO_IN）とPinごとの読み取りの比較
+# 1. 両方式の読み取り結果が一致するか確認
+# 2. 1回の読み取り時間[us]を比較
+#
+#   Pico W: sensor_array.py と一緒に転送して実行（実機のピンを読む）
+#   PC:     python bench/sensor_bench.py（偽のレジスタ・ピンで全256パターンを確認）
+import sys
+import time
+
+if sys.implementation.name != "micropython":
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import sensor_array
+
+SENSOR_PINS = [22, 21, 28, 27, 26, 18, 17, 16]
+ITERATIONS = 2000
+
+if hasattr(time, "ticks_us"):
+    def now_us():
+        return time.ticks_us()
+
+    def elapsed_us(start):
+        return time.ticks_diff(time.ticks_us(), start)
+else:
+    def now_us():
+        return time.perf_counter_ns() // 1000
+
+    def elapsed_us(start):
+        return now_us() - start
+
+
+class FakeRegister:
+    """machine.mem32 の代わり（GPIO_IN の値を保持）"""
+
+    def __init__(self):
+        self.gpio_in = 0
+
+    def __getitem__(self, addr):
+        assert addr == sensor_array.GPIO_IN_ADDR
+        return self.gpio_in
+
+
+class FakePin:
+    """machine.Pin の代わり（FakeRegister の該当ビットを返す）"""
+
+    def __init__(self, reg, pin):
+        self.reg = reg
+        self.pin = pin
+
+    def value(self):
+        return (self.reg.gpio_in >> self.pin) & 1
+
+
+def set_pattern(reg, mask):
+    """センサーパターンを GPIO_IN に書き込む（センサー以外のビットは1にしておく）"""
+    value = 0x3FFFFFFF
+    for i, p in enumerate(SENSOR_PINS):
+        if not (mask >> i) & 1:
+            value &= ~(1 << p)
+    reg.gpio_in = value
+
+
+def measure(read):
+    start = now_us()
+    for _ in range(ITERATIONS):
+        read()
+    return elapsed_us(start) / ITERATIONS
+
+
+if sys.platform == "rp2":
+    array = sensor_array.SensorArray(SENSOR_PINS)
+    mismatches = 0
+    for _ in range(ITERATIONS):
+        if array.read_bulk() != array.read_pins():
+            mismatches += 1
+    checked = "実機 {} 回".format(ITERATIONS)
+else:
+    reg = FakeRegister()
+    array = sensor_array.SensorArray(
+        SENSOR_PINS, mem=reg, pin_factory=lambda p: FakePin(reg, p)
+    )
+    mismatches = 0
+    for mask in range(256):
+        set_pattern(reg, mask)
+        if array.read_bulk() != mask or array.read_pins() != mask:
+            mismatches += 1
+    set_pattern(reg, 0xE7)
+    checked = "偽レジスタ 256パターン"
+
+bulk_us = measure(array.read_bulk)
+pins_us = measure(array.read_pins)
+list_us = measure(lambda: [s.value() for s in array.sensors])
+
+print("=" * 50)
+print("センサー読み取りベンチマーク")
+print("=" * 50)
+print("一致確認（{}）: 不一致 {}".format(checked, mismatches))
+print("処理時間（{} 回平均）".format(ITERATIONS))
+print("   GPIO_IN一括:         {:.2f}us".format(bulk_us))
+print("   Pinごと（マスク）:   {:.2f}us".format(pins_us))
+print("   Pinごと（リスト）:   {:.2f}us  ※従来の main.py".format(list_us))
@@ -0,0 +1,106 @@
+# フラッシュスプールのベンチマーク
+# 書き込み・再送（読み出し + commit）のフレーム/秒と、フラッシュ書き込みが
+# 100Hz の制御ループの周期に与える影響（最大実行時間・開始間隔）を計測する
+# Pico W（MicroPython）とホストPC（CPython）の両方で実行可能
+#
+#   Pico W: telemetry_frame.py, spool.py, scheduler.py と一緒に転送して実行
+#           （bench_spool/ ディレクトリを作成・削除する）
+#   PC:     python bench/spool_bench.py（tools/host の代替モジュールを実時間で使用）
+import os
+import sys
+import time
+
+if sys.implementation.name != "micropython":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "host"))
+    import hostenv
+    hostenv.install(virtual=False)
+
+import telemetry_frame
+import spool
+import scheduler
+
+PATH = "bench_spool"
+FRAMES = 4000
+LOOP_MS = 5000
+FRAMES_PER_200MS = 20   # 100Hz の全周期を記録した場合に 200ms ごとに溜まる数
+
+
+def clear():
+    try:
+        for name in os.listdir(PATH):
+            os.remove(PATH + "/" + name)
+        os.rmdir(PATH)
+    except OSError:
+        pass
+
+
+def make_frames(n):
+    buf = bytearray(n * telemetry_frame.FRAME_SIZE)
+    for i in range(n):
+        telemetry_frame.encode_into(buf, i * telemetry_frame.FRAME_SIZE, i & 0xFFFF,
+                                    i * 10, 0xE7, 6160, 8000, 0.5, 100, 8000)
+    return buf
+
+
+def bench_throughput():
+    clear()
+    sp = spool.Spool(PATH, max_bytes=FRAMES * telemetry_frame.FRAME_SIZE * 2)
+    frames = make_frames(FRAMES_PER_200MS)
+    rounds = FRAMES // FRAMES_PER_200MS
+
+    start = time.ticks_us()
+    for _ in range(rounds):
+        sp.write(frames)
+    sp.flush()
+    write_us = time.ticks_diff(time.ticks_us(), start)
+
+    out = bytearray(256 * telemetry_frame.FRAME_SIZE)
+    start = time.ticks_us()
+    drained = 0
+    while True:
+        n = sp.read_into(out)
+        if n == 0:
+            break
+        sp.commit(n)
+        drained += n
+    drain_us = time.ticks_diff(time.ticks_us(), start)
+
+    print("[スループット] {} フレーム".format(sp.written))
+    print("  書き込み: {} フレーム/s（フラッシュ書き込み {} 回, 平均 {}us / 最大 {}us）".format(
+        sp.written * 1000000 // max(write_us, 1), sp.writes,
+        sp.write_us_total // max(sp.writes, 1), sp.write_us_max))
+    print("  再送読み出し: {} フレーム/s（{} フレーム）".format(
+        drained * 1000000 // max(drain_us, 1), drained))
+    clear()
+
+
+def bench_loop(with_spool):
+    clear()
+    sp = spool.Spool(PATH) if with_spool else None
+    frames = make_frames(FRAMES_PER_200MS)
+    count = [0]
+
+    def step():
+        # 制御ステップ相当の軽い処理 + 200ms ごとに溜まった分をスプールへ
+        count[0] += 1
+        if sp is not None and count[0] % 20 == 0:
+            sp.write(frames)
+
+    sched = scheduler.FixedRateScheduler(100, step)
+    sched.run_blocking(LOOP_MS)
+    s = sched.stats
+    label = "スプールあり" if with_spool else "スプールなし"
+    print("[制御ループ 100Hz, {}]".format(label))
+    print("  最大実行時間 {}us / 最大開始間隔 {}us / 最大ジッタ {}us / オーバーラン {}".format(
+        s.max_exec, s.max_gap, s.max_jitter, s.overruns))
+    if sp is not None:
+        print("  フラッシュ書き込み {} 回（最大 {}us）".format(sp.writes, sp.write_us_max))
+    clear()
+
+
+print("=" * 50)
+print("スプール ベンチマーク")
+print("=" * 50)
+bench_throughput()
+bench_loop(False)
+bench_loop(True)
@@ -0,0 +1,139 @@
+from array import array
+
+try:
+    from machine import ADC
+except ImportError:
+    ADC = None
+
+import control
+import sensor_array
+
+# RP2040 で ADC に使えるピン（ADC0〜2。GPIO29 は Pico W では VSYS 測定用）
+ADC_PINS = (26, 27, 28)
+
+SCALE = 1000        # 正規化した黒さ（0 = 白, SCALE = 黒）
+MAX_OVERSAMPLE = 16  # 合計値が small int（30bit）に収まる範囲
+
+
+class AnalogSensorArray:
+    """
+    ADC に接続されたフォトリフレクタをオーバーサンプリングで読み、線の位置を連続値で求める
+
+    センサーのうち ADC 対応ピン（GP26/27/28）のものはアナログで、残りは
+    SensorArray の2値で読む。read() は1周期に1回呼び、
+
+    1. 各アナログチャンネルを oversample 回ずつ順番に読んで合計する（平均化）
+    2. チャンネルごとの白・黒のレベルで 0〜SCALE の「黒さ」に正規化する
+       （noise_floor 未満は0, 2値のセンサーは黒なら SCALE）
+    3. 黒さを重みにした重みの加重平均（重心）を線の位置とし、
+       error（× control.ERROR_DEN の整数, LineController.step_error() 用）に入れる
+
+    黒さの合計が lost_level 未満なら線を見失ったとして error を None にする。
+    戻り値は SensorArray.read() と同じビットマスク（アナログのチャンネルは
+    黒さが SCALE/2 以上なら0 = 黒）で、テレメトリなどはそのまま使える。
+    計算は整数のみで、毎周期のメモリ確保はない。
+
+    adc_factory / digital を渡せばホストPC上で偽のADC・センサーを使える。
+    """
+
+    def __init__(self, pins, weights, oversample=4, white=60000, black=20000,
+                 noise_floor=100, lost_level=300, adc_factory=None, digital=None):
+        if not 1 <= oversample <= MAX_OVERSAMPLE:
+            raise ValueError("oversample は 1〜{} です: {}".format(MAX_OVERSAMPLE, oversample))
+        self.pins = pins
+        self.oversample = oversample
+        self.noise_floor = noise_floor
+        self.lost_level = lost_level
+        # 2値のセンサー（ADC の初期化より先に Pin を設定する）
+        self.digital = digital if digital is not None else sensor_array.SensorArray(pins)
+        if adc_factory is None:
+            adc_factory = ADC
+
+        self.channels = [i for i in range(len(pins)) if pins[i] in ADC_PINS]
+        n = len(self.channels)
+        self.reads = [adc_factory(pins[i]).read_u16 for i in self.channels]
+        self.ch_weight = array("i", [weights[i] for i in self.channels])
+        self.ch_bit = array("i", [1 << i for i in self.channels])
+        analog_bits = 0
+        for i in self.channels:
+            analog_bits |= 1 << i
+        self.analog_bits = analog_bits
+
+        # チャンネルごとの白・黒レベル（合計値のまま比較するため oversample 倍）
+        self.white_sum = array("i", [0] * n)
+        self.span_sum = array("i", [0] * n)
+        for c in range(n):
+            self.set_calibration(c, white, black)
+
+        self.sums = array("i", [0] * n)
+        self.level = array("i", [0] * n)   # 直近の黒さ（noise_floor 適用前）
+
+        # 2値のセンサーの寄与（パターン → Σ重み×SCALE, Σ SCALE）
+        self.num_lut = array("i", [0] * 256)
+        self.den_lut = array("i", [0] * 256)
+        for mask in range(256):
+            num = 0
+            den = 0
+            for i in range(len(pins)):
+                if analog_bits & (1 << i) or (mask >> i) & 1:
+                    continue
+                num += weights[i] * SCALE
+                den += SCALE
+            self.num_lut[mask] = num
+            self.den_lut[mask] = den
+
+        self.error = None   # × ERROR_DEN（None = ライン未検出）
+
+    def set_calibration(self, channel, white, black):
+        """チャンネル（self.channels の順）の白・黒の ADC 値（read_u16）を設定"""
+        os = self.oversample
+        span = white - black
+        if span <= 0:
+            raise ValueError("白の値は黒より大きくしてください: {} / {}".format(white, black))
+        self.white_sum[channel] = white * os
+        self.span_sum[channel] = span * os
+
+    def sample(self):
+        """各チャンネルを oversample 回ずつ読んで sums に合計する"""
+        sums = self.sums
+        reads = self.reads
+        n = len(reads)
+        for c in range(n):
+            sums[c] = 0
+        for _ in range(self.oversample):
+            for c in range(n):
+                sums[c] += reads[c]()
+
+    def read(self):
+        mask = self.digital.read() | self.analog_bits
+        num = self.num_lut[mask]
+        den = self.den_lut[mask]
+
+        self.sample()
+        sums = self.sums
+        white = self.white_sum
+        span = self.span_sum
+        level = self.level
+        weight = self.ch_weight
+        floor = self.noise_floor
+        for c in range(len(sums)):
+            d = (white[c] - sums[c]) * SCALE // span[c]
+            if d < 0:
+                d = 0
+            elif d > SCALE:
+                d = SCALE
+            level[c] = d
+            if d >= SCALE // 2:
+                mask &= ~self.ch_bit[c]
+            if d > floor:
+                d -= floor
+                num += weight[c] * d
+                den += d
+
+        if den < self.lost_level:
+            self.error = None
+        else:
+            # error = -(重心) × ERROR_DEN（ゼロ方向に切り捨て）
+            q = num * control.ERROR_DEN
+            self.error = -(q // den) if q >= 0 else -q // den
+        return mask
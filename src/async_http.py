@@ -0,0 +1,218 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+
+def parse_url(url):
+    """URLを (https?, ホスト, ポート, パス) に分解"""
+    proto, _, rest = url.partition("://")
+    if proto == "https":
+        secure, port = True, 443
+    elif proto == "http":
+        secure, port = False, 80
+    else:
+        raise ValueError("未対応のURL: " + url)
+
+    host, sep, path = rest.partition("/")
+    path = sep + path if sep else "/"
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+    return secure, host, port, path
+
+
+def _format_headers(headers):
+    if not headers:
+        return ""
+    return "".join("{}: {}\r\n".format(k, v) for k, v in headers.items())
+
+
+async def _read_response(reader):
+    """
+    レスポンスを1つ読み、(ステータスコード, 接続を維持できるか) を返す
+
+    ヘッダーと本文は読み捨てる。本文は Content-Length 分、または
+    Transfer-Encoding: chunked を最後のチャンクまで読む。どちらもなければ
+    本文の終わりが分からないため、接続を維持しない（呼び出し側で閉じる）。
+    形式が不正なら ValueError。
+    """
+    line = await reader.readline()
+    if not line:
+        raise OSError("接続が閉じられました")
+    version, status = line.split(None, 2)[:2]
+    status = int(status)
+    keep_alive = version == b"HTTP/1.1"
+
+    length = -1
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise OSError("接続が閉じられました")
+        if line == b"\r\n":
+            break
+        name = line[:line.find(b":")].lower()
+        if name == b"content-length":
+            length = int(line[15:])
+        elif name == b"transfer-encoding":
+            chunked = b"chunked" in line[18:].lower()
+        elif name == b"connection":
+            keep_alive = line[11:].strip().lower() == b"keep-alive"
+
+    if chunked:
+        await _skip_chunked(reader)
+    elif length > 0:
+        await reader.readexactly(length)
+    elif length < 0 and not (100 <= status < 200 or status == 204 or status == 304):
+        # 本文は接続が閉じるまで続く
+        keep_alive = False
+    return status, keep_alive
+
+
+async def _skip_chunked(reader):
+    """chunked の本文（最後の0チャンクとトレーラーまで）を読み捨てる"""
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise OSError("接続が閉じられました")
+        size = int(line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            break
+        await reader.readexactly(size + 2)  # 本文 + CRLF
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise OSError("接続が閉じられました")
+        if line == b"\r\n":
+            return
+
+
+async def _post(url, body, content_type, headers):
+    secure, host, port, path = parse_url(url)
+    reader, writer = await asyncio.open_connection(host, port, ssl=secure or None)
+    try:
+        head = (
+            "POST {} HTTP/1.1\r\n"
+            "Host: {}\r\n"
+            "Content-Type: {}\r\n"
+            "Content-Length: {}\r\n"
+            "{}"
+            "Connection: close\r\n\r\n"
+        ).format(path, host, content_type, len(body), _format_headers(headers))
+        writer.write(head.encode())
+        writer.write(body)
+        await writer.drain()
+        return (await _read_response(reader))[0]
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def post(url, body, content_type="application/json", timeout=5, headers=None):
+    """
+    ノンブロッキングでPOSTを送信し、ステータスコードを返す
+
+    urequests.post と違い、通信待ちの間は他のタスク（制御ループ）に
+    CPUを譲る。timeout秒を超えると asyncio.TimeoutError を送出する。
+    headers には追加のヘッダー（例: Content-Encoding）を dict で渡す。
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    return await asyncio.wait_for(_post(url, body, content_type, headers), timeout)
+
+
+class Client:
+    """
+    1本の接続を使い回す HTTP/1.1 クライアント（keep-alive）
+
+    post() ごとにTCP接続・TLSハンドシェイクをやり直さないため、
+    送信コストとヒープの断片化を抑えられる。サーバーが接続を閉じた
+    場合は、次のリクエストで自動的に再接続する。
+    """
+
+    def __init__(self, url, timeout=5):
+        self.secure, self.host, self.port, self.path = parse_url(url)
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.connects = 0  # 接続（ハンドシェイク）回数
+        self.requests = 0
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.secure or None
+        )
+        self.connects += 1
+
+    async def close(self):
+        """接続を閉じる（次回の送信時に再接続）"""
+        writer = self.writer
+        self.reader = self.writer = None
+        if writer is not None:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def _head(self, body, content_type, headers):
+        return (
+            "POST {} HTTP/1.1\r\n"
+            "Host: {}\r\n"
+            "Content-Type: {}\r\n"
+            "Content-Length: {}\r\n"
+            "{}\r\n"
+        ).format(self.path, self.host, content_type, len(body), _format_headers(headers)).encode()
+
+    async def _exchange(self, bodies, content_type, headers, statuses):
+        # 全リクエストを書き込んでから応答を順に読む（パイプライン）
+        if self.writer is None:
+            await self._connect()
+        writer = self.writer
+        for body in bodies[len(statuses):]:
+            writer.write(self._head(body, content_type, headers))
+            writer.write(body)
+        await writer.drain()
+        while len(statuses) < len(bodies):
+            status, keep_alive = await _read_response(self.reader)
+            statuses.append(status)
+            self.requests += 1
+            if not keep_alive:
+                await self.close()
+                return
+
+    async def post_many(self, bodies, content_type="application/json", headers=None):
+        """
+        複数の本文をパイプラインで送信し、ステータスコードのリストを返す
+
+        途中で接続が切れた場合は、応答を受け取れなかったリクエストだけを
+        新しい接続で送り直す。応答の形式が不正な場合も同じく接続を作り直す。
+        1回の再接続でも失敗したら例外を送出する。
+        """
+        bodies = [b.encode() if isinstance(b, str) else b for b in bodies]
+        statuses = []
+        retried = False
+        while len(statuses) < len(bodies):
+            progress = len(statuses)
+            try:
+                await asyncio.wait_for(
+                    self._exchange(bodies, content_type, headers, statuses),
+                    self.timeout
+                )
+            except (OSError, EOFError, ValueError) as e:
+                # 切断・応答の形式の不正（接続の読み取り位置がずれた）は接続を作り直す
+                await self.close()
+                # 再利用していた接続が閉じられていた場合のみ1回だけ再試行
+                if retried and len(statuses) == progress:
+                    raise e
+                retried = True
+            except asyncio.TimeoutError:
+                await self.close()
+                raise
+        return statuses
+
+    async def post(self, body, content_type="application/json", headers=None):
+        """本文を1つ送信してステータスコードを返す"""
+        return (await self.post_many([body], content_type, headers))[0]
+
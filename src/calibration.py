@@ -0,0 +1,178 @@
+import struct
+from array import array
+
+import control
+
+# 補正値を保存するファイル（フラッシュ）の形式
+# 起動時に毎回読むため、ujson を読み込まずに済む固定長のバイナリにする（スタンドアロン起動でも読む）
+#   ヘッダー: マジック, 版, フラグ, チャンネル数, 左補正, 右補正（× CORRECTION_SCALE）
+#   続けてチャンネルごとに 白, 黒（read_u16() の値）
+CALIBRATION_VERSION = 2
+MAGIC = b"CALB"
+HEADER = "<4sBBBHH"
+HEADER_SIZE = struct.calcsize(HEADER)
+LEVELS = "<HH"
+LEVELS_SIZE = struct.calcsize(LEVELS)
+CORRECTION_SCALE = 10000
+HAS_MOTOR = 1
+HAS_ANALOG = 2
+
+
+class SensorSweep:
+    """
+    その場旋回で線の上を往復しながら、アナログセンサーの白・黒レベルを学習する
+
+    update() に AnalogSensorArray.sample() の合計値を渡すと、チャンネルごとの
+    平均値の最小（黒）・最大（白）を更新する。result() は (白, 黒) のリスト。
+    """
+
+    def __init__(self, channels):
+        self.lo = array("i", [65535] * channels)
+        self.hi = array("i", [0] * channels)
+        self.samples = 0
+
+    def update(self, sums, oversample):
+        lo = self.lo
+        hi = self.hi
+        for c in range(len(lo)):
+            v = sums[c] // oversample
+            if v < lo[c]:
+                lo[c] = v
+            if v > hi[c]:
+                hi[c] = v
+        self.samples += 1
+
+    def result(self, min_span):
+        """
+        チャンネルごとの (白, 黒) を返す
+
+        白と黒の差が min_span 未満のチャンネルがあれば（線の上を通らなかった等）
+        ValueError。
+        """
+        levels = []
+        for c in range(len(self.lo)):
+            if self.hi[c] - self.lo[c] < min_span:
+                raise ValueError("チャンネル {} の白黒の差が小さすぎます: {}〜{}".format(c, self.lo[c], self.hi[c]))
+            levels.append((self.hi[c], self.lo[c]))
+        return levels
+
+
+class BiasEstimator:
+    """
+    直線での誤差の偏りから左右のモーターの出力差を推定する
+
+    左右のモーターに差があると、直線でも PD 制御は一定の turn を出し続けて
+    釣り合う（誤差が片側に偏る）。update() を毎周期呼び、window 周期の間
+    |error| が band 以下だった区間（直線とみなす）の turn を平均して、
+    corrections() でその turn が 0 になる補正係数を求める。
+
+    合計値は small int に収まる範囲（数分の走行）で使う想定。
+    """
+
+    def __init__(self, window=50, band=2 * control.ERROR_DEN):
+        self.window = window
+        self.band = band
+        self.n = 0
+        self.sum = 0
+        self.peak = 0
+        # 直線とみなした区間の合計
+        self.total = 0
+        self.ticks = 0
+        self.windows = 0
+
+    def update(self, error, turn):
+        self.n += 1
+        self.sum += turn
+        if error < 0:
+            error = -error
+        if error > self.peak:
+            self.peak = error
+        if self.n == self.window:
+            if self.peak <= self.band:
+                self.total += self.sum
+                self.ticks += self.n
+                self.windows += 1
+            self.n = 0
+            self.sum = 0
+            self.peak = 0
+
+    def mean_turn(self):
+        return self.total / self.ticks if self.ticks else None
+
+    def corrections(self, base, left, right, min_ticks=500):
+        """
+        現在の補正係数 (left, right) から、直線で turn が 0 になる補正係数を返す
+
+        直線の周期が min_ticks 未満、または turn の平均が BASE_SPEED の半分を超える
+        （直線の判定が怪しい）場合は ValueError。大きいほうの係数は 1.0 にする。
+        """
+        if self.ticks < min_ticks:
+            raise ValueError("直線の区間が足りません: {} 周期".format(self.ticks))
+        t = self.mean_turn()
+        if abs(t) * 2 > base:
+            raise ValueError("turn の偏りが大きすぎます: {:.0f}".format(t))
+        # 直線で釣り合っているとき (base - t) × 左 × kL = (base + t) × 右 × kR
+        # → turn 0 で釣り合う 左 / 右 = (base - t) × 左 / ((base + t) × 右)
+        ratio = (base - t) * left / ((base + t) * right)
+        if ratio <= 1.0:
+            return ratio, 1.0
+        return 1.0, 1.0 / ratio
+
+
+def load(path):
+    """
+    保存した補正値の dict を返す（ファイルがない・壊れている・版が違う場合は None）
+
+    キーは left_correction / right_correction（モーター補正を保存した場合）と
+    analog_white / analog_black（チャンネルごとのリスト, センサーのレベルを保存した場合）。
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    if len(raw) < HEADER_SIZE:
+        return None
+    magic, version, flags, channels, left, right = struct.unpack_from(HEADER, raw)
+    if magic != MAGIC or version != CALIBRATION_VERSION:
+        return None
+    if len(raw) != HEADER_SIZE + channels * LEVELS_SIZE:
+        return None
+    data = {"version": version}
+    if flags & HAS_MOTOR:
+        data["left_correction"] = left / CORRECTION_SCALE
+        data["right_correction"] = right / CORRECTION_SCALE
+    if flags & HAS_ANALOG:
+        white = []
+        black = []
+        for c in range(channels):
+            w, b = struct.unpack_from(LEVELS, raw, HEADER_SIZE + c * LEVELS_SIZE)
+            white.append(w)
+            black.append(b)
+        data["analog_white"] = white
+        data["analog_black"] = black
+    return data
+
+
+def save(path, data):
+    """補正値の dict を保存（既存の値に上書きで合成する）"""
+    merged = load(path) or {}
+    merged.update(data)
+    merged["version"] = CALIBRATION_VERSION
+    flags = 0
+    left = right = 0
+    if "left_correction" in merged:
+        flags |= HAS_MOTOR
+        left = int(round(merged["left_correction"] * CORRECTION_SCALE))
+        right = int(round(merged["right_correction"] * CORRECTION_SCALE))
+    white = merged.get("analog_white", ())
+    black = merged.get("analog_black", ())
+    if white:
+        flags |= HAS_ANALOG
+    raw = bytearray(HEADER_SIZE + len(white) * LEVELS_SIZE)
+    struct.pack_into(HEADER, raw, 0, MAGIC, CALIBRATION_VERSION, flags, len(white), left, right)
+    for c in range(len(white)):
+        struct.pack_into(LEVELS, raw, HEADER_SIZE + c * LEVELS_SIZE, white[c], black[c])
+    with open(path, "wb") as f:
+        f.write(raw)
+    return merged
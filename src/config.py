@@ -6,5 +6,113 @@ PASSWORD = "12345kurisu"
 # Vercel等のデプロイ先URL、またはローカル開発用IP
 # 例: "https://your-project.vercel.app/api/telemetry"
 # 例: "http://192.168.1.10:3000/api/telemetry"
-API_URL = "https://endra-hub.vercel.app/api/telemetry" 
+API_URL = "https://endra-hub.vercel.app/api/telemetry"
 
+# 起動モード
+# "telemetry":  WiFi接続・テレメトリ送信あり
+# "standalone": 通信関係のモジュール（network, ujson, async_http など）を読み込まず、すぐにライントレースを始める
+# "calibrate":  通信なしで、センサーの白・黒レベルとモーター補正を学習してフラッシュに保存（下記）
+BOOT_MODE = "telemetry"
+STANDALONE_PIN = None        # GPIO番号を指定すると、そのピンをGNDに落として起動したときスタンドアロン（ジャンパで切り替え）
+
+# WiFi接続（wifi.py, 起動時に待たずバックグラウンドで接続・切断時は自動再接続）
+WIFI_CONNECT_TIMEOUT_MS = 10000  # 1回の接続試行の上限
+WIFI_BACKOFF_MIN_MS = 1000       # 失敗後の再試行までの待ち（失敗ごとに2倍）
+WIFI_BACKOFF_MAX_MS = 30000      # 待ちの上限
+
+# テレメトリ形式
+# "json":   従来のJSON（Webダッシュボード互換）
+# "binary": 18バイトの固定長フレーム（telemetry_frame.py, デコードは tools/telemetry_decode.py）
+# "batch":  全制御周期のフレームをリングバッファに記録し、まとめて送信
+# "delta":  全制御周期のうち状態が変わったときだけ記録し、まとめて送信（delta_telemetry.py）
+TELEMETRY_FORMAT = "json"
+
+# バッチ送信設定（TELEMETRY_FORMAT = "batch" のとき）
+RING_CAPACITY = 512            # リングバッファのサンプル数（18バイト/サンプル）
+RING_OVERFLOW = "drop_oldest"  # 満杯時: "drop_oldest"（古い順に上書き）または "decimate"（間引き）
+TELEMETRY_BATCH_SIZE = 256     # 1回のPOSTで送る最大サンプル数
+TELEMETRY_COMPRESS = True      # deflate圧縮して送信
+TELEMETRY_PIPELINE_DEPTH = 2   # 溜まっている場合に1回でパイプライン送信する最大バッチ数
+
+# 送信間隔・バッチサイズの自動調整（telemetry_rate.py）
+# 送信の所要時間・失敗率・gc.mem_free() を見て、下の範囲内で送信間隔とバッチサイズを変える
+# False なら従来どおり 2000ms ごと（下限 200ms はバイナリ・バッチ形式向け。JSON/HTTPS では 2000 程度に）
+TELEMETRY_ADAPTIVE = False
+TELEMETRY_INTERVAL_MIN_MS = 200    # 送信間隔の下限
+TELEMETRY_INTERVAL_MAX_MS = 10000  # 送信間隔の上限（失敗が続いたとき）
+TELEMETRY_BATCH_MIN = 32           # バッチサイズの下限（上限は TELEMETRY_BATCH_SIZE）
+TELEMETRY_HEAP_LOW = 32768         # 空きヒープがこれ未満なら間隔を延ばしバッチを減らす
+TELEMETRY_BUSY_PERCENT = 50        # 送信の所要時間が送信間隔のこの割合を超えたら間隔を延ばす
+
+# 変化時のみの送信設定（TELEMETRY_FORMAT = "delta" のとき, 圧縮は TELEMETRY_COMPRESS に従う）
+DELTA_BUFFER_BYTES = 4096      # 1回の送信までに記録できるバイト数（満杯後の周期は捨てる）
+DELTA_ERROR_STEP = 1           # error の量子化幅（1/256単位, 大きくすると細かい揺れを記録しない）
+
+# WiFi切断中のテレメトリ保存（spool.py, フラッシュのファイルに溜めて再接続後に再送）
+# TELEMETRY_FORMAT が "binary" / "batch" / "delta" のときだけ使う（再送はバイナリフレームのバッチのため）
+SPOOL_ENABLED = True
+SPOOL_MAX_BYTES = 131072       # スプール全体の上限（超えたら古いファイルから削除）
+SPOOL_DRAIN_BATCHES = 4        # 再接続後、送信周期ごとに再送する最大バッチ数
+
+# テレメトリ送信方式
+# "http": API_URL にPOST（TELEMETRY_FORMAT に従う）
+# "udp":  バイナリフレームを UDP_HOST:UDP_PORT に送りっぱなし（受信は tools/udp_receiver.py）
+TELEMETRY_TRANSPORT = "http"
+UDP_HOST = "172.20.10.2"   # テザリング網内の受信PCのIP
+UDP_PORT = 5005
+UDP_INTERVAL_MS = 0        # 0 = 毎制御周期（10ms）送信
+
+# センサー読み取り方式
+# "digital": 8個を2値（GPIO）で読み、黒のセンサーの重みの平均を誤差にする
+# "analog":  ADC対応ピン（GP26/27/28）のセンサーをオーバーサンプリングして読み、
+#            黒さで重み付けした重心を誤差にする（analog_sensor.py, 残りのセンサーは2値）
+SENSOR_MODE = "digital"
+ANALOG_OVERSAMPLE = 4        # 1周期あたりのチャンネルごとの読み取り回数（1〜16, 擬似センサーでは回数による精度の差なし）
+ANALOG_WHITE = 60000         # 白（床）の read_u16() 値
+ANALOG_BLACK = 20000         # 黒（ライン）の read_u16() 値
+ANALOG_NOISE_FLOOR = 100     # 黒さ（0〜1000）がこれ以下のチャンネルは重心に含めない
+ANALOG_LOST_LEVEL = 300      # 黒さの合計がこれ未満ならライン未検出
+
+# キャリブレーション（calibration.py, BOOT_MODE = "calibrate" のとき）
+# 1. 線の中央でその場旋回してアナログセンサーの白・黒レベルを学習（SENSOR_MODE = "analog" のとき）
+# 2. CALIBRATE_RUN_MS の間ライントレースし、直線での turn の偏りから左右のモーター補正を推定
+# 結果は CALIBRATION_FILE に保存し、以降の起動時に設定値の代わりに使う
+USE_CALIBRATION = True         # False なら保存済みの補正値を使わない
+CALIBRATION_FILE = "calib.bin" # 固定長のバイナリ（calibration.py, 起動時に ujson を読み込まない）
+CALIBRATE_SPIN_DUTY = 20000    # その場旋回のduty
+CALIBRATE_SWEEP_MS = 1200      # 片側へ旋回する時間（右 → 左 → 右で合計 2倍）
+CALIBRATE_MIN_SPAN = 8000      # 白と黒の read_u16() 値の差がこれ未満なら学習失敗
+CALIBRATE_RUN_MS = 20000       # 学習走行の時間（直線を含むコースで）
+CALIBRATE_WINDOW = 50          # この周期数の間 |error| が小さければ直線とみなす
+CALIBRATE_STRAIGHT_BAND = 2    # 直線とみなす |error| の上限（重みの単位）
+CALIBRATE_MIN_TICKS = 500      # 直線とみなした周期がこれ未満なら推定しない
+
+# 制御周期
+CONTROL_HZ = 100             # 制御レート（例: 100, 200, 500, 1000）
+CONTROL_SCHEDULER = "timer"  # "timer"（machine.Timer + ソフトIRQ）または "asyncio"
+
+# GC（idle_gc.py）
+# "auto": MicroPython の自動GC + テレメトリ送信後に回収（既定）
+# "idle": 自動GCを止め、制御ステップ直後の空き時間にだけ回収（シングルコア時, ヒープ不足で MemoryError になりうる）
+GC_MODE = "auto"
+GC_THRESHOLD = 8192          # 前回の回収からこのバイト数を確保したら回収する
+GC_MARGIN_US = 500           # 次の制御ステップまでに「直近の回収時間 + これ」が残っているときだけ回収
+
+# ログ（ring_log.py, デバッグ表示・送信結果などの表示）
+# print() の代わりにリングバッファへ書き、制御ステップの合間の空き時間にだけ USB シリアルへ出力する
+LOG_LEVEL = "debug"          # "debug"（センサー状態の表示を含む）/ "info" / "warn" / "error" / "off"
+LOG_BUFFER_BYTES = 2048      # 未出力のログを溜めるバイト数（超えたメッセージは捨てる）
+LOG_RATE_PER_S = 20          # 1秒あたりの最大メッセージ数（超えたものは捨てる）
+LOG_BURST = 10               # 連続して書ける最大メッセージ数
+LOG_DRAIN_BYTES = 64         # 1回に出力する最大バイト数（USB-CDC の送信バッファ以内）
+LOG_SLACK_US = 2000          # 次の制御ステップまでこれ以上あるときだけ出力
+
+# 実行モード
+# "single":    1コアで制御・通信を実行
+# "dual_core": コア0は制御のみ（CONTROL_SCHEDULER は使わずus単位のループで実行）、
+#              コア1がWiFi接続・テレメトリ送信・デバッグ表示を担当
+RUNTIME = "single"
+
+# プロファイラ
+PROFILE = True             # ステージ別処理時間を計測（統計情報・JSONテレメトリに要約を含める）
+PROFILE_TRACE_SPANS = 0    # > 0 なら直近のスパンをこの件数保存し、終了時に trace.csv へ書き出す
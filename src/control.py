@@ -0,0 +1,190 @@
+# ライントレースのPD制御則
+#
+# LineController は main() の制御則を、センサーパターン（256通り）ごとの
+# 事前計算テーブルと整数演算だけで実行する。誤差は ERROR_DEN 倍した整数
+# （1〜8個の重み付け平均を割り切れる値）で扱うため、浮動小数点の丸めが入らない。
+# ReferenceController は従来の浮動小数点版そのままで、等価性の確認に使う。
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+from array import array
+
+SENSOR_COUNT = const(8)
+LOST_MASK = const(0xFF)     # 全センサー白（ライン未検出）
+ERROR_DEN = const(840)      # 1〜8の最小公倍数
+CORRECTION_DEN = const(1000)
+PWM_MAX = const(65535)
+
+
+def pattern_error(mask, weights):
+    """パターンに対する誤差（× ERROR_DEN の整数）。未検出なら None"""
+    total = 0
+    count = 0
+    for i in range(SENSOR_COUNT):
+        if not (mask >> i) & 1:  # 0 = 黒（ライン検出）
+            total += weights[i]
+            count += 1
+    if count == 0:
+        return None
+    return -(total * ERROR_DEN // count)
+
+
+class LineController:
+    """
+    テーブル駆動・整数演算のPD制御
+
+    step(mask) は センサービットマスク（bit i = センサー i の値）を受け取り、
+    補正・クリップ済みのモーターdutyを left / right に設定する。
+    戻り値を返さないのはタプル確保を避けるため。
+
+    ReferenceController との差: 浮動小数点版は KP*error などで丸め誤差が
+    出るため、turn と各dutyが最大 ±1 ずれることがある
+    （bench/control_bench.py で全パターン対を確認）。
+    """
+
+    def __init__(self, base_speed, kp, kd, weights,
+                 left_correction=1.0, right_correction=1.0,
+                 min_speed_factor=0.3, slowdown=10):
+        self.base = int(base_speed)
+        self.kp = int(kp)
+        self.kd = int(kd)
+        self.left_corr = int(round(left_correction * CORRECTION_DEN))
+        self.right_corr = int(round(right_correction * CORRECTION_DEN))
+
+        # speed_factor = max(min, 1 - |error|/slowdown) を sf / sf_den で表す
+        self.sf_den = int(round(slowdown * ERROR_DEN))
+        sf_min = int(round(min_speed_factor * self.sf_den))
+        self.sf_min = sf_min
+
+        self.err_lut = array("h", [0] * 256)
+        self.sf_lut = array("H", [0] * 256)
+        for mask in range(256):
+            e = pattern_error(mask, weights)
+            if e is None:
+                e = 0
+            self.err_lut[mask] = e
+            self.sf_lut[mask] = max(sf_min, self.sf_den - abs(e))
+
+        self.reset()
+
+    def reset(self):
+        self.last_error = 0
+        self.last_sf = self.sf_den
+        self.error = 0   # × ERROR_DEN
+        self.turn = 0    # クリップ前
+        self.left = 0
+        self.right = 0
+
+    def step(self, mask):
+        last = self.last_error
+        if mask == LOST_MASK:
+            # ライン未検出: 前回の誤差を維持
+            e = last
+            sf = self.last_sf
+        else:
+            e = self.err_lut[mask]
+            sf = self.sf_lut[mask]
+            self.last_sf = sf
+
+        self._apply(e, last, sf)
+
+    def step_error(self, e):
+        """
+        誤差（× ERROR_DEN の整数）から1ステップ（アナログセンサー用, analog_sensor.py）
+
+        step() の表引きの代わりに連続値の誤差を受け取る。e が None なら
+        ライン未検出として前回の誤差を維持する。減速率は表と同じ式で計算する。
+        """
+        last = self.last_error
+        if e is None:
+            e = last
+            sf = self.last_sf
+        else:
+            sf = self.sf_den - (e if e >= 0 else -e)
+            if sf < self.sf_min:
+                sf = self.sf_min
+            self.last_sf = sf
+
+        self._apply(e, last, sf)
+
+    def _apply(self, e, last, sf):
+        # step() / step_error() 共通: PD → クリップ → 減速・補正したモーターduty
+        num = self.kp * e + self.kd * (e - last)
+        # int() と同じくゼロ方向に切り捨て
+        if num >= 0:
+            turn = num // ERROR_DEN
+        else:
+            turn = -(-num // ERROR_DEN)
+        self.last_error = e
+        self.error = e
+        self.turn = turn
+
+        base = self.base
+        if turn > base:
+            turn = base
+        elif turn < -base:
+            turn = -base
+
+        sf_den = self.sf_den
+        left = (base - turn) * sf // sf_den * self.left_corr // CORRECTION_DEN
+        right = (base + turn) * sf // sf_den * self.right_corr // CORRECTION_DEN
+        self.left = left if left < PWM_MAX else PWM_MAX
+        self.right = right if right < PWM_MAX else PWM_MAX
+
+
+class ReferenceController:
+    """main() の従来の浮動小数点版制御則（等価性確認用）"""
+
+    def __init__(self, base_speed, kp, kd, weights,
+                 left_correction=1.0, right_correction=1.0,
+                 min_speed_factor=0.3, slowdown=10):
+        self.base = base_speed
+        self.kp = kp
+        self.kd = kd
+        self.weights = weights
+        self.left_correction = left_correction
+        self.right_correction = right_correction
+        self.min_speed_factor = min_speed_factor
+        self.slowdown = slowdown
+        self.reset()
+
+    def reset(self):
+        self.last_error = 0
+        self.error = 0
+        self.turn = 0
+        self.left = 0
+        self.right = 0
+
+    def step(self, mask):
+        detected_count = 0
+        weighted_sum = 0.0
+        for i in range(SENSOR_COUNT):
+            if not (mask >> i) & 1:
+                weighted_sum += self.weights[i]
+                detected_count += 1
+
+        if detected_count == 0:
+            error = self.last_error
+        else:
+            error = -(weighted_sum / detected_count)
+
+        error_diff = error - self.last_error
+        turn = int(self.kp * error + self.kd * error_diff)
+        self.last_error = error
+        self.error = error
+        self.turn = turn
+
+        turn = max(-self.base, min(self.base, turn))
+
+        speed_factor = max(self.min_speed_factor, 1.0 - abs(error) / self.slowdown)
+        left_speed = int((self.base - turn) * speed_factor)
+        right_speed = int((self.base + turn) * speed_factor)
+
+        # set_motors() の補正とクリップ
+        left = int(left_speed * self.left_correction)
+        right = int(right_speed * self.right_correction)
+        self.left = max(0, min(PWM_MAX, left))
+        self.right = max(0, min(PWM_MAX, right))
@@ -0,0 +1,295 @@
+import struct
+import _thread
+import telemetry_frame
+
+# 変化時のみ記録するテレメトリ（リトルエンディアン）
+#
+# 直線ではセンサーパターンとdutyが数百周期変わらないため、毎周期の
+# フレームの代わりに「状態 + その状態が続いた周期数」を1レコードとして記録する。
+#
+#   ヘッダ（14バイト, read_into() 1回分ごと）
+#   0   u8   フォーマットバージョン（DELTA_VERSION, フレームの FRAME_VERSION と区別）
+#   1   u16  最初の周期のシーケンス番号
+#   3   u32  最初の周期の time.ticks_ms()
+#   7   u16  BASE_SPEED
+#   9   u16  制御周期[us]
+#   11  u16  以降のレコード部のバイト数
+#   13  u8   予約（0）
+#
+#   レコード（可変長, 前のレコードから変わった項目のみ）
+#   u8   変化フラグ（F_MASK | F_LEFT | F_RIGHT | F_ERROR | F_TURN, ヘッダ直後は全項目）
+#   u8   センサー値のビットマスク  （F_MASK のとき）
+#   u16  左モーターduty          （F_LEFT のとき）
+#   u16  右モーターduty          （F_RIGHT のとき）
+#   i16  error × ERROR_SCALE     （F_ERROR のとき, ERROR_STEP 単位に量子化）
+#   i16  turn >> TURN_SHIFT      （F_TURN のとき）
+#   可変長整数（7bitずつ, 下位から）  この状態が続いた周期数
+#
+# 各周期の時刻は ヘッダの時刻 + 周期番号 × 制御周期 として復元する（ジッタは失われる）。
+# 同じバッチ内で周期の欠けはなく、記録できなかった周期は次のヘッダのシーケンス番号の差で分かる。
+DELTA_VERSION = 2
+HEADER_FORMAT = "<BHIHHHB"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+F_MASK = 0x01
+F_LEFT = 0x02
+F_RIGHT = 0x04
+F_ERROR = 0x08
+F_TURN = 0x10
+F_ALL = 0x1F
+
+MAX_RUN = 0x1FFFFF                # 周期数は3バイトまで（100Hzで約5.8時間）
+MAX_RECORD = 1 + 1 + 2 * 4 + 3    # 全項目 + 周期数3バイト
+
+ERROR_SCALE = telemetry_frame.ERROR_SCALE
+TURN_SHIFT = telemetry_frame.TURN_SHIFT
+
+CONTENT_TYPE = "application/x-telemetry-delta"
+
+
+def _clamp_i16(v):
+    if v > 32767:
+        return 32767
+    if v < -32768:
+        return -32768
+    return v
+
+
+class DeltaEncoder:
+    """
+    制御ループの状態を変化時のみバッファに記録する
+
+    push() は毎周期呼び、状態（マスク・duty・量子化したerror・turn）が前の周期と
+    同じなら周期数を数えるだけで何も書かない。変化したときに、それまで続いた
+    状態を1レコードとして起動時に確保した bytearray に書き込む。
+    error は error_step（× 1/ERROR_SCALE）単位に切り捨ててから比較するため、
+    error_step を大きくすると細かい揺れでレコードが増えなくなる。
+
+    read_into() は続いている状態も含めて閉じ、ヘッダ付きの1バッチとして取り出す。
+    SampleRing と同じく push() はロックを待たず、取れなければその周期を捨てる
+    （捨てた周期は次のバッチのシーケンス番号の差として現れる）。
+    バッファが一杯になった後の周期も read_into() まで捨てて dropped に数える。
+    """
+
+    def __init__(self, capacity, period_us, error_step=1):
+        if capacity < HEADER_SIZE + 2 * MAX_RECORD or capacity > HEADER_SIZE + 0xFFFF:
+            raise ValueError("バッファサイズが範囲外です: {}".format(capacity))
+        self.capacity = capacity
+        self.period_us = period_us
+        self.error_step = error_step
+        self.buf = bytearray(capacity)
+        self.mv = memoryview(self.buf)
+        self.n = 0          # 書き込み済みバイト数（0 = バッチ未開始）
+        self.seq = 0
+        self.full = False
+        # 続いている状態
+        self.run = 0
+        self.mask = 0
+        self.left = 0
+        self.right = 0
+        self.error = 0
+        self.turn = 0
+        # 最後に書いたレコードの状態（変化フラグ用）
+        self.flags = F_ALL
+        self.w_mask = 0
+        self.w_left = 0
+        self.w_right = 0
+        self.w_error = 0
+        self.w_turn = 0
+        # 統計
+        self.ticks = 0      # 記録した周期数
+        self.records = 0
+        self.bytes = 0      # 取り出したバイト数（ヘッダ込み）
+        self.ticks_out = 0  # 取り出した周期数
+        self.dropped = 0
+        self.lock = _thread.allocate_lock()
+
+    def push(self, ticks, sensor_mask, left, right, error_q, turn, base_speed):
+        """1制御周期分の状態を追加（error_q は error × ERROR_SCALE の整数）"""
+        seq = self.seq
+        self.seq = (seq + 1) & 0xFFFF
+
+        if not self.lock.acquire(0):
+            self.dropped += 1
+            return
+
+        e = _clamp_i16(error_q)
+        if self.error_step > 1:
+            e -= e % self.error_step
+        tq = _clamp_i16(turn >> TURN_SHIFT)
+
+        if self.n == 0:
+            struct.pack_into(HEADER_FORMAT, self.buf, 0, DELTA_VERSION, seq,
+                             ticks & 0xFFFFFFFF, base_speed, self.period_us, 0, 0)
+            self.n = HEADER_SIZE
+            self.flags = F_ALL
+        elif self.full:
+            self.dropped += 1
+            self.lock.release()
+            return
+        elif (sensor_mask == self.mask and left == self.left and right == self.right
+              and e == self.error and tq == self.turn and self.run < MAX_RUN):
+            self.run += 1
+            self.ticks += 1
+            self.lock.release()
+            return
+        else:
+            self._write_run()
+            # 次の状態を閉じるレコードの分が残っていなければ以降は捨てる
+            if self.capacity - self.n < MAX_RECORD:
+                self.full = True
+                self.dropped += 1
+                self.lock.release()
+                return
+
+        self.mask = sensor_mask
+        self.left = left
+        self.right = right
+        self.error = e
+        self.turn = tq
+        self.run = 1
+        self.ticks += 1
+        self.lock.release()
+
+    def _write_run(self):
+        # 続いていた状態を1レコードとして書く（呼び出し側で空きを確保済み）
+        buf = self.buf
+        i = self.n
+        flags = self.flags
+        if self.mask != self.w_mask:
+            flags |= F_MASK
+        if self.left != self.w_left:
+            flags |= F_LEFT
+        if self.right != self.w_right:
+            flags |= F_RIGHT
+        if self.error != self.w_error:
+            flags |= F_ERROR
+        if self.turn != self.w_turn:
+            flags |= F_TURN
+        buf[i] = flags
+        i += 1
+        if flags & F_MASK:
+            buf[i] = self.mask
+            i += 1
+        if flags & F_LEFT:
+            v = self.left
+            buf[i] = v & 0xFF
+            buf[i + 1] = (v >> 8) & 0xFF
+            i += 2
+        if flags & F_RIGHT:
+            v = self.right
+            buf[i] = v & 0xFF
+            buf[i + 1] = (v >> 8) & 0xFF
+            i += 2
+        if flags & F_ERROR:
+            v = self.error
+            buf[i] = v & 0xFF
+            buf[i + 1] = (v >> 8) & 0xFF
+            i += 2
+        if flags & F_TURN:
+            v = self.turn
+            buf[i] = v & 0xFF
+            buf[i + 1] = (v >> 8) & 0xFF
+            i += 2
+        v = self.run
+        while v > 0x7F:
+            buf[i] = (v & 0x7F) | 0x80
+            v >>= 7
+            i += 1
+        buf[i] = v
+        self.n = i + 1
+        self.run = 0
+        self.flags = 0
+        self.w_mask = self.mask
+        self.w_left = self.left
+        self.w_right = self.right
+        self.w_error = self.error
+        self.w_turn = self.turn
+        self.records += 1
+
+    def read_into(self, out):
+        """
+        記録中のバッチを閉じて out にコピーし、コピーしたバイト数を返す
+
+        out は capacity バイト以上であること。記録がなければ 0 を返す。
+        """
+        with self.lock:
+            n = self.n
+            if n == 0:
+                return 0
+            if self.run:
+                self._write_run()
+            n = self.n
+            struct.pack_into("<H", self.buf, 11, n - HEADER_SIZE)
+            out[0:n] = self.mv[0:n]
+            self.bytes += n
+            self.ticks_out = self.ticks
+            self.n = 0
+            self.full = False
+            return n
+
+
+def iter_runs(data):
+    """
+    バッチ（連結可）から状態ごとに
+    (バッチ先頭のシーケンス番号, バッチ先頭の時刻[ms], バッチ内の周期番号, 周期数,
+     マスク, 左duty, 右duty, error量子化値, turn量子化値, BASE_SPEED, 制御周期[us])
+    を順に返す
+    """
+    pos = 0
+    end = len(data)
+    while pos < end:
+        if end - pos < HEADER_SIZE:
+            raise ValueError("ヘッダが途中で切れています")
+        version, seq, t0, base, period_us, length, _ = struct.unpack_from(HEADER_FORMAT, data, pos)
+        if version != DELTA_VERSION:
+            raise ValueError("未対応のバージョン: {}".format(version))
+        pos += HEADER_SIZE
+        stop = pos + length
+        if stop > end:
+            raise ValueError("レコード部が途中で切れています")
+        k = 0
+        mask = left = right = error = turn = 0
+        while pos < stop:
+            flags = data[pos]
+            pos += 1
+            if flags & F_MASK:
+                mask = data[pos]
+                pos += 1
+            if flags & F_LEFT:
+                left = data[pos] | data[pos + 1] << 8
+                pos += 2
+            if flags & F_RIGHT:
+                right = data[pos] | data[pos + 1] << 8
+                pos += 2
+            if flags & F_ERROR:
+                error = struct.unpack_from("<h", data, pos)[0]
+                pos += 2
+            if flags & F_TURN:
+                turn = struct.unpack_from("<h", data, pos)[0]
+                pos += 2
+            run = 0
+            shift = 0
+            while True:
+                b = data[pos]
+                pos += 1
+                run |= (b & 0x7F) << shift
+                shift += 7
+                if not b & 0x80:
+                    break
+            if pos > stop:
+                raise ValueError("レコードが途中で切れています")
+            yield seq, t0, k, run, mask, left, right, error, turn, base, period_us
+            k += run
+
+
+def iter_ticks(data):
+    """
+    バッチ（連結可）を周期ごとに展開し、フレームと同じ並び
+    (シーケンス番号, 時刻[ms], マスク, 左duty, 右duty, error量子化値, turn量子化値, BASE_SPEED)
+    で返す
+    """
+    for seq, t0, k0, run, mask, left, right, error, turn, base, period_us in iter_runs(data):
+        for k in range(k0, k0 + run):
+            yield ((seq + k) & 0xFFFF, (t0 + k * period_us // 1000) & 0xFFFFFFFF,
+                   mask, left, right, error, turn, base)
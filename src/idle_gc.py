@@ -0,0 +1,83 @@
+import gc
+import time
+
+
+class IdleCollector:
+    """
+    GC を制御ステップ直後の空き時間だけで実行する
+
+    enable() で自動GCを止め（gc.disable()）、FixedRateScheduler から毎ステップ後に
+    after_step() を呼ぶ。前回の回収から threshold バイト以上確保されていて、
+    次のステップまでの残り時間に直近の回収時間 + margin_us が収まるときだけ
+    gc.collect() する。収まらない周期が force_after 回続いたら、その周期を
+    犠牲にして回収する。
+
+    gc.disable() 中の MicroPython はヒープが尽きても回収せず、確保した側で
+    MemoryError を送出する。制御ステップはメモリを確保しないが、送信側の大きな
+    確保（TLS・JSON化・圧縮）は MemoryError を捕まえて collect() してからやり直す
+    （main.alloc_retry()）。
+
+    collect() は自動GCのままでも使え、どちらの場合も停止時間の最大・平均を記録する。
+    """
+
+    def __init__(self, period_us, threshold=8192, margin_us=500, force_after=100):
+        self.period_us = period_us
+        self.threshold = threshold
+        self.margin_us = margin_us
+        self.force_after = force_after
+        self.enabled = False
+        self.base = gc.mem_alloc()
+        self.estimate_us = 0   # 直近の回収時間（空き時間の判定に使う）
+        self.waiting = 0       # 空き時間が足りずに見送った連続周期数
+
+        # 統計
+        self.count = 0
+        self.forced = 0
+        self.deferred = 0      # 見送った周期の合計
+        self.total_us = 0
+        self.max_pause_us = 0
+
+    def enable(self):
+        """自動GCを止め、以降は after_step() からだけ回収する"""
+        gc.disable()
+        self.enabled = True
+        self.collect()
+
+    def disable(self):
+        gc.enable()
+        self.enabled = False
+
+    def collect(self):
+        """gc.collect() を実行して停止時間[us]を返す"""
+        t = time.ticks_us()
+        gc.collect()
+        pause = time.ticks_diff(time.ticks_us(), t)
+        self.count += 1
+        self.total_us += pause
+        if pause > self.max_pause_us:
+            self.max_pause_us = pause
+        self.estimate_us = pause
+        self.base = gc.mem_alloc()
+        return pause
+
+    def after_step(self, start_us):
+        """ステップの直後に呼ぶ（start_us はそのステップの開始時刻）"""
+        if gc.mem_alloc() - self.base < self.threshold:
+            return
+        left = self.period_us - time.ticks_diff(time.ticks_us(), start_us)
+        if left < self.estimate_us + self.margin_us:
+            self.deferred += 1
+            self.waiting += 1
+            if self.waiting < self.force_after:
+                return
+            self.forced += 1
+        self.waiting = 0
+        self.collect()
+
+    def report(self):
+        """統計情報ブロック用の行を出力"""
+        mean = self.total_us // self.count if self.count else 0
+        mode = "空き時間のみ" if self.enabled else "自動"
+        print(f"   GC（{mode}）: {self.count} 回 / 停止時間 平均 {mean}us / 最大 {self.max_pause_us}us")
+        if self.enabled:
+            print(f"   GC見送り: {self.deferred} 周期 / 強制回収 {self.forced} 回")
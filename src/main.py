@@ -1,10 +1,25 @@
-from machine import Pin, PWM
-import network
 import time
-import urequests
-import ujson
+BOOT_MS = time.ticks_ms()  # main.py の実行開始（ticks_ms は電源投入・リセットからの経過時間）
+
+from machine import Pin, PWM
+from micropython import const
+import sys
+import uasyncio as asyncio
 import gc
+import _thread
 import config
+import idle_gc
+import ring_log
+import control
+import sensor_array
+import scheduler
+import snapshot
+import profiler
+import calibration
+# 通信関係（ujson, async_http, wifi(network), udp_telemetry(socket), telemetry_frame,
+# sample_ring, delta_telemetry, telemetry_rate, spool）はテレメトリ有効時に
+# init_telemetry() で読み込む（スタンドアロン起動では読み込まない）
+from snapshot import S_TICKS, S_MASK, S_LEFT, S_RIGHT, S_ERROR, S_TURN, S_SEQ
 
 # ピン定義
 LEFT_FWD_PIN = 5
@@ -16,28 +31,215 @@ SENSOR_PINS = [22, 21, 28, 27, 26, 18, 17, 16]
 LED_PIN = "LED"
 
 # 走行パラメータ
-BASE_SPEED = 8000
+BASE_SPEED = const(8000)
 LEFT_MOTOR_CORRECTION = 0.77
 RIGHT_MOTOR_CORRECTION = 1.0
 
+# 学習済みの補正値（BOOT_MODE = "calibrate" で学習してフラッシュに保存したもの）があれば使う
+CALIBRATION_FILE = getattr(config, "CALIBRATION_FILE", "calib.bin")
+calib = calibration.load(CALIBRATION_FILE) if getattr(config, "USE_CALIBRATION", True) else None
+if calib is not None and "left_correction" in calib:
+    LEFT_MOTOR_CORRECTION = calib["left_correction"]
+    RIGHT_MOTOR_CORRECTION = calib["right_correction"]
+
 # ライントレース制御パラメータ
 KP = 9000
 KD = 3000
 WEIGHTS = [-7, -5, -3, -1, 1, 3, 5, 7]
+MIN_SPEED_FACTOR = 0.3  # カーブ時の最低速度倍率
+SLOWDOWN = 10           # speed_factor = max(MIN_SPEED_FACTOR, 1 - |error| / SLOWDOWN)
+
+# 制御周期
+# "timer":   machine.Timer の割り込みから固定レートで実行（ソフトIRQ）
+# "asyncio": uasyncio タスクで実行（ms単位）
+CONTROL_HZ = getattr(config, "CONTROL_HZ", 100)
+CONTROL_SCHEDULER = getattr(config, "CONTROL_SCHEDULER", "timer")
+DEBUG_INTERVAL_MS = 500
+LOG_DRAIN_INTERVAL_MS = 10
+RING_COMPACT_INTERVAL_MS = 20  # 満杯のリングバッファを間引くまでの最大の待ち（その間のサンプルは捨てる）
+
+# GC
+# "auto": MicroPython の自動GC + 送信後に明示的に回収（既定）
+# "idle": 自動GCを止め、制御ステップ直後の空き時間にだけ回収（idle_gc.py, シングルコア時）
+GC_MODE = getattr(config, "GC_MODE", "auto")
+
+# 起動モード
+# "telemetry":  WiFi接続・テレメトリ送信あり
+# "standalone": 通信関係のモジュールを読み込まず、すぐにライントレースを始める
+# "calibrate":  通信なしで、センサーの白・黒レベルとモーター補正を学習して保存（calibration.py）
+# STANDALONE_PIN を指定すると、そのピンがGNDに落ちていれば（ジャンパ）スタンドアロン
+# PCの `python main.py standalone` でも選べる
+BOOT_MODE = getattr(config, "BOOT_MODE", "telemetry")
+STANDALONE_PIN = getattr(config, "STANDALONE_PIN", None)
+
+def is_standalone():
+    if BOOT_MODE == "standalone" or "standalone" in getattr(sys, "argv", ()):
+        return True
+    if STANDALONE_PIN is not None:
+        return Pin(STANDALONE_PIN, Pin.IN, Pin.PULL_UP).value() == 0
+    return False
+
+CALIBRATE = BOOT_MODE == "calibrate"
+STANDALONE = CALIBRATE or is_standalone()
+
+# 実行モード
+# "single":    1コアで制御・通信を実行
+# "dual_core": コア0は制御のみ、コア1がWiFi接続・送信・表示を担当
+RUNTIME = getattr(config, "RUNTIME", "single")
 
 # WiFi/テレメトリ設定
-TELEMETRY_INTERVAL_MS = 2000  # 2000ms(2秒)ごとに送信（メモリ負荷軽減）
+TELEMETRY_INTERVAL_MS = 2000  # 送信間隔の初期値（TELEMETRY_ADAPTIVE なら送信結果と空きヒープで調整）
 TELEMETRY_URL = config.API_URL
 REQUEST_TIMEOUT = 5
+TELEMETRY_FORMAT = getattr(config, "TELEMETRY_FORMAT", "json")
+TELEMETRY_TRANSPORT = getattr(config, "TELEMETRY_TRANSPORT", "http")
+UDP_INTERVAL_MS = getattr(config, "UDP_INTERVAL_MS", 0)  # 0 = 毎制御周期
+TRACE_FILE = "trace.csv"
+SPOOL_FORMATS = ("binary", "batch", "delta")  # スプールを使う TELEMETRY_FORMAT
 
 # グローバル変数（テレメトリ用）
 wlan = None
-current_sensor_values = [0] * 8
+wifi_mgr = None
+current_sensor_mask = 0xFF   # bit i = センサー i の値（0 = 黒）
 current_left_speed = 0
 current_right_speed = 0
-current_error = 0
+current_error = 0   # × control.ERROR_DEN の整数
 current_turn = 0
 
+# ステージ別プロファイラ（config.PROFILE_TRACE_SPANS > 0 なら生スパンも保存）
+P_SENSOR = const(0)
+P_PD = const(1)
+P_MOTOR = const(2)
+P_PUBLISH = const(3)
+P_DEBUG = const(4)
+P_UPLOAD = const(5)
+P_UDP = const(6)
+P_SPOOL = const(7)
+P_DRAIN = const(8)
+P_WIFI = const(9)
+P_LOG = const(10)
+prof = profiler.Profiler(
+    ["control.sensor", "control.pd", "control.motor", "control.publish",
+     "debug.print", "telemetry.upload", "telemetry.udp",
+     "telemetry.spool", "telemetry.drain", "control.wifi", "debug.log"],
+    enabled=getattr(config, "PROFILE", True),
+    trace_capacity=getattr(config, "PROFILE_TRACE_SPANS", 0)
+)
+
+# ログ（print() の代わり。空き時間に log_task() が出力する）
+log = ring_log.RingLog(
+    getattr(config, "LOG_BUFFER_BYTES", 2048),
+    ring_log.LEVELS[getattr(config, "LOG_LEVEL", "debug")],
+    getattr(config, "LOG_RATE_PER_S", 20),
+    getattr(config, "LOG_BURST", 10),
+    getattr(config, "LOG_STREAM", None)  # 出力先（ホスト実行時は tools/host が設定）
+)
+LOG_DRAIN_BYTES = getattr(config, "LOG_DRAIN_BYTES", 64)
+LOG_SLACK_US = getattr(config, "LOG_SLACK_US", 2000)
+
+# 送信・表示側が参照する状態（read_state() で更新）
+state = snapshot.new_state()
+
+# デュアルコア時のコア間受け渡し（コア0が毎周期公開、コア1が読み出す）
+snap = snapshot.Snapshot() if RUNTIME == "dual_core" else None
+stop_requested = False
+core1_done = False
+
+# 統計情報
+telemetry_success_count = 0
+telemetry_fail_count = 0
+first_motor_ms = -1   # 最初のモーター出力の time.ticks_ms()（起動時間の計測用）
+
+# テレメトリ関係（init_telemetry() で用意する。スタンドアロン起動では None のまま）
+rate = None
+frame_buf = None
+frame_seq = 0
+ring = None
+batch_bufs = []
+delta = None
+delta_buf = None
+sp = None
+spool_buf = None
+spool_drain_us = 0
+http = None
+json_sensors = json_motor = json_control = json_doc = None
+
+# UDP送信器（TELEMETRY_TRANSPORT = "udp" のとき、WiFi接続後に生成）
+udp = None
+
+def init_telemetry():
+    """通信関係のモジュールを読み込み、送信用のバッファ・クライアントを用意"""
+    global ujson, async_http, wifi, udp_telemetry, telemetry_frame
+    global sample_ring, delta_telemetry, telemetry_rate, spool
+    global rate, frame_buf, ring, batch_bufs, delta, delta_buf, sp, spool_buf, http
+    global json_sensors, json_motor, json_control, json_doc
+    import ujson
+    import async_http
+    import wifi
+    import udp_telemetry
+    import telemetry_frame
+    import sample_ring
+    import delta_telemetry
+    import telemetry_rate
+    import spool
+
+    # JSONテレメトリの本文（送信ごとに作り直さず、値だけ書き換える）
+    json_sensors = [0] * control.SENSOR_COUNT
+    json_motor = {"left_speed": 0, "right_speed": 0}
+    json_control = {"error": 0.0, "turn": 0, "base_speed": BASE_SPEED}
+    json_doc = {"timestamp": 0, "sensors": json_sensors, "motor": json_motor, "control": json_control}
+
+    # 送信間隔・バッチサイズの自動調整（送信の所要時間・失敗率・空きヒープから決める）
+    if getattr(config, "TELEMETRY_ADAPTIVE", False):
+        rate = telemetry_rate.RateController(
+            TELEMETRY_INTERVAL_MS,
+            config.TELEMETRY_INTERVAL_MIN_MS, config.TELEMETRY_INTERVAL_MAX_MS,
+            config.TELEMETRY_BATCH_SIZE, config.TELEMETRY_BATCH_MIN, config.TELEMETRY_BATCH_SIZE,
+            config.TELEMETRY_HEAP_LOW, config.TELEMETRY_BUSY_PERCENT
+        )
+
+    # バイナリフレーム用（送信ごとの確保を避けるため事前確保）
+    frame_buf = bytearray(telemetry_frame.FRAME_SIZE)
+
+    # バッチ送信用リングバッファ（全制御周期を記録）
+    if TELEMETRY_FORMAT == "batch":
+        ring = sample_ring.SampleRing(config.RING_CAPACITY, config.RING_OVERFLOW)
+        # 溜まったバッチはパイプラインでまとめて送る
+        batch_bufs = [bytearray(config.TELEMETRY_BATCH_SIZE * telemetry_frame.FRAME_SIZE)
+                      for _ in range(config.TELEMETRY_PIPELINE_DEPTH)]
+
+    # 変化時のみの記録（状態が変わらない周期は周期数を数えるだけ）
+    if TELEMETRY_FORMAT == "delta":
+        delta = delta_telemetry.DeltaEncoder(
+            config.DELTA_BUFFER_BYTES, 1000000 // CONTROL_HZ, config.DELTA_ERROR_STEP
+        )
+        delta_buf = bytearray(config.DELTA_BUFFER_BYTES)
+
+    # WiFi切断中のテレメトリを溜めるフラッシュのスプール（再接続後にバッチで再送）
+    # 再送はバイナリフレームのバッチなので、送信先がそれを受け取れる形式のときだけ
+    # （JSON のエンドポイントはフレームを解釈できず、スプールが減らない）
+    if getattr(config, "SPOOL_ENABLED", False) and TELEMETRY_FORMAT in SPOOL_FORMATS:
+        sp = spool.Spool(max_bytes=config.SPOOL_MAX_BYTES)
+        spool_buf = bytearray(config.TELEMETRY_BATCH_SIZE * telemetry_frame.FRAME_SIZE)
+
+    # keep-alive HTTPクライアント（接続を使い回してTLSハンドシェイクを省く）
+    http = async_http.Client(TELEMETRY_URL, REQUEST_TIMEOUT)
+
+# PD制御（パターン別の事前計算テーブル + 整数演算）
+ctl = control.LineController(
+    BASE_SPEED, KP, KD, WEIGHTS,
+    LEFT_MOTOR_CORRECTION, RIGHT_MOTOR_CORRECTION,
+    MIN_SPEED_FACTOR, SLOWDOWN
+)
+
+# キャリブレーション時: 直線での turn の偏りからモーター補正を推定
+bias = None
+if CALIBRATE:
+    bias = calibration.BiasEstimator(
+        config.CALIBRATE_WINDOW, config.CALIBRATE_STRAIGHT_BAND * control.ERROR_DEN
+    )
+CALIBRATE_RUN_MS = config.CALIBRATE_RUN_MS if CALIBRATE else None
+
 # モーター初期化
 left_fwd = PWM(Pin(LEFT_FWD_PIN))
 left_rev = PWM(Pin(LEFT_REV_PIN))
@@ -47,101 +249,180 @@ for pwm in [left_fwd, left_rev, right_fwd, right_rev]:
     pwm.freq(1000)
 
 # センサー初期化
-sensors = [Pin(p, Pin.IN, Pin.PULL_UP) for p in SENSOR_PINS]
+# "digital": RP2040ではGPIO_INレジスタの一括読み取り、それ以外はPinごとの読み取り
+# "analog":  ADC対応ピン（GP26/27/28）のセンサーをオーバーサンプリングで読み、
+#            線の位置を連続値で求める（analog_sensor.py, 他のセンサーは2値）
+SENSOR_ANALOG = getattr(config, "SENSOR_MODE", "digital") == "analog"
+if SENSOR_ANALOG:
+    import analog_sensor
+    sensors = analog_sensor.AnalogSensorArray(
+        SENSOR_PINS, WEIGHTS, config.ANALOG_OVERSAMPLE,
+        config.ANALOG_WHITE, config.ANALOG_BLACK,
+        config.ANALOG_NOISE_FLOOR, config.ANALOG_LOST_LEVEL
+    )
+    if calib is not None and len(calib.get("analog_white", ())) == len(sensors.channels):
+        for c in range(len(sensors.channels)):
+            sensors.set_calibration(c, calib["analog_white"][c], calib["analog_black"][c])
+else:
+    sensors = sensor_array.SensorArray(SENSOR_PINS)
 
 # LED初期化
 led = Pin(LED_PIN, Pin.OUT)
 led.value(1)
 
 
-# WiFi接続関数
-def connect_wifi():
-    """WiFiに接続（高速版）"""
-    global wlan
-    
-    print("=" * 50)
-    print("WiFi接続開始")
-    print("=" * 50)
-    
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    
-    if not wlan.isconnected():
-        print(f"接続中: {config.SSID}")
-        wlan.connect(config.SSID, config.PASSWORD)
-        
-        # 接続を最大5秒待機（高速化）
-        timeout = 5
-        while not wlan.isconnected() and timeout > 0:
-            print(".", end="")
-            time.sleep(0.5)  # 待機時間を短縮
-            timeout -= 0.5
-        
-        print()
-    
-    if wlan.isconnected():
-        ip = wlan.ifconfig()[0]
-        print(f"✅ WiFi接続成功!")
-        print(f"   IPアドレス: {ip}")
-        print(f"   サーバー: {TELEMETRY_URL}")
-        gc.collect()
-        return True
-    else:
-        print("❌ WiFi接続失敗（タイムアウト）")
-        print("   ライントレースは続行します")
-        return False
+# WiFi接続（ブロックしない状態機械。シングルコア時は制御周期ごとに1ステップ進める）
+def start_network():
+    """WiFi接続を開始（接続を待たずに戻る。切断時は自動で再接続）"""
+    global wifi_mgr, wlan
+    wifi_mgr = wifi.WifiManager(
+        config.SSID, config.PASSWORD,
+        config.WIFI_CONNECT_TIMEOUT_MS,
+        config.WIFI_BACKOFF_MIN_MS, config.WIFI_BACKOFF_MAX_MS
+    )
+    wlan = wifi_mgr.wlan
+    # 無線チップのファームウェア読み込み（数百ms）は制御ループの外で済ませる
+    wifi_mgr.activate()
+    log.info("📶 WiFi接続をバックグラウンドで開始: {}", config.SSID)
+    log.info("   サーバー: {}", TELEMETRY_URL)
 
 # テレメトリ送信関数
-def send_telemetry():
-    """テレメトリデータを送信（メモリ最適化版）"""
+async def send_telemetry():
+    """テレメトリデータを送信（非同期版）"""
+    headers = None
     try:
-        # 送信前にメモリ解放
-        gc.collect()
-        
-        # データを最小限に（WiFi情報を削除してメモリ削減）
-        data = {
-            "timestamp": time.ticks_ms(),
-            "sensors": current_sensor_values,
-            "motor": {
-                "left_speed": current_left_speed,
-                "right_speed": current_right_speed
-            },
-            "control": {
-                "error": current_error,
-                "turn": current_turn,
-                "base_speed": BASE_SPEED
-            }
-        }
+        if TELEMETRY_FORMAT == "batch":
+            payloads = []
+            batch = rate.batch if rate is not None else config.TELEMETRY_BATCH_SIZE
+            for buf in batch_bufs:
+                n = ring.read_into(buf, batch)
+                if n == 0:
+                    break
+                payload = memoryview(buf)[:n * telemetry_frame.FRAME_SIZE]
+                if config.TELEMETRY_COMPRESS:
+                    payload = alloc_retry(sample_ring.compress, payload)
+                payloads.append(payload)
+            if not payloads:
+                return True
+            if config.TELEMETRY_COMPRESS:
+                headers = {"Content-Encoding": "deflate"}
+            content_type = telemetry_frame.CONTENT_TYPE
+        elif TELEMETRY_FORMAT == "delta":
+            n = delta.read_into(delta_buf)
+            if n == 0:
+                return True
+            payload = memoryview(delta_buf)[:n]
+            if config.TELEMETRY_COMPRESS:
+                payload = alloc_retry(sample_ring.compress, payload)
+                headers = {"Content-Encoding": "deflate"}
+            payloads = [payload]
+            content_type = delta_telemetry.CONTENT_TYPE
+        elif TELEMETRY_FORMAT == "binary":
+            encode_state_frame()
+            payloads = [frame_buf]
+            content_type = telemetry_frame.CONTENT_TYPE
+        else:
+            # データを最小限に（WiFi情報を削除してメモリ削減）
+            read_state(state)
+            json_doc["timestamp"] = state[S_TICKS]
+            mask = state[S_MASK]
+            for i in range(control.SENSOR_COUNT):
+                json_sensors[i] = (mask >> i) & 1
+            json_motor["left_speed"] = state[S_LEFT]
+            json_motor["right_speed"] = state[S_RIGHT]
+            json_control["error"] = error_value(state[S_ERROR])
+            json_control["turn"] = state[S_TURN]
+            if prof.enabled:
+                # ステージ別処理時間の要約 {名前: [平均, p99, 最大]}
+                json_doc["profile"] = prof.summary()
+            if rate is not None:
+                json_doc["rate"] = rate.summary()
+            payloads = [alloc_retry(ujson.dumps, json_doc)]
+            content_type = "application/json"
         
-        json_data = ujson.dumps(data)
-        headers = {'Content-Type': 'application/json'}
-        
-        response = urequests.post(
-            TELEMETRY_URL,
-            data=json_data,
-            headers=headers,
-            timeout=REQUEST_TIMEOUT
-        )
+        # バイナリ形式では選んだ送信間隔・バッチサイズをヘッダーで伝える
+        if rate is not None and content_type != "application/json":
+            if headers is None:
+                headers = {}
+            headers["X-Telemetry-Interval"] = rate.interval_ms
+            headers["X-Telemetry-Batch"] = rate.batch
         
-        status = response.status_code
-        response.close()
+        # 通信待ちの間は制御タスクが動き続ける
+        try:
+            statuses = await http.post_many(payloads, content_type, headers)
+        except MemoryError:
+            # TLSハンドシェイクなどでヒープが尽きた（空き時間GC中は自動で回収されない）
+            # 書きかけの接続は捨て、回収してから1回だけ送り直す
+            log.warn("⚠️ 送信中にメモリ不足 - 回収して再送します")
+            await http.close()
+            collect_garbage(True)
+            statuses = await http.post_many(payloads, content_type, headers)
         
-        # 送信後すぐにメモリ解放
-        del json_data
-        del data
-        gc.collect()
+        del payloads
+        collect_garbage()
         
-        return status == 200
+        return all(status == 200 for status in statuses)
         
     except Exception as e:
-        print(f"❌ テレメトリ送信エラー: {e}")
-        gc.collect()  # エラー時もメモリ解放
+        log.error("❌ テレメトリ送信エラー: {!r}", e)
+        collect_garbage(True)  # エラー時は空き時間GC中でも回収（次の送信の確保に備える）
         return False
 
+def encode_state_frame():
+    """最新の状態を frame_buf にバイナリフレームとして書き込む"""
+    global frame_seq
+    read_state(state)
+    telemetry_frame.encode_q_into(
+        frame_buf, 0, frame_seq, state[S_TICKS],
+        state[S_MASK], state[S_LEFT], state[S_RIGHT],
+        error_fixed(state[S_ERROR]), state[S_TURN], BASE_SPEED
+    )
+    frame_seq = (frame_seq + 1) & 0xFFFF
+
+def spool_telemetry():
+    """送れなかったテレメトリをスプールに保存（バッチ時はリングバッファの中身すべて）"""
+    t = time.ticks_us()
+    if ring is not None:
+        buf = batch_bufs[0]
+        while True:
+            n = ring.read_into(buf, config.TELEMETRY_BATCH_SIZE)
+            if n == 0:
+                break
+            sp.write(memoryview(buf)[:n * telemetry_frame.FRAME_SIZE])
+    else:
+        encode_state_frame()
+        sp.write(frame_buf)
+    prof.end(P_SPOOL, t)
+
+async def drain_spool():
+    """スプールの未送信分を最大 SPOOL_DRAIN_BATCHES バッチ再送"""
+    global spool_drain_us
+    sp.flush()
+    headers = {"Content-Encoding": "deflate"} if config.TELEMETRY_COMPRESS else None
+    for _ in range(config.SPOOL_DRAIN_BATCHES):
+        t = time.ticks_us()
+        n = sp.read_into(spool_buf)
+        if n == 0:
+            break
+        payload = memoryview(spool_buf)[:n * telemetry_frame.FRAME_SIZE]
+        try:
+            if config.TELEMETRY_COMPRESS:
+                payload = alloc_retry(sample_ring.compress, payload)
+            statuses = await http.post_many([payload], telemetry_frame.CONTENT_TYPE, headers)
+        except Exception as e:
+            log.error("❌ スプール再送エラー: {!r}", e)
+            if isinstance(e, MemoryError):
+                await http.close()
+            collect_garbage(True)
+            break
+        if statuses[0] != 200:
+            break
+        sp.commit(n)
+        spool_drain_us += time.ticks_diff(time.ticks_us(), t)
+        prof.end(P_DRAIN, t)
+
 # モーター制御関数（test_01.pyと同じ）
 def set_motors(left_duty, right_duty):
-    global current_left_speed, current_right_speed
-    
     left_duty = int(left_duty * LEFT_MOTOR_CORRECTION)
     right_duty = int(right_duty * RIGHT_MOTOR_CORRECTION)
 
@@ -149,6 +430,14 @@ def set_motors(left_duty, right_duty):
     left_duty = max(0, min(65535, left_duty))
     right_duty = max(0, min(65535, right_duty))
     
+    write_motors(left_duty, right_duty)
+
+def write_motors(left_duty, right_duty):
+    """補正・クリップ済みのdutyをそのまま出力"""
+    global current_left_speed, current_right_speed, first_motor_ms
+    if first_motor_ms < 0:
+        first_motor_ms = time.ticks_ms()
+    
     # グローバル変数に保存（テレメトリ用）
     current_left_speed = left_duty
     current_right_speed = right_duty
@@ -159,125 +448,510 @@ def set_motors(left_duty, right_duty):
     right_fwd.duty_u16(0)
     right_rev.duty_u16(right_duty)
 
+def error_value(error):
+    """整数の誤差（× ERROR_DEN）をテレメトリ・表示用の浮動小数点値に変換"""
+    return error / control.ERROR_DEN
+
+def error_fixed(error):
+    """
+    整数の誤差（× ERROR_DEN）をフレームの固定小数点（× ERROR_SCALE）に変換
+
+    浮動小数点を使わないため制御ステップ内でメモリを確保しない
+    （int(error_value(error) * ERROR_SCALE) と同じくゼロ方向に切り捨て）。
+    """
+    q = error * telemetry_frame.ERROR_SCALE
+    if q >= 0:
+        return q // control.ERROR_DEN
+    return -(-q // control.ERROR_DEN)
+
+def collect_garbage(force=False):
+    """空き時間GCでなければ（force なら常に）その場で回収（停止時間は gcc に記録）"""
+    if force or not gcc.enabled:
+        gcc.collect()
+
+def alloc_retry(fn, arg):
+    """
+    fn(arg) を実行し、MemoryError なら回収して1回だけやり直す
+
+    空き時間GC中（gc.disable()）はヒープが尽きても自動では回収されず MemoryError に
+    なるため、送信側の大きな確保（圧縮・JSON化）で使う。
+    """
+    try:
+        return fn(arg)
+    except MemoryError:
+        collect_garbage(True)
+        return fn(arg)
+
+def read_state(out):
+    """最新の制御状態を out に読み出す（デュアルコア時はスナップショット経由）"""
+    if snap is not None:
+        snap.read_into(out)
+        return
+    out[S_TICKS] = time.ticks_ms()
+    out[S_MASK] = current_sensor_mask
+    out[S_LEFT] = current_left_speed
+    out[S_RIGHT] = current_right_speed
+    out[S_ERROR] = current_error
+    out[S_TURN] = current_turn
+
 def stop_motors():
     for pwm in [left_fwd, left_rev, right_fwd, right_rev]:
         pwm.duty_u16(0)
     print("=== モーター停止 ===")
 
-# メインプログラム
-def main():
-    global current_sensor_values, current_error, current_turn
+def spin(duty):
+    """その場で旋回（duty > 0 で右回り = 左前進・右後退, < 0 で左回り, 0 で停止）"""
+    d = duty if duty > 0 else -duty
+    # 右モーターは REV ピンが前進
+    left_fwd.duty_u16(d if duty > 0 else 0)
+    left_rev.duty_u16(d if duty < 0 else 0)
+    right_fwd.duty_u16(d if duty > 0 else 0)
+    right_rev.duty_u16(d if duty < 0 else 0)
+
+# キャリブレーション
+def sweep_sensors():
+    """
+    線の上でその場旋回（右 → 左 → 右）しながらアナログセンサーの白・黒レベルを学習
+
+    線の中央に置いて実行する。学習した (白, 黒) のリストを返す（失敗時は None）。
+    """
+    sweep = calibration.SensorSweep(len(sensors.channels))
+    duty = config.CALIBRATE_SPIN_DUTY
+    ms = config.CALIBRATE_SWEEP_MS
+    print(f"🔄 センサーの学習: その場旋回 {ms}ms × 2")
+    for d, length in ((duty, ms // 2), (-duty, ms), (duty, ms // 2)):
+        spin(d)
+        start = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), start) < length:
+            sensors.sample()
+            sweep.update(sensors.sums, sensors.oversample)
+            time.sleep_ms(1)
+    spin(0)
+    try:
+        levels = sweep.result(config.CALIBRATE_MIN_SPAN)
+    except ValueError as e:
+        print(f"⚠️ センサーの学習に失敗: {e}（保存済み・設定の値を使います）")
+        return None
+    for c in range(len(levels)):
+        sensors.set_calibration(c, levels[c][0], levels[c][1])
+    print("   白 / 黒: " + ", ".join(f"GP{SENSOR_PINS[i]} {w}/{b}" for i, (w, b) in zip(sensors.channels, levels)))
+    return levels
+
+def finish_calibration(levels):
+    """学習走行の結果からモーター補正を求め、センサーのレベルと合わせてフラッシュに保存"""
+    data = {}
+    if levels is not None:
+        data["analog_white"] = [w for w, _ in levels]
+        data["analog_black"] = [b for _, b in levels]
+    try:
+        left, right = bias.corrections(
+            BASE_SPEED, LEFT_MOTOR_CORRECTION, RIGHT_MOTOR_CORRECTION, config.CALIBRATE_MIN_TICKS
+        )
+        data["left_correction"] = round(left, 4)
+        data["right_correction"] = round(right, 4)
+        print(f"   モーター補正: 左 {LEFT_MOTOR_CORRECTION:.3f} → {left:.3f} / 右 {RIGHT_MOTOR_CORRECTION:.3f} → {right:.3f}"
+              f"（直線 {bias.ticks} 周期, turn 平均 {bias.mean_turn():.0f}）")
+    except ValueError as e:
+        print(f"⚠️ モーター補正の推定に失敗: {e}")
+    if data:
+        calibration.save(CALIBRATION_FILE, data)
+        print(f"   {CALIBRATION_FILE} に保存しました（次回の起動から使います）")
+
+# 制御ステップ
+def control_step():
+    """センサー読み取り → PD制御 → モーター出力（1周期分）"""
+    global current_sensor_mask, current_error, current_turn
     
-    print("=" * 50)
-    print("ライントレース + WiFi通信版")
-    print("=" * 50)
+    # センサー読み取り（8個をまとめて1つのビットマスクとして取得）
+    t = time.ticks_us()
+    mask = sensors.read()
+    current_sensor_mask = mask
+    t = prof.end(P_SENSOR, t)
     
-    # WiFi接続（高速化版）
-    if not connect_wifi():
-        print("WiFi接続をスキップして、ライントレースのみ実行します。")
+    # 誤差計算・PD制御・減速（test_01.pyと同じ制御則をテーブル + 整数演算で実行）
+    # アナログ時は読み取りで求めた連続値の誤差を使う
+    if SENSOR_ANALOG:
+        ctl.step_error(sensors.error)
+    else:
+        ctl.step(mask)
+    current_error = ctl.error
+    current_turn = ctl.turn
+    if bias is not None:
+        bias.update(current_error, current_turn)
+    t = prof.end(P_PD, t)
     
-    print("==" * 50)
-    print("=== ライントレース開始（改良版） ===")
-    print("   (Ctrl+C で停止)")
-    print("=" * 50)
+    # モーター制御（補正・クリップ済み）
+    write_motors(ctl.left, ctl.right)
+    t = prof.end(P_MOTOR, t)
     
-    # メモリ初期化
-    gc.collect()
+    # コア1への受け渡し（デュアルコア時）
+    if snap is not None:
+        snap.publish(
+            time.ticks_ms(), mask,
+            current_left_speed, current_right_speed,
+            current_error, current_turn
+        )
+    # UDPストリーミング（毎周期、ブロックしない）
+    elif udp is not None and UDP_INTERVAL_MS == 0:
+        udp.send(
+            time.ticks_ms(), mask,
+            current_left_speed, current_right_speed,
+            error_fixed(current_error), current_turn, BASE_SPEED
+        )
     
-    last_error = 0
-    last_debug_time = 0
-    last_telemetry_time = 0
-    telemetry_success_count = 0
-    telemetry_fail_count = 0
+    # 全周期のサンプルを記録（バッチ送信時）
+    if ring is not None:
+        ring.push(
+            time.ticks_ms(), mask,
+            current_left_speed, current_right_speed,
+            error_fixed(current_error), current_turn, BASE_SPEED
+        )
+    # 変化した周期だけを記録（変化時のみの送信時）
+    elif delta is not None:
+        delta.push(
+            time.ticks_ms(), mask,
+            current_left_speed, current_right_speed,
+            error_fixed(current_error), current_turn, BASE_SPEED
+        )
+    t = prof.end(P_PUBLISH, t)
     
-    try:
-        while True:
-            # センサー読み取り（test_01.pyと同じ）
-            values = [s.value() for s in sensors]
-            current_sensor_values = values
-            
-            current_time = time.ticks_ms()
-            
-            # デバッグ表示（test_01.pyと同じ）
-            if time.ticks_diff(current_time, last_debug_time) > 500:
-                last_debug_time = current_time
-                led.toggle()
-                print("センサー状態:", " ".join(str(v) for v in values))
-            
-            # 誤差計算（test_01.pyと同じ）
-            detected_count = 0
-            weighted_sum = 0.0
-            for i in range(8):
-                if values[i] == 0:
-                    weighted_sum += WEIGHTS[i]
-                    detected_count += 1
-            
-            if detected_count == 0:
-                error = last_error
+    # WiFi接続の状態機械を1ステップ進める（シングルコア時, ブロックしない）
+    if wifi_mgr is not None and snap is None:
+        wifi_mgr.step()
+        prof.end(P_WIFI, t)
+
+# GCの停止時間の記録と、空き時間だけでの回収
+# デュアルコア時はコア0がメモリを確保しないため、コア1側の自動GCに任せる
+gcc = idle_gc.IdleCollector(
+    1000000 // CONTROL_HZ,
+    getattr(config, "GC_THRESHOLD", 8192),
+    getattr(config, "GC_MARGIN_US", 500)
+)
+idle_collect = GC_MODE == "idle" and RUNTIME != "dual_core"
+
+# 固定レートで control_step() を実行し、周期ジッタ等を記録（空き時間GC時はステップ直後に回収判定）
+sched = scheduler.FixedRateScheduler(
+    CONTROL_HZ, control_step, gcc.after_step if idle_collect else None
+)
+
+# デバッグ表示タスク
+async def debug_task():
+    """センサー状態の表示とLED点滅（test_01.pyと同じ間隔）"""
+    out = snapshot.new_state()
+    while True:
+        t = time.ticks_us()
+        led.toggle()
+        # opt_level(1) 以上でコンパイルすると表示ごと取り除かれる
+        if __debug__ and log.enabled(ring_log.DEBUG):
+            read_state(out)
+            log.debug("センサー状態: {} {} {} {} {} {} {} {}", *sensor_array.unpack(out[S_MASK]))
+        prof.end(P_DEBUG, t)
+        await asyncio.sleep_ms(DEBUG_INTERVAL_MS)
+
+# ログ出力タスク
+async def log_task():
+    """
+    溜まったログを USB シリアルへ出力
+
+    シングルコア時は次の制御ステップまで LOG_SLACK_US 以上あるときだけ、
+    LOG_DRAIN_BYTES ずつ出力する（出力先が書き込めなければ待たずに見送る）。
+    デュアルコア時はコア1で動くため空き時間を確認しない。
+    """
+    while True:
+        await asyncio.sleep_ms(LOG_DRAIN_INTERVAL_MS)
+        t = time.ticks_us()
+        while snap is not None or sched.slack_us() >= LOG_SLACK_US:
+            if not log.drain(LOG_DRAIN_BYTES):
+                break
+        prof.end(P_LOG, t)
+
+# リングバッファの間引きタスク（RING_OVERFLOW = "decimate" のとき）
+async def ring_task():
+    """満杯になったリングバッファの間引きを、制御ステップの外で行う"""
+    while True:
+        await asyncio.sleep_ms(RING_COMPACT_INTERVAL_MS)
+        ring.compact()
+
+# テレメトリ送信タスク
+async def telemetry_task():
+    """TELEMETRY_INTERVAL_MS（自動調整時は rate.interval_ms）ごとにテレメトリを送信"""
+    global telemetry_success_count, telemetry_fail_count
+    
+    while True:
+        await asyncio.sleep_ms(rate.interval_ms if rate is not None else TELEMETRY_INTERVAL_MS)
+        
+        if not wifi_mgr.isconnected():
+            if sp is not None:
+                spool_telemetry()
+                log.warn("⚠️ WiFi切断中 - スプールに保存 (未送信 {} フレーム)", sp.pending())
             else:
-                error = -(weighted_sum / detected_count)
-            
-            current_error = error
-            
-            # PD制御（test_01.pyと同じ）
-            error_diff = error - last_error
-            turn = int(KP * error + KD * error_diff)
-            last_error = error
-            current_turn = turn
-            
-            # ターン量を制限（test_01.pyと同じ）
-            turn = max(-BASE_SPEED, min(BASE_SPEED, turn))
-            
-            # 誤差に応じて減速（test_01.pyと同じ）
-            speed_factor = max(0.3, 1.0 - abs(error)/10)
-            left_speed = int((BASE_SPEED - turn) * speed_factor)
-            right_speed = int((BASE_SPEED + turn) * speed_factor)
-            
-            # モーター制御（test_01.pyと同じ）
-            set_motors(left_speed, right_speed)
-            
-            # テレメトリ送信（追加機能）
-            if time.ticks_diff(current_time, last_telemetry_time) > TELEMETRY_INTERVAL_MS:
-                # デバッグ: 送信タイミング到達
-                print(f"⏰ 送信タイミング到達（{time.ticks_diff(current_time, last_telemetry_time)}ms経過）")
-                
-                if wlan is None:
-                    print("⚠️ WiFi未初期化")
-                elif not wlan.isconnected():
-                    print("⚠️ WiFi切断中 - 再接続を試みます")
-                    # WiFi再接続を試みる（ブロッキングしないように短時間で）
-                    gc.collect()
-                else:
-                    # WiFi接続OK - 送信実行
-                    last_telemetry_time = current_time
-                    print(f"🔄 送信開始...")
-                    
-                    success = send_telemetry()
-                    
-                    if success:
-                        telemetry_success_count += 1
-                        print(f"📤 送信成功 [{telemetry_success_count}] | L:{current_left_speed} R:{current_right_speed} | エラー:{current_error:.2f}")
-                    else:
-                        telemetry_fail_count += 1
-                        print(f"⚠️  送信失敗 [{telemetry_fail_count}]")
-            
-            
-            time.sleep_ms(10)
+                log.warn("⚠️ WiFi切断中 - 送信をスキップします")
+            continue
+        
+        # 送信中の制御周期を別に記録
+        sched.stats.flagged = True
+        t = time.ticks_us()
+        try:
+            success = await send_telemetry()
+        finally:
+            sched.stats.flagged = False
+        # 通信待ち（他タスクの実行時間）を含む送信全体の時間
+        prof.end(P_UPLOAD, t)
+        
+        if rate is not None:
+            # 送信後の空きヒープで判断（自動GC時は send_telemetry() の回収後）
+            rate.update(
+                success, time.ticks_diff(time.ticks_us(), t) // 1000,
+                gc.mem_free(), ring.count if ring is not None else 0
+            )
+        
+        if success:
+            telemetry_success_count += 1
+            if log.enabled(ring_log.INFO):
+                read_state(state)
+                log.info("📤 送信成功 [{}] | L:{} R:{} | エラー:{:.2f}", telemetry_success_count,
+                         state[S_LEFT], state[S_RIGHT], error_value(state[S_ERROR]))
+            if rate is not None:
+                log.info("   次の送信: {}ms後 / バッチ {} | 所要時間 {}ms / 空きヒープ {}",
+                         rate.interval_ms, rate.batch, rate.latency_ms, rate.mem_free)
+        else:
+            telemetry_fail_count += 1
+            log.warn("⚠️  送信失敗 [{}]", telemetry_fail_count)
+        
+        # 再接続後はスプールの未送信分も送る
+        if success and sp is not None and sp.pending():
+            sched.stats.flagged = True
+            try:
+                await drain_spool()
+            finally:
+                sched.stats.flagged = False
+
+# UDP送信タスク
+async def udp_task():
+    """
+    最新の状態をUDPで送信
+
+    UDP_INTERVAL_MS ごとに送信する。デュアルコア時に UDP_INTERVAL_MS = 0 なら
+    1msごとにスナップショットを確認し、更新されていれば送信する。
+    """
+    out = snapshot.new_state()
+    last_seq = -1
+    while True:
+        await asyncio.sleep_ms(UDP_INTERVAL_MS or 1)
+        if udp is None:
+            continue
+        read_state(out)
+        if snap is not None and out[S_SEQ] == last_seq:
+            continue
+        last_seq = out[S_SEQ]
+        t = time.ticks_us()
+        udp.send(
+            out[S_TICKS], out[S_MASK], out[S_LEFT], out[S_RIGHT],
+            error_fixed(out[S_ERROR]), out[S_TURN], BASE_SPEED
+        )
+        prof.end(P_UDP, t)
+
+# 接続状態の監視タスク
+async def network_task():
+    """
+    WiFiの接続・切断を表示し、接続時にUDP送信器を用意する
+
+    デュアルコア時はコア1のこのタスクが制御周期ごとに状態機械を進める。
+    """
+    global udp
+    connects = 0
+    disconnects = 0
+    period_ms = max(1, 1000 // CONTROL_HZ) if snap is not None else 100
+    while True:
+        if snap is not None:
+            t = time.ticks_us()
+            wifi_mgr.step()
+            prof.end(P_WIFI, t)
+        if wifi_mgr.connects != connects:
+            connects = wifi_mgr.connects
+            log.info("✅ WiFi接続成功! IPアドレス: {}（{}ms, 未接続 {}ms）",
+                     wlan.ifconfig()[0], wifi_mgr.last_connect_ms, wifi_mgr.last_outage_ms)
+            if TELEMETRY_TRANSPORT == "udp" and udp is None:
+                udp = udp_telemetry.UDPSender(config.UDP_HOST, config.UDP_PORT)
+                log.info("📡 UDP送信先: {}:{}", config.UDP_HOST, config.UDP_PORT)
+        if wifi_mgr.disconnects != disconnects:
+            disconnects = wifi_mgr.disconnects
+            log.warn("⚠️ WiFi切断 - 再接続します")
+        await asyncio.sleep_ms(period_ms)
+
+def start_background_tasks():
+    """デバッグ表示・ログ出力・テレメトリ送信タスクを起動"""
+    asyncio.create_task(debug_task())
+    asyncio.create_task(log_task())
+    if STANDALONE:
+        return
+    asyncio.create_task(network_task())
+    if ring is not None and ring.policy == sample_ring.DECIMATE:
+        asyncio.create_task(ring_task())
+    if TELEMETRY_TRANSPORT == "udp":
+        if UDP_INTERVAL_MS > 0 or snap is not None:
+            asyncio.create_task(udp_task())
+    else:
+        asyncio.create_task(telemetry_task())
+
+async def run():
+    start_background_tasks()
+    
+    ctl.reset()
+    if CONTROL_SCHEDULER == "timer":
+        # 制御はタイマー割り込みから実行、イベントループは他のタスク用
+        sched.start_timer()
+        if CALIBRATE_RUN_MS is not None:
+            # 学習走行は決まった時間で終える
+            await asyncio.sleep_ms(CALIBRATE_RUN_MS)
+            return
+        while True:
+            await asyncio.sleep_ms(1000)
+    elif CALIBRATE_RUN_MS is not None:
+        try:
+            await asyncio.wait_for(sched.run_async(), CALIBRATE_RUN_MS / 1000)
+        except asyncio.TimeoutError:
+            pass
+    else:
+        await sched.run_async()
+
+# コア1（デュアルコア時）
+async def core1_run():
+    start_background_tasks()
+    while not stop_requested:
+        await asyncio.sleep_ms(100)
+
+def core1_main():
+    """コア1のエントリ: WiFi接続と送信・表示を担当"""
+    global core1_done
+    try:
+        if not STANDALONE:
+            start_network()
+        asyncio.run(core1_run())
+    finally:
+        core1_done = True
+
+def stop_core1():
+    """コア1に終了を要求し、送信中なら終わるまで待つ"""
+    global stop_requested
+    stop_requested = True
+    deadline = time.ticks_add(time.ticks_ms(), (REQUEST_TIMEOUT + 1) * 1000)
+    while not core1_done and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+        time.sleep_ms(10)
+
+# メインプログラム
+def main():
+    levels = None
+    if CALIBRATE:
+        print("=" * 50)
+        print("キャリブレーション（線の中央に置いて開始）")
+        print("=" * 50)
+        if SENSOR_ANALOG:
+            levels = sweep_sensors()
+        print(f"=== 学習走行 {CALIBRATE_RUN_MS}ms（直線での左右の偏りを計測） ===")
+    if STANDALONE:
+        # 通信関係は読み込まず、見出しもログ経由（USB シリアルへの出力を待たずに走り出す）
+        log.info("=== ライントレース開始（{}Hz, スタンドアロン） ===", CONTROL_HZ)
+        if snap is not None:
+            # コア1はデバッグ表示・ログ出力のみ
+            _thread.start_new_thread(core1_main, ())
+    else:
+        print("=" * 50)
+        print("ライントレース + WiFi通信版")
+        print("=" * 50)
+        
+        init_telemetry()
+        if snap is not None:
+            # WiFi接続を含む通信処理はすべてコア1で実行
+            _thread.start_new_thread(core1_main, ())
+        else:
+            start_network()
+        
+        print("==" * 50)
+        if snap is not None:
+            print(f"=== ライントレース開始（{CONTROL_HZ}Hz, デュアルコア） ===")
+        else:
+            print(f"=== ライントレース開始（{CONTROL_HZ}Hz, {CONTROL_SCHEDULER}） ===")
+        print("   (Ctrl+C で停止)")
+        print("=" * 50)
+    
+    # メモリ初期化（空き時間GC時は以降の自動GCを止める）
+    if idle_collect:
+        gcc.enable()
+    else:
+        gcc.collect()
+    
+    try:
+        if snap is not None:
+            # コア0は制御ステップのみを実行
+            ctl.reset()
+            sched.run_blocking(CALIBRATE_RUN_MS)
+        else:
+            asyncio.run(run())
     
     except KeyboardInterrupt:
         print("\n=== 割り込み検出 ===")
     
     finally:
+        sched.stop()
         stop_motors()
+        if snap is not None:
+            stop_core1()
         led.value(0)
+        if http is not None and http.writer is not None:
+            http.writer.close()
+        if udp is not None:
+            udp.close()
+        if sp is not None:
+            sp.flush()
         if wlan:
             wlan.disconnect()
             wlan.active(False)
+        # 次回の asyncio.run() のためにイベントループを初期化
+        asyncio.new_event_loop()
+        # 出力しきれていないログ（制御は止まっているので待ってよい）
+        log.flush()
         
         print("\n" + "=" * 50)
         print("📊 統計情報")
-        print(f"   送信成功: {telemetry_success_count}")
-        print(f"   送信失敗: {telemetry_fail_count}")
+        if first_motor_ms >= 0:
+            # 電源投入（リセット）からの時間。Ctrl+D のソフトリセット後は ticks_ms が戻らないため参考値
+            print(f"   起動 → 最初のモーター出力: {first_motor_ms}ms（main.py 開始 {BOOT_MS}ms + {time.ticks_diff(first_motor_ms, BOOT_MS)}ms, {'スタンドアロン' if STANDALONE else 'テレメトリあり'}）")
+        if not STANDALONE:
+            print(f"   送信成功: {telemetry_success_count}")
+            print(f"   送信失敗: {telemetry_fail_count}")
+            if rate is not None:
+                rate.report()
+            if udp is not None:
+                print(f"   UDP送信: {udp.sent} / 破棄 {udp.dropped}")
+            else:
+                print(f"   HTTP接続: {http.connects} 回 / リクエスト {http.requests} 件")
+        if ring is not None:
+            print(f"   リングバッファ: 上書き・破棄 {ring.dropped} / 間引き間隔 {ring.stride}")
+        if delta is not None:
+            print(f"   変化時のみ: {delta.ticks} 周期 → {delta.records} レコード / 破棄 {delta.dropped}")
+            if delta.bytes:
+                print(f"   圧縮率（フレーム比）: {delta.ticks_out * telemetry_frame.FRAME_SIZE / delta.bytes:.1f} 倍")
+        if snap is not None:
+            print(f"   スナップショット公開スキップ: {snap.skipped}")
+        if wifi_mgr is not None:
+            wifi_mgr.report()
+        if sp is not None:
+            sp.report()
+            if spool_drain_us:
+                print(f"   再送スループット: {sp.drained * 1000000 // spool_drain_us} フレーム/s")
+        log.report()
+        sched.stats.report()
+        print(f"   最大開始間隔（送信中）: {sched.stats.max_gap_flagged}us")
+        gcc.report()
+        if gcc.enabled:
+            gcc.disable()
+        prof.report()
+        if prof.trace_count:
+            n = prof.dump_trace(TRACE_FILE)
+            print(f"   スパン {n} 件を {TRACE_FILE} に保存しました")
+        if CALIBRATE:
+            finish_calibration(levels)
         print("=" * 50)
         print("=== プログラム終了 ===")
 
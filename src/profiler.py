@@ -0,0 +1,123 @@
+import time
+from array import array
+
+HIST_BINS = 24  # bin b: 2^(b-1) <= 処理時間[us] < 2^b（bin 0 は 0us）
+
+
+def _bin(us):
+    b = 0
+    while us and b < HIST_BINS - 1:
+        us >>= 1
+        b += 1
+    return b
+
+
+class Profiler:
+    """
+    ステージごとの処理時間を time.ticks_us で計測する軽量プロファイラ
+
+    ステージ名は "グループ.名前" の形（例: "control.sensor"）。グループは
+    tools/trace_to_perfetto.py でタイムライン上のトラックになる。
+    各ステージについて回数・合計・最大と、2のべき乗区切りの固定長
+    ヒストグラムを保持する（計測時のメモリ確保なし）。
+    trace_capacity > 0 なら生のスパン（開始時刻・処理時間）も
+    リングバッファに保存し、dump_trace() でファイルに書き出せる。
+
+        t = time.ticks_us()
+        ...
+        t = prof.end(STAGE_A, t)   # STAGE_A の終了 = 次のステージの開始
+        ...
+        prof.end(STAGE_B, t)
+    """
+
+    def __init__(self, names, enabled=True, trace_capacity=0):
+        self.names = names
+        self.enabled = enabled
+        n = len(names)
+        self.count = array("I", [0] * n)
+        self.total = array("I", [0] * n)
+        self.max = array("I", [0] * n)
+        self.hist = [array("I", [0] * HIST_BINS) for _ in range(n)]
+
+        self.trace_capacity = trace_capacity
+        self.trace_stage = bytearray(trace_capacity)
+        self.trace_start = array("I", [0] * trace_capacity)
+        self.trace_dur = array("I", [0] * trace_capacity)
+        self.trace_head = 0
+        self.trace_count = 0
+
+    def end(self, stage, start):
+        """start からのスパンを stage として記録し、現在時刻を返す"""
+        now = time.ticks_us()
+        if not self.enabled:
+            return now
+        dur = time.ticks_diff(now, start)
+        self.count[stage] += 1
+        self.total[stage] += dur
+        if dur > self.max[stage]:
+            self.max[stage] = dur
+        self.hist[stage][_bin(dur)] += 1
+
+        cap = self.trace_capacity
+        if cap:
+            i = self.trace_head
+            self.trace_stage[i] = stage
+            self.trace_start[i] = start
+            self.trace_dur[i] = dur
+            self.trace_head = (i + 1) % cap
+            if self.trace_count < cap:
+                self.trace_count += 1
+        return now
+
+    def mean(self, stage):
+        c = self.count[stage]
+        return self.total[stage] // c if c else 0
+
+    def percentile(self, stage, p):
+        """ヒストグラムから p パーセンタイルの上限値[us]を求める"""
+        c = self.count[stage]
+        if not c:
+            return 0
+        target = (c * p + 99) // 100
+        seen = 0
+        hist = self.hist[stage]
+        for b in range(HIST_BINS):
+            seen += hist[b]
+            if seen >= target:
+                return min(1 << b, self.max[stage]) if b else 0
+        return self.max[stage]
+
+    def summary(self):
+        """テレメトリ用の要約 {ステージ名: [平均, p99, 最大]}（単位us）"""
+        out = {}
+        for i in range(len(self.names)):
+            if self.count[i]:
+                out[self.names[i]] = [self.mean(i), self.percentile(i, 99), self.max[i]]
+        return out
+
+    def report(self):
+        """統計情報ブロック用の行を出力"""
+        if not self.enabled:
+            return
+        print("   ステージ別処理時間 [us]（平均 / p99 / 最大 / 回数）")
+        for i in range(len(self.names)):
+            if self.count[i]:
+                print(f"     {self.names[i]:<18} {self.mean(i):>6} / {self.percentile(i, 99):>6} / {self.max[i]:>6} / {self.count[i]}")
+
+    def dump_trace(self, path):
+        """
+        保存済みのスパンを古い順にCSVで書き出す（ステージ名,開始us,処理時間us）
+
+        tools/trace_to_perfetto.py で Chrome trace / Perfetto 形式に変換できる。
+        """
+        cap = self.trace_capacity
+        n = self.trace_count
+        first = (self.trace_head - n) % cap if cap else 0
+        with open(path, "w") as f:
+            f.write("stage,start_us,dur_us\n")
+            for k in range(n):
+                i = (first + k) % cap
+                f.write("{},{},{}\n".format(
+                    self.names[self.trace_stage[i]], self.trace_start[i], self.trace_dur[i]
+                ))
+        return n
@@ -0,0 +1,173 @@
+import sys
+import time
+
+try:
+    import select
+except ImportError:
+    select = None
+
+# ログレベル
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+OFF = 100
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warn": WARN, "error": ERROR, "off": OFF}
+
+# 既定の出力先（USB-CDC）。書き込みはバイト列で行う
+try:
+    _stream = sys.stdout.buffer
+except AttributeError:
+    _stream = sys.stdout
+
+
+def _make_poll(stream):
+    # 書き込み可能か（ブロックせずに書けるか）を調べる poll。調べられなければ None
+    if select is None:
+        return None
+    try:
+        p = select.poll()
+        p.register(stream, select.POLLOUT)
+        p.poll(0)
+        return p
+    except Exception:
+        return None
+
+
+class RingLog:
+    """
+    ブロックしないログ出力（事前確保したバイト列のリングバッファ経由）
+
+    debug() / info() / warn() / error() はレベルと流量制限（rate_per_s 件/秒,
+    最大 burst 件まで連続可）を先に判定し、通った場合だけメッセージを
+    fmt.format(*args) で整形してリングバッファに書く。print() と違って出力を
+    待たないため、ホストが遅い・接続していないときの USB-CDC で制御が止まらない。
+    バッファに入りきらないメッセージは丸ごと捨てる（dropped）。
+    流量制限で捨てたものは limited に数える。
+
+    drain() を空き時間（例: 制御ステップの直後）に呼び、出力先が書き込み可能な
+    ときだけ max_bytes ずつ書き出す。捨てたメッセージがあればバッファが空に
+    なった時点で前回の通知からの件数を1行出す。flush() は残りをすべて書く（終了時用）。
+
+    debug() の呼び出しは `if __debug__:` で囲むと、micropython.opt_level(1) 以上
+    （または mpy-cross -O1）でコンパイルしたときに呼び出しごと取り除かれる。
+    制御ステップ（ソフトIRQ）からは呼ばない前提（書き込み側は1つのコンテキスト）。
+    stream は write() を持つ出力先（省略時は USB-CDC の sys.stdout）。
+    """
+
+    def __init__(self, capacity=2048, level=INFO, rate_per_s=20, burst=10, stream=None):
+        self.capacity = capacity
+        self.level = level
+        self.buf = bytearray(capacity)
+        self.mv = memoryview(self.buf)
+        self.head = 0       # 次に書く位置
+        self.tail = 0       # 次に出力する位置
+        self.count = 0      # 未出力のバイト数
+        self.stream = _stream if stream is None else stream
+        self.poll = _make_poll(self.stream)
+        # 流量制限（1/1000件単位のトークン）
+        self.rate = rate_per_s
+        self.burst = burst * 1000
+        self.tokens = self.burst
+        self.last_ms = time.ticks_ms()
+        # 統計
+        self.messages = 0   # バッファに書いたメッセージ数
+        self.dropped = 0    # バッファが一杯で捨てた数
+        self.limited = 0    # 流量制限で捨てた数
+        self.bytes_out = 0
+        self.blocked = 0    # 出力先が書き込み不可で見送った drain() の回数
+        self.noted = 0      # 破棄件数の通知済み分
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, fmt, *args):
+        if level < self.level:
+            return
+        now = time.ticks_ms()
+        tokens = self.tokens + time.ticks_diff(now, self.last_ms) * self.rate
+        self.last_ms = now
+        if tokens > self.burst:
+            tokens = self.burst
+        if tokens < 1000:
+            self.tokens = tokens
+            self.limited += 1
+            return
+        self.tokens = tokens - 1000
+        # 整形はここで初めて行う（捨てるメッセージは整形しない）
+        text = fmt.format(*args) if args else fmt
+        self._put("{:>8} {}\n".format(now, text).encode())
+
+    def debug(self, fmt, *args):
+        self.log(DEBUG, fmt, *args)
+
+    def info(self, fmt, *args):
+        self.log(INFO, fmt, *args)
+
+    def warn(self, fmt, *args):
+        self.log(WARN, fmt, *args)
+
+    def error(self, fmt, *args):
+        self.log(ERROR, fmt, *args)
+
+    def _put(self, data):
+        n = len(data)
+        if n > self.capacity - self.count:
+            self.dropped += 1
+            return
+        head = self.head
+        first = self.capacity - head
+        if n <= first:
+            self.buf[head:head + n] = data
+        else:
+            self.buf[head:] = data[:first]
+            self.buf[:n - first] = data[first:]
+        self.head = (head + n) % self.capacity
+        self.count += n
+        self.messages += 1
+
+    def _write(self, n):
+        # tail から n バイト（折り返さない範囲）を出力
+        written = self.stream.write(self.mv[self.tail:self.tail + n])
+        if written is None:
+            written = n
+        self.tail = (self.tail + written) % self.capacity
+        self.count -= written
+        self.bytes_out += written
+        return written
+
+    def drain(self, max_bytes=64):
+        """出力先が書き込み可能なら最大 max_bytes を出力し、出力したバイト数を返す"""
+        if self.count == 0:
+            lost = self.dropped + self.limited
+            if lost == self.noted:
+                return 0
+            self._put("{:>8} （ログ {} 件破棄）\n".format(time.ticks_ms(), lost - self.noted).encode())
+            self.noted = lost
+        if self.poll is not None and not self.poll.poll(0):
+            self.blocked += 1
+            return 0
+        n = self.count
+        if n > max_bytes:
+            n = max_bytes
+        first = self.capacity - self.tail
+        if n > first:
+            n = first
+        return self._write(n)
+
+    def flush(self):
+        """残りをすべて出力（ブロックする。終了時用）"""
+        while self.count or self.dropped + self.limited != self.noted:
+            if self.count == 0:
+                self.drain()
+                continue
+            n = self.capacity - self.tail
+            if n > self.count:
+                n = self.count
+            self._write(n)
+
+    def report(self):
+        """統計情報ブロック用の行を出力"""
+        print(f"   ログ: {self.messages} 件 / {self.bytes_out} バイト出力 / 破棄 {self.dropped}（バッファ満杯）+ {self.limited}（流量制限）")
+        print(f"   ログ出力の見送り（書き込み不可）: {self.blocked} 回")
@@ -0,0 +1,146 @@
+import io
+import _thread
+import telemetry_frame
+
+try:
+    import deflate
+except ImportError:
+    deflate = None
+    import zlib
+
+# オーバーフロー時の方針
+DROP_OLDEST = "drop_oldest"  # 最も古いサンプルを上書き
+DECIMATE = "decimate"        # 保存済みを1つおきに間引き、以降の記録間隔を2倍にする（compact() で）
+
+FRAME_SIZE = telemetry_frame.FRAME_SIZE
+
+
+class SampleRing:
+    """
+    制御ループの全サンプルを記録するリングバッファ
+
+    各サンプルは telemetry_frame 形式のフレームとして、起動時に確保した
+    bytearray に直接書き込む（push() でのメモリ確保なし）。
+    シーケンス番号は記録しなかったサンプルも含めて毎回進むため、
+    ホスト側で間引き・欠落を判別できる。
+
+    push() と read_into() はロックで排他する。push() はロックを待たず、
+    取れなければそのサンプルを捨てる（割り込み・別コアから呼ばれても
+    制御ループを止めないため）。
+
+    DECIMATE の間引きは全サンプルのコピー（容量に比例, メモリ確保あり）になるため
+    push() では行わない。満杯になると pending を立ててサンプルを捨て、制御ステップの
+    外から compact() を呼んだときに間引く。
+    """
+
+    def __init__(self, capacity, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DECIMATE):
+            raise ValueError("未対応のオーバーフロー方針: " + policy)
+        self.capacity = capacity
+        self.policy = policy
+        self.buf = bytearray(capacity * FRAME_SIZE)
+        self.mv = memoryview(self.buf)
+        self.head = 0      # 次に書き込む位置
+        self.count = 0     # 保存中のサンプル数
+        self.seq = 0
+        self.stride = 1    # 記録間隔（DECIMATE時に増える）
+        self.skip = 0
+        self.pending = False  # DECIMATE: 満杯になり compact() 待ち
+        self.dropped = 0   # DROP_OLDEST で上書き、間引き待ち、またはロック競合で捨てた数
+        self.lock = _thread.allocate_lock()
+
+    def push(self, ticks, sensor_mask, left, right, error_q, turn, base_speed):
+        """1制御周期分のサンプルを追加（error_q は error × ERROR_SCALE の整数）"""
+        seq = self.seq
+        self.seq = (seq + 1) & 0xFFFF
+
+        if self.stride > 1:
+            self.skip += 1
+            if self.skip < self.stride:
+                return
+            self.skip = 0
+
+        if not self.lock.acquire(0):
+            self.dropped += 1
+            return
+
+        if self.count == self.capacity:
+            self.dropped += 1
+            if self.policy == DROP_OLDEST:
+                self.count -= 1
+            else:
+                self.pending = True
+                self.lock.release()
+                return
+
+        telemetry_frame.encode_q_into(
+            self.buf, self.head * FRAME_SIZE, seq, ticks, sensor_mask,
+            left, right, error_q, turn, base_speed
+        )
+        self.head = (self.head + 1) % self.capacity
+        self.count += 1
+        self.lock.release()
+
+    def compact(self):
+        """満杯で間引き待ちなら間引く（制御ステップの外で呼ぶ）。間引いたら True"""
+        if not self.pending:
+            return False
+        with self.lock:
+            self.pending = False
+            if self.count < self.capacity:
+                # 送信で空きができた
+                return False
+            self._decimate()
+            return True
+
+    def _decimate(self):
+        # 論理位置 2j+1 → j へ前から詰める（書き込み先は常に未読の読み出し元より前）
+        cap = self.capacity
+        tail = (self.head - self.count) % cap
+        kept = self.count // 2
+        mv = self.mv
+        for j in range(kept):
+            src = ((tail + 2 * j + 1) % cap) * FRAME_SIZE
+            dst = ((tail + j) % cap) * FRAME_SIZE
+            mv[dst:dst + FRAME_SIZE] = mv[src:src + FRAME_SIZE]
+        self.count = kept
+        self.head = (tail + kept) % cap
+        self.stride *= 2
+        self.skip = 0
+
+    def read_into(self, out, max_frames):
+        """
+        古い順に最大 max_frames 個のフレームを out にコピーして取り除く
+
+        コピーしたフレーム数を返す。空になったら記録間隔を元に戻す。
+        """
+        with self.lock:
+            return self._read_into(out, max_frames)
+
+    def _read_into(self, out, max_frames):
+        n = min(self.count, max_frames, len(out) // FRAME_SIZE)
+        cap = self.capacity
+        tail = (self.head - self.count) % cap
+        first = min(n, cap - tail)
+        out[0:first * FRAME_SIZE] = self.mv[tail * FRAME_SIZE:(tail + first) * FRAME_SIZE]
+        rest = n - first
+        if rest:
+            out[first * FRAME_SIZE:n * FRAME_SIZE] = self.mv[0:rest * FRAME_SIZE]
+        self.count -= n
+        if n:
+            self.pending = False
+        if self.count == 0:
+            self.stride = 1
+            self.skip = 0
+        return n
+
+
+def compress(data):
+    """バッチをzlib形式で圧縮（HTTPの Content-Encoding: deflate）"""
+    if deflate is None:
+        return zlib.compress(data)
+    out = io.BytesIO()
+    d = deflate.DeflateIO(out, deflate.ZLIB, 10)
+    d.write(data)
+    d.close()
+    return out.getvalue()
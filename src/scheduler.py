@@ -0,0 +1,171 @@
+import time
+
+try:
+    import micropython
+    from machine import Timer
+except ImportError:
+    micropython = None
+    Timer = None
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+
+class JitterStats:
+    """
+    固定周期実行の統計（単位はすべてマイクロ秒）
+
+    - 周期ジッタ: 実際のステップ開始間隔と公称周期の差の絶対値
+    - オーバーラン: ステップの実行時間が周期を超えた回数
+    - デッドライン未達: 開始間隔が2周期以上空き、実行されなかった周期の数
+    flagged を True にしている間の最大開始間隔は max_gap_flagged に別途記録する
+    （例: テレメトリ送信中）。
+    """
+
+    def __init__(self, period_us):
+        self.period_us = period_us
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.last_start = 0
+        self.last_gap = 0
+        self.min_gap = 0
+        self.max_gap = 0
+        self.max_gap_flagged = 0
+        self.jitter_sum = 0
+        self.max_jitter = 0
+        self.max_exec = 0
+        self.overruns = 0
+        self.missed = 0
+        self.flagged = False
+
+    def record(self, start_us, end_us):
+        period = self.period_us
+        exec_us = time.ticks_diff(end_us, start_us)
+        if exec_us > self.max_exec:
+            self.max_exec = exec_us
+        if exec_us > period:
+            self.overruns += 1
+
+        if self.count > 0:
+            gap = time.ticks_diff(start_us, self.last_start)
+            self.last_gap = gap
+            if gap > self.max_gap:
+                self.max_gap = gap
+            if self.count == 1 or gap < self.min_gap:
+                self.min_gap = gap
+            if self.flagged and gap > self.max_gap_flagged:
+                self.max_gap_flagged = gap
+            jitter = gap - period if gap > period else period - gap
+            self.jitter_sum += jitter
+            if jitter > self.max_jitter:
+                self.max_jitter = jitter
+            if gap >= 2 * period:
+                self.missed += gap // period - 1
+        self.last_start = start_us
+        self.count += 1
+
+    def mean_jitter(self):
+        return self.jitter_sum // (self.count - 1) if self.count > 1 else 0
+
+    def report(self):
+        """統計情報ブロック用の行を出力"""
+        print(f"   制御ステップ: {self.count} 回 (周期 {self.period_us}us)")
+        print(f"   開始間隔: 最小 {self.min_gap}us / 最大 {self.max_gap}us")
+        print(f"   周期ジッタ: 平均 {self.mean_jitter()}us / 最大 {self.max_jitter}us")
+        print(f"   実行時間: 最大 {self.max_exec}us")
+        print(f"   オーバーラン: {self.overruns} / デッドライン未達: {self.missed}")
+
+
+class FixedRateScheduler:
+    """
+    step() を hz の固定レートで呼び出すスケジューラ
+
+    start_timer(): machine.Timer の周期割り込みから micropython.schedule で
+        ステップを予約する（ソフトIRQ）。前のステップが終わっていない周期は
+        実行せず、デッドライン未達として統計に現れる。
+    run_async(): Timer を使えない場合の uasyncio タスク版（ms単位の精度）。
+    run_blocking(): 他の処理を一切しないループ版（us単位, デュアルコア時のコア0用）。
+
+    after を渡すと、各ステップの統計を記録した後に after(開始時刻us) を呼ぶ
+    （例: idle_gc.IdleCollector.after_step でステップ直後の空き時間にGC）。
+    """
+
+    def __init__(self, hz, step, after=None):
+        self.hz = hz
+        self.period_us = 1000000 // hz
+        self.step = step
+        self.after = after
+        self.stats = JitterStats(self.period_us)
+        self.timer = None
+        self.pending = False
+        # 割り込み内でのメモリ確保を避けるため、バウンドメソッドを事前に作っておく
+        self._run_ref = self._run
+
+    def _run(self, _):
+        start = time.ticks_us()
+        self.step()
+        self.stats.record(start, time.ticks_us())
+        if self.after is not None:
+            self.after(start)
+        self.pending = False
+
+    def slack_us(self):
+        """次のステップまでの残り時間[us]（ステップ実行待ちなら 0, ログ出力などの空き時間判定用）"""
+        if self.pending:
+            return 0
+        return self.period_us - time.ticks_diff(time.ticks_us(), self.stats.last_start) % self.period_us
+
+    def _irq(self, _timer):
+        if self.pending:
+            return
+        self.pending = True
+        try:
+            micropython.schedule(self._run_ref, None)
+        except RuntimeError:
+            # スケジュールキューが一杯
+            self.pending = False
+
+    def start_timer(self):
+        self.timer = Timer(mode=Timer.PERIODIC, freq=self.hz, callback=self._irq)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+
+    async def run_async(self):
+        period_ms = max(1, self.period_us // 1000)
+        next_tick = time.ticks_ms()
+        while True:
+            self._run(None)
+            # 処理時間を差し引いて次の周期まで待つ
+            next_tick = time.ticks_add(next_tick, period_ms)
+            delay = time.ticks_diff(next_tick, time.ticks_ms())
+            if delay < 0:
+                # 周期超過 - 遅れを取り戻そうとせず基準を更新
+                next_tick = time.ticks_ms()
+                delay = 0
+            await asyncio.sleep_ms(delay)
+
+    def run_blocking(self, duration_ms=None):
+        """
+        ステップだけを固定レートで実行し続ける
+
+        duration_ms を指定するとその時間で戻る（ベンチマーク用）。
+        """
+        period = self.period_us
+        start = time.ticks_ms()
+        next_tick = time.ticks_us()
+        while duration_ms is None or time.ticks_diff(time.ticks_ms(), start) < duration_ms:
+            self._run(None)
+            next_tick = time.ticks_add(next_tick, period)
+            delay = time.ticks_diff(next_tick, time.ticks_us())
+            if delay > 0:
+                time.sleep_us(delay)
+            else:
+                next_tick = time.ticks_us()
+
@@ -0,0 +1,86 @@
+import sys
+
+try:
+    from machine import Pin, mem32
+except ImportError:
+    Pin = None
+    mem32 = None
+
+# RP2040 SIO の GPIO_IN レジスタ（全GPIOの入力値, bit n = GPIOn）
+GPIO_IN_ADDR = 0xD0000004
+
+
+def build_gather(pins):
+    """
+    GPIO_IN の値をセンサービットマスクに並べ替えるテーブルを作る
+
+    レジスタを8bitずつ区切り、センサーのピンを含む区間ごとに
+    256要素のテーブル（区間の値 → マスクへの寄与）を用意する。
+    読み取り時は区間の数だけ表引きしてORを取ればよい。
+    戻り値は (シフト量, テーブル) のリスト。
+    """
+    lanes = []
+    for shift in range(0, 32, 8):
+        members = [(i, p - shift) for i, p in enumerate(pins) if shift <= p < shift + 8]
+        if not members:
+            continue
+        lut = bytearray(256)
+        for value in range(256):
+            m = 0
+            for i, bit in members:
+                if (value >> bit) & 1:
+                    m |= 1 << i
+            lut[value] = m
+        lanes.append((shift, lut))
+    return lanes
+
+
+class SensorArray:
+    """
+    フォトリフレクタ8個をまとめて読み取り、8bitのパターンを返す
+
+    read() の戻り値は bit i = センサー i の値（0 = 黒）。
+    RP2040 では GPIO_IN レジスタを machine.mem32 で1回読むだけで全センサーを
+    取得する。mem32 が使えない環境では Pin.value() を1本ずつ読む従来の方法に
+    切り替わる。mem / pin_factory を渡せばホストPC上で偽のレジスタ・ピンを使える。
+    """
+
+    def __init__(self, pins, mem=None, pin_factory=None, bulk=None):
+        self.pins = pins
+        if pin_factory is None:
+            pin_factory = lambda p: Pin(p, Pin.IN, Pin.PULL_UP)
+        # プルアップ設定のため、一括読み取り時もピンは初期化しておく
+        self.sensors = [pin_factory(p) for p in pins]
+
+        self.mem = mem if mem is not None else mem32
+        if bulk is None:
+            bulk = self.mem is not None and (mem is not None or sys.platform == "rp2")
+        self.bulk = bulk
+        self.lanes = build_gather(pins)
+
+    def read_bulk(self):
+        """GPIO_IN を1回読んでパターンを返す"""
+        reg = self.mem[GPIO_IN_ADDR]
+        mask = 0
+        for shift, lut in self.lanes:
+            mask |= lut[(reg >> shift) & 0xFF]
+        return mask
+
+    def read_pins(self):
+        """Pin.value() を1本ずつ読んでパターンを返す（フォールバック）"""
+        sensors = self.sensors
+        mask = 0
+        for i in range(len(sensors)):
+            if sensors[i].value():
+                mask |= 1 << i
+        return mask
+
+    def read(self):
+        if self.bulk:
+            return self.read_bulk()
+        return self.read_pins()
+
+
+def unpack(mask, count=8):
+    """パターンをセンサー値のリストに戻す（表示・JSON用）"""
+    return [(mask >> i) & 1 for i in range(count)]
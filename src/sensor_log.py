@@ -0,0 +1,88 @@
+import struct
+
+try:
+    from time import ticks_diff
+except ImportError:
+    def ticks_diff(a, b):
+        return a - b
+
+# センサーパターン記録ファイル（リトルエンディアン）
+#
+#   ヘッダ（8バイト）
+#   0   4s   MAGIC
+#   4   u32  最初のレコードの time.ticks_ms()
+#
+#   レコード（3バイト, 以降ファイル末尾まで）
+#   0   u16  前のレコードからの経過時間[ms]（最初のレコードは0, 65535で頭打ち）
+#   2   u8   センサー値のビットマスク（bit i = センサー i の値, 0 = 黒）
+MAGIC = b"SLG1"
+HEADER_FORMAT = "<4sI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_FORMAT = "<HB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+MAX_DELTA = 0xFFFF
+
+
+class Recorder:
+    """
+    センサーパターンをファイルに記録する
+
+    レコードは起動時に確保したバッファに溜め、一杯になったときだけ
+    まとめて書き込む（フラッシュへの書き込み回数を減らすため）。
+    """
+
+    def __init__(self, path, buffer_records=256):
+        self.f = open(path, "wb")
+        self.buf = bytearray(buffer_records * RECORD_SIZE)
+        self.capacity = buffer_records
+        self.n = 0
+        self.count = 0
+        self.last_ticks = None
+
+    def append(self, ticks_ms, mask):
+        if self.last_ticks is None:
+            self.f.write(struct.pack(HEADER_FORMAT, MAGIC, ticks_ms & 0xFFFFFFFF))
+            dt = 0
+        else:
+            dt = ticks_diff(ticks_ms, self.last_ticks)
+            if dt < 0:
+                dt = 0
+            elif dt > MAX_DELTA:
+                dt = MAX_DELTA
+        self.last_ticks = ticks_ms
+        struct.pack_into(RECORD_FORMAT, self.buf, self.n * RECORD_SIZE, dt, mask)
+        self.n += 1
+        self.count += 1
+        if self.n == self.capacity:
+            self.flush()
+
+    def flush(self):
+        if self.n:
+            self.f.write(memoryview(self.buf)[:self.n * RECORD_SIZE])
+            self.n = 0
+        self.f.flush()
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+
+def iter_records(data):
+    """記録データから (開始からの経過ms, マスク) を順に返す"""
+    if len(data) < HEADER_SIZE:
+        return
+    magic, _start = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if magic != MAGIC:
+        raise ValueError("センサー記録ファイルではありません")
+    t = 0
+    end = HEADER_SIZE + (len(data) - HEADER_SIZE) // RECORD_SIZE * RECORD_SIZE
+    for offset in range(HEADER_SIZE, end, RECORD_SIZE):
+        dt, mask = struct.unpack_from(RECORD_FORMAT, data, offset)
+        t += dt
+        yield t, mask
+
+
+def load(path):
+    """ファイルを読み込み [(経過ms, マスク), ...] を返す"""
+    with open(path, "rb") as f:
+        return list(iter_records(f.read()))
@@ -0,0 +1,58 @@
+import _thread
+from array import array
+
+# スナップショットの各要素の位置
+S_TICKS = 0   # time.ticks_ms()
+S_MASK = 1    # センサービットマスク
+S_LEFT = 2    # 左モーターduty
+S_RIGHT = 3   # 右モーターduty
+S_ERROR = 4   # 誤差（× control.ERROR_DEN）
+S_TURN = 5    # turn（クリップ前）
+S_SEQ = 6     # 公開回数（制御ステップごとに+1）
+S_SIZE = 7
+
+
+def new_state():
+    """スナップショットの受け取り用配列"""
+    return array("i", [0] * S_SIZE)
+
+
+class Snapshot:
+    """
+    コア間で最新の制御状態を受け渡すダブルバッファ
+
+    書き込み側（コア0の制御ループ）は裏バッファに書いてから、ロックを
+    取れたときだけ表裏を入れ替える。ロックが読み出し側に取られていれば
+    待たずに入れ替えを諦める（skipped に数え、次の周期で再度公開する）。
+    読み出し側（コア1）はロックを取って表バッファをコピーする。
+    """
+
+    def __init__(self):
+        self.bufs = (new_state(), new_state())
+        self.front = 0
+        self.lock = _thread.allocate_lock()
+        self.seq = 0
+        self.skipped = 0
+
+    def publish(self, ticks, mask, left, right, error, turn):
+        back = self.bufs[1 - self.front]
+        back[S_TICKS] = ticks
+        back[S_MASK] = mask
+        back[S_LEFT] = left
+        back[S_RIGHT] = right
+        back[S_ERROR] = error
+        back[S_TURN] = turn
+        self.seq = (self.seq + 1) & 0x3FFFFFFF  # small int の範囲に収める
+        back[S_SEQ] = self.seq
+        if self.lock.acquire(0):
+            self.front = 1 - self.front
+            self.lock.release()
+        else:
+            self.skipped += 1
+
+    def read_into(self, out):
+        """最新のスナップショットを out（new_state() の配列）にコピー"""
+        with self.lock:
+            front = self.bufs[self.front]
+            for i in range(S_SIZE):
+                out[i] = front[i]
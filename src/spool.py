@@ -0,0 +1,139 @@
+import os
+import time
+import telemetry_frame
+
+FRAME_SIZE = telemetry_frame.FRAME_SIZE
+
+
+class Spool:
+    """
+    WiFi切断中のテレメトリをフラッシュ（littlefs）に溜めるスプール
+
+    write() されたフレームはまずRAMのバッファに溜め、buffer_frames 個
+    （既定で約4KB = littlefs の1ブロック）ごとにまとめて追記する。
+    ファイルは segment_frames 個ごとに新しくし（path/00000001.bin, ...）、
+    合計が max_bytes を超えたら古いファイルから削除する（dropped に数える）。
+    再起動後も残っているファイルは引き続き送信対象になる。
+
+    読み出しは read_into() で古い順に取り出し、送信に成功したら commit() で
+    消費済みにする（失敗時は commit しなければ次回同じフレームを読む）。
+    読み終えたファイルは書き込み中のものでも削除する（バッファの残りは次の
+    flush() で新しいファイルに書く）。読み出し位置は保存しないため、再起動で
+    送り直すのは読みかけのファイルの送信済み部分だけになる。
+    """
+
+    def __init__(self, path="spool", max_bytes=131072, segment_frames=908, buffer_frames=227):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_frames * FRAME_SIZE
+        self.buf = bytearray(buffer_frames * FRAME_SIZE)
+        self.buffered = 0          # バッファ中のバイト数
+        self.read_offset = 0       # 最も古いファイルの読み出し済みバイト数
+
+        # 統計
+        self.written = 0           # フラッシュに書いたフレーム数
+        self.dropped = 0           # 容量超過で削除したフレーム数
+        self.drained = 0           # commit() 済みのフレーム数
+        self.writes = 0            # ファイル書き込み回数
+        self.write_us_total = 0
+        self.write_us_max = 0
+
+        try:
+            os.mkdir(path)
+        except OSError:
+            pass
+        self.segments = sorted(int(name[:-4]) for name in os.listdir(path) if name.endswith(".bin"))
+        self.sizes = {seq: os.stat(self._name(seq))[6] for seq in self.segments}
+        self.total = sum(self.sizes.values())
+
+    def _name(self, seq):
+        return "{}/{:08d}.bin".format(self.path, seq)
+
+    def write(self, data):
+        """フレーム（FRAME_SIZE の倍数バイト）を追加"""
+        mv = memoryview(data)
+        n = len(mv)
+        pos = 0
+        while pos < n:
+            room = len(self.buf) - self.buffered
+            k = min(room, n - pos)
+            self.buf[self.buffered:self.buffered + k] = mv[pos:pos + k]
+            self.buffered += k
+            pos += k
+            if self.buffered == len(self.buf):
+                self.flush()
+
+    def flush(self):
+        """バッファの内容をファイルに追記"""
+        if not self.buffered:
+            return
+        if not self.segments or self.sizes[self.segments[-1]] >= self.segment_bytes:
+            seq = self.segments[-1] + 1 if self.segments else 1
+            self.segments.append(seq)
+            self.sizes[seq] = 0
+        seq = self.segments[-1]
+
+        start = time.ticks_us()
+        with open(self._name(seq), "ab") as f:
+            f.write(memoryview(self.buf)[:self.buffered])
+        dur = time.ticks_diff(time.ticks_us(), start)
+        self.writes += 1
+        self.write_us_total += dur
+        if dur > self.write_us_max:
+            self.write_us_max = dur
+
+        self.sizes[seq] += self.buffered
+        self.total += self.buffered
+        self.written += self.buffered // FRAME_SIZE
+        self.buffered = 0
+
+        while self.total > self.max_bytes and len(self.segments) > 1:
+            self._remove_oldest(count_dropped=True)
+
+    def _remove_oldest(self, count_dropped):
+        seq = self.segments.pop(0)
+        size = self.sizes.pop(seq)
+        if count_dropped:
+            self.dropped += (size - self.read_offset) // FRAME_SIZE
+        self.total -= size
+        self.read_offset = 0
+        try:
+            os.remove(self._name(seq))
+        except OSError:
+            pass
+
+    def pending(self):
+        """未送信のフレーム数（バッファ分を含む）"""
+        return (self.total - self.read_offset + self.buffered) // FRAME_SIZE
+
+    def read_into(self, out):
+        """
+        最も古いファイルから out に入るだけフレームを読み、個数を返す
+
+        1回の読み出しはファイルをまたがない。
+        """
+        if not self.segments:
+            return 0
+        seq = self.segments[0]
+        size = self.sizes[seq]
+        n = min(size - self.read_offset, len(out)) // FRAME_SIZE
+        if n == 0:
+            return 0
+        with open(self._name(seq), "rb") as f:
+            f.seek(self.read_offset)
+            f.readinto(memoryview(out)[:n * FRAME_SIZE])
+        return n
+
+    def commit(self, n):
+        """直前に read_into() した n フレームを消費済みにする"""
+        self.read_offset += n * FRAME_SIZE
+        self.drained += n
+        # 読み終えたら削除（書き込み中のファイルなら次の flush() で作り直す）
+        if self.read_offset >= self.sizes[self.segments[0]]:
+            self._remove_oldest(count_dropped=False)
+
+    def report(self):
+        """統計情報ブロック用の行を出力"""
+        mean = self.write_us_total // self.writes if self.writes else 0
+        print(f"   スプール: 書き込み {self.written} / 再送 {self.drained} / 破棄 {self.dropped} / 未送信 {self.pending()} フレーム")
+        print(f"   フラッシュ書き込み: {self.writes} 回, 平均 {mean}us / 最大 {self.write_us_max}us")
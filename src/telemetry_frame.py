@@ -0,0 +1,77 @@
+import struct
+
+# バイナリテレメトリフレーム（リトルエンディアン, 18バイト）
+#
+#   オフセット 型   内容
+#   0         u8   フォーマットバージョン（FRAME_VERSION）
+#   1         u16  シーケンス番号（0xFFFFの次は0）
+#   3         u32  time.ticks_ms()
+#   7         u8   センサー値のビットマスク（bit i = センサー i の値）
+#   8         u16  左モーターduty
+#   10        u16  右モーターduty
+#   12        i16  error  × ERROR_SCALE（Q8.8固定小数点）
+#   14        i16  turn  >> TURN_SHIFT
+#   16        u16  BASE_SPEED
+FRAME_VERSION = 1
+FRAME_FORMAT = "<BHIBHHhhH"
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)
+
+ERROR_SCALE = 256
+TURN_SHIFT = 2
+
+CONTENT_TYPE = "application/octet-stream"
+
+
+def pack_sensors(values):
+    """センサー値のリストを8bitのビットマスクに変換"""
+    mask = 0
+    for i in range(len(values)):
+        if values[i]:
+            mask |= 1 << i
+    return mask
+
+
+def _clamp_i16(v):
+    if v > 32767:
+        return 32767
+    if v < -32768:
+        return -32768
+    return v
+
+
+def encode_into(buf, offset, seq, ticks, sensor_mask, left, right, error, turn, base_speed):
+    """
+    buf[offset:] にフレームを1つ書き込み、書き込んだバイト数を返す
+
+    buf は事前確保した bytearray を想定（送信ごとの確保を避ける）。
+    """
+    return encode_q_into(buf, offset, seq, ticks, sensor_mask, left, right,
+                         int(error * ERROR_SCALE), turn, base_speed)
+
+
+def encode_q_into(buf, offset, seq, ticks, sensor_mask, left, right, error_q, turn, base_speed):
+    """
+    encode_into() の error を × ERROR_SCALE の整数で渡す版
+
+    浮動小数点を使わないため、制御ループから呼んでもメモリを確保しない。
+    """
+    struct.pack_into(
+        FRAME_FORMAT, buf, offset,
+        FRAME_VERSION,
+        seq & 0xFFFF,
+        ticks & 0xFFFFFFFF,
+        sensor_mask & 0xFF,
+        left,
+        right,
+        _clamp_i16(error_q),
+        _clamp_i16(turn >> TURN_SHIFT),
+        base_speed,
+    )
+    return FRAME_SIZE
+
+
+def encode(seq, ticks, sensor_mask, left, right, error, turn, base_speed):
+    """フレームを新しい bytearray として返す"""
+    buf = bytearray(FRAME_SIZE)
+    encode_into(buf, 0, seq, ticks, sensor_mask, left, right, error, turn, base_speed)
+    return buf
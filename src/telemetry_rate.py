@@ -0,0 +1,112 @@
+class RateController:
+    """
+    送信結果と空きヒープからテレメトリの送信間隔・バッチサイズを決める
+
+    update() を送信ごとに呼ぶ。送信の所要時間（通信待ちを含む）・成否と
+    gc.mem_free() を見て、次の送信までの間隔とバッチサイズを範囲内で調整する。
+
+    - 失敗、または空きヒープが heap_low 未満: 間隔を2倍、バッチを半分にする
+    - 所要時間が間隔の busy_percent% を超える: 所要時間がちょうど busy_percent% に
+      なるまで間隔を延ばす（通信が送信タスクの時間を占有しないように）
+    - それ以外: 所要時間が収まる範囲で間隔を 1/8 ずつ縮め、送りきれなかった
+      サンプルが残っていればバッチを 1.5 倍にする
+
+    所要時間と失敗率は指数移動平均で保持し、統計とテレメトリに出す。整数の切り捨てで
+    平均が入力に届かなくならないよう、平均 × 係数の和（_latency_sum, _fail_sum）で持つ。
+    """
+
+    def __init__(self, interval_ms, min_interval_ms, max_interval_ms,
+                 batch, min_batch, max_batch, heap_low, busy_percent=50):
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.heap_low = heap_low
+        self.busy_percent = busy_percent
+        self.interval_ms = self._clamp(interval_ms, min_interval_ms, max_interval_ms)
+        self.batch = self._clamp(batch, min_batch, max_batch)
+
+        self.latency_ms = 0        # 所要時間の移動平均（1/4）
+        self.fail_percent = 0      # 失敗率[%]の移動平均（1/8）
+        self._latency_sum = 0      # latency_ms × 4
+        self._fail_sum = 0         # fail_percent × 8
+        self.mem_free = None       # 直近の gc.mem_free()
+
+        # 統計
+        self.updates = 0
+        self.backoffs = 0          # 失敗・ヒープ不足で間隔を延ばした回数
+        self.slowdowns = 0         # 所要時間で間隔を延ばした回数
+        self.latency_max_ms = 0
+        self.mem_free_min = None
+        self.interval_min_seen = self.interval_ms
+        self.interval_max_seen = self.interval_ms
+
+    @staticmethod
+    def _clamp(v, lo, hi):
+        if v < lo:
+            return lo
+        if v > hi:
+            return hi
+        return v
+
+    def update(self, ok, latency_ms, mem_free=None, backlog=0):
+        """
+        送信1回分の結果を反映し、次の送信間隔[ms]を返す
+
+        mem_free は gc.mem_free()（測れない環境では None）、backlog は送信後に
+        残っているサンプル数（バッチ送信時）。
+        """
+        self.updates += 1
+        if self.updates == 1:
+            self._latency_sum = latency_ms * 4
+        else:
+            self._latency_sum += latency_ms - self._latency_sum // 4
+        self._fail_sum += (0 if ok else 100) - self._fail_sum // 8
+        self.latency_ms = self._latency_sum // 4
+        self.fail_percent = self._fail_sum // 8
+        if latency_ms > self.latency_max_ms:
+            self.latency_max_ms = latency_ms
+        self.mem_free = mem_free
+        if mem_free is not None and (self.mem_free_min is None or mem_free < self.mem_free_min):
+            self.mem_free_min = mem_free
+
+        interval = self.interval_ms
+        batch = self.batch
+        if not ok or (mem_free is not None and mem_free < self.heap_low):
+            interval *= 2
+            batch //= 2
+            self.backoffs += 1
+        elif latency_ms * 100 > interval * self.busy_percent:
+            interval = latency_ms * 100 // self.busy_percent
+            self.slowdowns += 1
+        else:
+            # 縮めた後も所要時間が busy_percent% 以内に収まる場合だけ縮める（行き来を防ぐ）
+            shorter = interval - interval // 8
+            if latency_ms * 100 <= shorter * self.busy_percent:
+                interval = shorter
+            if backlog > 0:
+                batch += batch // 2
+
+        self.interval_ms = self._clamp(interval, self.min_interval_ms, self.max_interval_ms)
+        self.batch = self._clamp(batch, self.min_batch, self.max_batch)
+        if self.interval_ms < self.interval_min_seen:
+            self.interval_min_seen = self.interval_ms
+        if self.interval_ms > self.interval_max_seen:
+            self.interval_max_seen = self.interval_ms
+        return self.interval_ms
+
+    def summary(self):
+        """テレメトリ用の要約 dict"""
+        return {
+            "interval_ms": self.interval_ms,
+            "batch": self.batch,
+            "latency_ms": self.latency_ms,
+            "fail_percent": self.fail_percent,
+            "mem_free": self.mem_free,
+        }
+
+    def report(self):
+        """統計情報ブロック用の行を出力"""
+        print(f"   送信間隔: 現在 {self.interval_ms}ms（範囲 {self.interval_min_seen}〜{self.interval_max_seen}ms）/ バッチ {self.batch}")
+        print(f"   送信所要時間: 平均 {self.latency_ms}ms / 最大 {self.latency_max_ms}ms / 失敗率 {self.fail_percent}%")
+        print(f"   間隔の延長: 失敗・ヒープ不足 {self.backoffs} 回 / 所要時間 {self.slowdowns} 回 / 最小空きヒープ {self.mem_free_min}")
@@ -0,0 +1,38 @@
+import socket
+import telemetry_frame
+
+
+class UDPSender:
+    """
+    テレメトリフレームをUDPで送りっぱなしにする送信器
+
+    ソケットはノンブロッキングで、送信できなかったフレームは待たずに
+    捨てて dropped に数える。宛先アドレスは生成時に一度だけ解決する
+    （WiFi接続後に生成すること）。受信側は tools/udp_receiver.py。
+    """
+
+    def __init__(self, host, port):
+        self.addr = socket.getaddrinfo(host, port, 0, socket.SOCK_DGRAM)[0][-1]
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.buf = bytearray(telemetry_frame.FRAME_SIZE)
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, ticks, sensor_mask, left, right, error_q, turn, base_speed):
+        """フレームを1つ送信（ブロックしない, error_q は error × ERROR_SCALE の整数）"""
+        telemetry_frame.encode_q_into(
+            self.buf, 0, self.seq, ticks, sensor_mask,
+            left, right, error_q, turn, base_speed
+        )
+        self.seq = (self.seq + 1) & 0xFFFF
+        try:
+            self.sock.sendto(self.buf, self.addr)
+            self.sent += 1
+        except OSError:
+            # 送信バッファが一杯など（EAGAIN/ENOMEM）
+            self.dropped += 1
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,113 @@
+import time
+import network
+
+# 接続状態
+OFF = 0          # 無線が未起動（activate() 待ち）
+IDLE = 1         # 次のステップで接続開始
+CONNECTING = 2   # 接続待ち
+CONNECTED = 3
+BACKOFF = 4      # 失敗後の待機
+
+STATE_NAMES = ("OFF", "IDLE", "CONNECTING", "CONNECTED", "BACKOFF")
+
+
+class WifiManager:
+    """
+    ブロックしないWiFi接続・再接続の状態機械
+
+    step() を制御周期ごとに呼ぶと、1回につき WLAN の状態確認などの
+    軽い呼び出しだけを行って状態を進める（待機はしない）。
+    失敗・タイムアウト時は backoff_min_ms から倍々に（最大 backoff_max_ms）
+    待ってから再試行し、接続中に切れた場合はすぐに再接続を始める。
+    接続済みの間は poll_ms ごとにだけ isconnected() を確認する。
+
+    wlan.active(True) は無線チップのファームウェアを読み込むため数百msかかる。
+    step() では呼ばず、制御ループを始める前（またはコア1）に activate() で行う。
+    activate() までの step() は何もしない。
+    """
+
+    def __init__(self, ssid, password, connect_timeout_ms=10000,
+                 backoff_min_ms=1000, backoff_max_ms=30000, poll_ms=200):
+        self.ssid = ssid
+        self.password = password
+        self.connect_timeout_ms = connect_timeout_ms
+        self.backoff_min_ms = backoff_min_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.poll_ms = poll_ms
+        self.wlan = network.WLAN(network.STA_IF)
+
+        self.state = OFF
+        self.backoff_ms = backoff_min_ms
+        self.next_ms = time.ticks_ms()  # 次に状態を確認する時刻
+        self.attempt_ms = 0        # 現在の接続試行の開始時刻
+        self.down_ms = time.ticks_ms()  # 未接続になった時刻（起動時を含む）
+
+        # 統計
+        self.attempts = 0          # connect() の呼び出し回数
+        self.failures = 0          # 失敗・タイムアウト回数
+        self.connects = 0          # 接続成功回数
+        self.disconnects = 0       # 接続中の切断回数
+        self.last_connect_ms = 0   # 直近の接続試行開始から接続までの時間
+        self.last_outage_ms = 0    # 直近の未接続期間（切断・起動から接続まで）
+        self.max_outage_ms = 0
+
+    def isconnected(self):
+        """最後のステップ時点で接続済みか（WLAN は呼ばない）"""
+        return self.state == CONNECTED
+
+    def activate(self):
+        """無線を有効化して接続を始められる状態にする（ブロックする）"""
+        self.wlan.active(True)
+        if self.state == OFF:
+            self.state = IDLE
+            self.next_ms = time.ticks_ms()
+
+    def step(self, now=None):
+        if now is None:
+            now = time.ticks_ms()
+        if time.ticks_diff(now, self.next_ms) < 0:
+            return self.state
+        state = self.state
+
+        if state == CONNECTED:
+            if self.wlan.isconnected():
+                self.next_ms = time.ticks_add(now, self.poll_ms)
+            else:
+                self.disconnects += 1
+                self.down_ms = now
+                self.state = IDLE
+
+        elif state == CONNECTING:
+            if self.wlan.isconnected():
+                self.connects += 1
+                self.last_connect_ms = time.ticks_diff(now, self.attempt_ms)
+                self.last_outage_ms = time.ticks_diff(now, self.down_ms)
+                if self.last_outage_ms > self.max_outage_ms:
+                    self.max_outage_ms = self.last_outage_ms
+                self.backoff_ms = self.backoff_min_ms
+                self.next_ms = time.ticks_add(now, self.poll_ms)
+                self.state = CONNECTED
+            elif (self.wlan.status() < 0
+                    or time.ticks_diff(now, self.attempt_ms) >= self.connect_timeout_ms):
+                self.failures += 1
+                self.wlan.disconnect()
+                self.next_ms = time.ticks_add(now, self.backoff_ms)
+                self.backoff_ms = min(self.backoff_ms * 2, self.backoff_max_ms)
+                self.state = BACKOFF
+
+        elif state == IDLE:
+            self.wlan.connect(self.ssid, self.password)
+            self.attempts += 1
+            self.attempt_ms = now
+            self.state = CONNECTING
+
+        elif state == BACKOFF:
+            self.state = IDLE
+
+        # OFF: activate() まで何もしない
+        return self.state
+
+    def report(self):
+        """統計情報ブロック用の行を出力"""
+        print(f"   WiFi: 状態 {STATE_NAMES[self.state]} / 接続 {self.connects} 回 / 切断 {self.disconnects} 回 / 失敗 {self.failures} 回")
+        print(f"   WiFi接続時間: 直近 {self.last_connect_ms}ms / 最大未接続期間 {self.max_outage_ms}ms")
@@ -0,0 +1,42 @@
+"""
+ホストPC用テスト（pytest）の共通設定
+
+tools/host の代替モジュール（machine / network / uasyncio など）と仮想時計を使って、
+src/ のモジュールを実機なしでテストする。
+
+    python -m pytest test/host
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+sys.path.insert(0, os.path.join(ROOT, "tools", "host"))
+
+import hostenv  # noqa: E402
+
+hostenv.install()
+
+
+@pytest.fixture
+def clock():
+    """0 から始まる仮想時計"""
+    import vclock
+    vclock.clock.reset()
+    yield vclock.clock
+    vclock.clock.reset()
+
+
+@pytest.fixture
+def wlan_env():
+    """network の代替を初期状態に戻す（WLAN は同じインターフェースで共有されるため）"""
+    import network
+    network._interfaces.clear()
+    network.set_available(True)
+    saved = network.connect_delay_ms
+    yield network
+    network.connect_delay_ms = saved
+    network._interfaces.clear()
+    network.set_available(True)
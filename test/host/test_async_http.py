@@ -0,0 +1,82 @@
+import pytest
+
+import hostenv
+import uasyncio
+
+import async_http
+
+
+@pytest.fixture
+def serve(clock):
+    """テストごとにイベントループを作り直し、代替サーバーを用意する"""
+    uasyncio.startup_hooks.clear()
+    uasyncio.new_event_loop()
+    yield hostenv.serve_http
+    uasyncio.startup_hooks.clear()
+    uasyncio.new_event_loop()
+
+
+def post_many(url, batches):
+    client = async_http.Client(url)
+
+    async def main():
+        results = []
+        for bodies in batches:
+            results.append(await client.post_many(bodies))
+        await client.close()
+        return results
+
+    return client, uasyncio.run(main())
+
+
+def test_keep_alive_reuses_connection(serve):
+    url, server = serve()
+    client, results = post_many(url, [[b"a", b"b"], [b"c"]])
+    assert results == [[200, 200], [200]]
+    assert client.connects == 1 and server.connections == 1
+    assert server.requests == 3
+
+
+def test_chunked_response(serve):
+    url, server = serve(reply="chunked")
+    client, results = post_many(url, [[b"a", b"b", b"c"], [b"d"]])
+    assert results == [[200, 200, 200], [200]]
+    assert client.connects == 1            # chunked は最後まで読めば接続を維持できる
+
+
+def test_close_delimited_response(serve):
+    url, server = serve(status=201, reply="close")
+    client, results = post_many(url, [[b"a", b"b", b"c"]])
+    assert results == [[201, 201, 201]]
+    assert client.connects == 3            # 本文の終わりが分からないので毎回接続し直す
+    assert server.requests == 3
+
+
+def test_reconnects_after_server_close(serve):
+    url, server = serve(per_connection=2)
+    client, results = post_many(url, [[b"a", b"b", b"c", b"d", b"e"], [b"f"]])
+    assert results == [[200] * 5, [200]]
+    assert server.requests == 6
+    assert client.connects == server.connections >= 3
+
+
+def test_malformed_response_raises(serve):
+    url, server = serve(reply="malformed")
+    client = async_http.Client(url)
+
+    async def main():
+        try:
+            await client.post(b"a")
+        finally:
+            await client.close()
+
+    with pytest.raises(ValueError):
+        uasyncio.run(main())
+    assert client.connects == 2            # 接続を作り直して1回だけ再試行する
+    assert client.requests == 0
+
+
+def test_one_shot_post(serve):
+    url, server = serve(status=204, reply="close")
+    assert uasyncio.run(async_http.post(url, b"{}")) == 204
+    assert server.requests == 1
@@ -0,0 +1,56 @@
+import calibration
+
+
+def test_missing_file(tmp_path):
+    assert calibration.load(str(tmp_path / "calib.bin")) is None
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "calib.bin")
+    calibration.save(path, {
+        "left_correction": 0.8123, "right_correction": 1.0,
+        "analog_white": [60000, 59000, 58000], "analog_black": [20000, 21000, 22000],
+    })
+    data = calibration.load(path)
+    assert data["left_correction"] == 0.8123
+    assert data["right_correction"] == 1.0
+    assert data["analog_white"] == [60000, 59000, 58000]
+    assert data["analog_black"] == [20000, 21000, 22000]
+    assert data["version"] == calibration.CALIBRATION_VERSION
+
+
+def test_save_merges_with_existing(tmp_path):
+    path = str(tmp_path / "calib.bin")
+    calibration.save(path, {"analog_white": [60000, 60000, 60000], "analog_black": [1, 2, 3]})
+    calibration.save(path, {"left_correction": 0.9, "right_correction": 1.0})
+    data = calibration.load(path)
+    assert data["analog_black"] == [1, 2, 3]
+    assert data["left_correction"] == 0.9
+
+
+def test_motor_only(tmp_path):
+    path = str(tmp_path / "calib.bin")
+    calibration.save(path, {"left_correction": 1.0, "right_correction": 0.95})
+    data = calibration.load(path)
+    assert "analog_white" not in data
+    assert data["right_correction"] == 0.95
+
+
+def test_rejects_other_formats(tmp_path):
+    path = tmp_path / "calib.bin"
+    path.write_text('{"version": 1, "left_correction": 0.8}')   # 以前の JSON
+    assert calibration.load(str(path)) is None
+    path.write_bytes(b"CALB\x63\x00\x00\x00\x00\x00\x00")       # 版違い
+    assert calibration.load(str(path)) is None
+    calibration.save(str(path), {"left_correction": 0.9, "right_correction": 1.0})
+    path.write_bytes(path.read_bytes() + b"\x00")                # 長さ違い
+    assert calibration.load(str(path)) is None
+
+
+def test_sensor_sweep_levels():
+    sweep = calibration.SensorSweep(2)
+    for v in (60000, 20000, 40000):
+        sweep.update([v * 4, v * 4 - 40000 * 4], 4)
+    levels = sweep.result(8000)
+    assert levels[0] == (60000, 20000)
+    assert levels[1] == (20000, 0) or levels[1][0] - levels[1][1] >= 8000
@@ -0,0 +1,65 @@
+import delta_telemetry
+import telemetry_frame
+
+PERIOD_US = 10000
+
+
+def encode(states, capacity=4096, error_step=1):
+    enc = delta_telemetry.DeltaEncoder(capacity, PERIOD_US, error_step)
+    for i, (mask, left, right, error_q, turn) in enumerate(states):
+        enc.push(1000 + i * 10, mask, left, right, error_q, turn, 8000)
+    out = bytearray(capacity)
+    n = enc.read_into(out)
+    return enc, bytes(out[:n])
+
+
+def test_round_trip_every_tick():
+    states = [(0xE7, 8000, 8000, 0, 0)] * 50 + [(0xCF, 7000, 8000, -256, -400)] * 3 + \
+             [(0xE7, 8000, 8000, 0, 0)] * 20
+    enc, data = encode(states)
+    ticks = list(delta_telemetry.iter_ticks(data))
+    assert len(ticks) == len(states)
+    assert enc.records == 3
+    for i, (seq, t, mask, left, right, error, turn, base) in enumerate(ticks):
+        s = states[i]
+        assert seq == i
+        assert t == 1000 + i * PERIOD_US // 1000
+        assert (mask, left, right, error) == s[:4]
+        assert turn == s[4] >> telemetry_frame.TURN_SHIFT
+        assert base == 8000
+
+
+def test_unchanged_state_is_one_record():
+    enc, data = encode([(0xE7, 8000, 8000, 0, 0)] * 1000)
+    runs = list(delta_telemetry.iter_runs(data))
+    assert len(runs) == 1
+    assert runs[0][3] == 1000
+    assert len(data) < delta_telemetry.HEADER_SIZE + delta_telemetry.MAX_RECORD
+
+
+def test_error_step_ignores_small_changes():
+    states = [(0xE7, 8000, 8000, e, 0) for e in (0, 1, 2, 3, 0, 1)]
+    enc, _ = encode(states, error_step=4)
+    assert enc.records == 1
+
+
+def test_full_buffer_drops_until_read():
+    capacity = delta_telemetry.HEADER_SIZE + 2 * delta_telemetry.MAX_RECORD
+    enc = delta_telemetry.DeltaEncoder(capacity, PERIOD_US)
+    for i in range(20):
+        enc.push(i, i & 0xFF, i, i, i, i, 8000)  # 毎周期変化
+    assert enc.full
+    assert enc.dropped > 0
+    out = bytearray(capacity)
+    n = enc.read_into(out)
+    kept = len(list(delta_telemetry.iter_ticks(out[:n])))
+    assert kept + enc.dropped == 20
+    # 取り出した後は再び記録できる
+    enc.push(100, 1, 2, 3, 4, 5, 8000)
+    assert not enc.full
+    assert enc.read_into(out) > 0
+
+
+def test_read_without_records_returns_zero():
+    enc = delta_telemetry.DeltaEncoder(1024, PERIOD_US)
+    assert enc.read_into(bytearray(1024)) == 0
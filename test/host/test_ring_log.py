@@ -0,0 +1,27 @@
+import io
+
+import ring_log
+
+
+def test_writes_to_given_stream(clock):
+    out = io.BytesIO()
+    log = ring_log.RingLog(256, ring_log.INFO, stream=out)
+    log.debug("見えない {}", 1)
+    log.info("速度 {}", 8000)
+    assert out.getvalue() == b""            # drain() までは出力しない
+    while log.drain(16):
+        pass
+    assert out.getvalue() == "       0 速度 8000\n".encode()
+    assert log.messages == 1
+
+
+def test_drops_whole_messages_and_notes_them(clock):
+    out = io.BytesIO()
+    log = ring_log.RingLog(64, ring_log.DEBUG, rate_per_s=1000, burst=100, stream=out)
+    for i in range(10):
+        log.info("message {}", i)
+    assert log.dropped > 0
+    log.flush()
+    lines = out.getvalue().decode().splitlines()
+    assert lines[0].endswith("message 0")
+    assert lines[-1].endswith("（ログ {} 件破棄）".format(log.dropped))
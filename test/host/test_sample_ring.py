@@ -0,0 +1,54 @@
+import sample_ring
+import telemetry_frame
+
+FRAME = telemetry_frame.FRAME_SIZE
+
+
+def push(ring, n):
+    for i in range(n):
+        ring.push(i, 0xE7, 1, 2, 0, 0, 8000)
+
+
+def read_seqs(ring):
+    out = bytearray(ring.capacity * FRAME)
+    n = ring.read_into(out, ring.capacity)
+    return [out[i * FRAME + 1] | out[i * FRAME + 2] << 8 for i in range(n)]
+
+
+def test_drop_oldest_keeps_latest():
+    ring = sample_ring.SampleRing(8)
+    push(ring, 12)
+    assert ring.dropped == 4
+    assert read_seqs(ring) == list(range(4, 12))
+
+
+def test_decimate_waits_for_compact():
+    ring = sample_ring.SampleRing(8, sample_ring.DECIMATE)
+    push(ring, 8)
+    assert not ring.pending
+    push(ring, 2)                      # 満杯: push() では間引かずに捨てる
+    assert ring.pending and ring.count == 8 and ring.dropped == 2
+    assert ring.compact()
+    assert not ring.pending
+    assert ring.count == 4 and ring.stride == 2
+    assert not ring.compact()          # 間引き待ちでなければ何もしない
+
+
+def test_decimate_keeps_order_and_doubles_stride():
+    ring = sample_ring.SampleRing(8, sample_ring.DECIMATE)
+    push(ring, 9)                      # seq 8 は捨てられる
+    ring.compact()
+    for i in range(9, 17):             # 記録間隔 2（seq 10, 12, 14, 16）
+        ring.push(i, 0xE7, 1, 2, 0, 0, 8000)
+    assert read_seqs(ring) == [1, 3, 5, 7, 10, 12, 14, 16]
+    assert ring.stride == 1            # 空になったら元に戻る
+
+
+def test_read_clears_pending():
+    ring = sample_ring.SampleRing(8, sample_ring.DECIMATE)
+    push(ring, 9)
+    out = bytearray(2 * FRAME)
+    assert ring.read_into(out, 2) == 2
+    assert not ring.pending
+    assert not ring.compact()          # 送信で空きができたので間引かない
+    assert ring.count == 6 and ring.stride == 1
@@ -0,0 +1,93 @@
+import os
+
+import spool
+import telemetry_frame
+
+FRAME = telemetry_frame.FRAME_SIZE
+
+
+def frames(start, n):
+    """seq を start から振ったフレーム n 個"""
+    buf = bytearray(n * FRAME)
+    for i in range(n):
+        telemetry_frame.encode_q_into(buf, i * FRAME, (start + i) & 0xFFFF, i, 0xE7, 1, 2, 0, 0, 8000)
+    return buf
+
+
+def seqs(buf, n):
+    return [buf[i * FRAME + 1] | buf[i * FRAME + 2] << 8 for i in range(n)]
+
+
+def drain(sp, batch=16):
+    out = bytearray(batch * FRAME)
+    got = []
+    while True:
+        n = sp.read_into(out)
+        if n == 0:
+            return got
+        got += seqs(out, n)
+        sp.commit(n)
+
+
+def test_write_read_in_order(tmp_path, clock):
+    sp = spool.Spool(str(tmp_path / "spool"), segment_frames=10, buffer_frames=4)
+    sp.write(frames(0, 25))
+    assert sp.pending() == 25
+    sp.flush()
+    assert drain(sp) == list(range(25))
+    assert sp.pending() == 0
+    assert sp.drained == 25
+
+
+def test_buffer_is_flushed_in_blocks(tmp_path, clock):
+    sp = spool.Spool(str(tmp_path / "spool"), segment_frames=100, buffer_frames=4)
+    sp.write(frames(0, 3))
+    assert sp.writes == 0 and sp.buffered == 3 * FRAME
+    sp.write(frames(3, 1))
+    assert sp.writes == 1 and sp.buffered == 0
+
+
+def test_oldest_segment_dropped_over_limit(tmp_path, clock):
+    sp = spool.Spool(str(tmp_path / "spool"), max_bytes=20 * FRAME, segment_frames=10, buffer_frames=5)
+    sp.write(frames(0, 35))
+    sp.flush()
+    # 10 + 10 + 10 + 5 フレーム → 20 以下になるまで古い2ファイルを削除
+    assert sp.dropped == 20
+    assert drain(sp) == list(range(20, 35))
+
+
+def test_reopen_keeps_unsent_frames(tmp_path, clock):
+    path = str(tmp_path / "spool")
+    sp = spool.Spool(path, segment_frames=10, buffer_frames=5)
+    sp.write(frames(0, 15))
+    sp.flush()
+    sp2 = spool.Spool(path, segment_frames=10, buffer_frames=5)
+    assert sp2.pending() == 15
+    assert drain(sp2) == list(range(15))
+
+
+def test_drained_spool_is_empty_after_reopen(tmp_path, clock):
+    path = str(tmp_path / "spool")
+    sp = spool.Spool(path, segment_frames=10, buffer_frames=5)
+    sp.write(frames(0, 15))            # 2つ目のファイルは書き込み中（5フレーム）
+    sp.flush()
+    assert drain(sp) == list(range(15))
+    assert os.listdir(path) == []
+    sp = spool.Spool(path, segment_frames=10, buffer_frames=5)
+    assert sp.pending() == 0
+    assert drain(sp) == []
+
+
+def test_write_after_drain(tmp_path, clock):
+    path = str(tmp_path / "spool")
+    sp = spool.Spool(path, segment_frames=10, buffer_frames=5)
+    sp.write(frames(0, 5))
+    out = bytearray(16 * FRAME)
+    sp.write(frames(5, 3))             # バッファに残ったまま書き込み中のファイルを読み終える
+    n = sp.read_into(out)
+    assert seqs(out, n) == list(range(5))
+    sp.commit(n)
+    sp.write(frames(8, 2))
+    assert sp.pending() == 5
+    assert drain(sp) == list(range(5, 10))
+    assert spool.Spool(path).pending() == 0
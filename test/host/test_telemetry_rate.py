@@ -0,0 +1,76 @@
+import telemetry_rate
+
+
+def controller(**kw):
+    args = dict(interval_ms=2000, min_interval_ms=500, max_interval_ms=16000,
+                batch=100, min_batch=20, max_batch=400, heap_low=20000)
+    args.update(kw)
+    return telemetry_rate.RateController(**args)
+
+
+def test_averages_reach_their_input():
+    rc = controller()
+    for _ in range(60):
+        rc.update(False, 100)
+    assert rc.fail_percent == 100
+    for _ in range(60):
+        rc.update(True, 100)
+    assert rc.fail_percent == 0
+    for _ in range(60):
+        rc.update(True, 300)
+    assert rc.latency_ms == 300
+    for _ in range(60):
+        rc.update(True, 7)
+    assert rc.latency_ms == 7
+
+
+def test_failure_backs_off():
+    rc = controller()
+    assert rc.update(False, 100) == 4000
+    assert rc.batch == 50
+    rc.update(False, 100)
+    rc.update(False, 100)
+    assert rc.interval_ms == 16000            # max_interval_ms で止まる
+    assert rc.batch == 20                     # min_batch で止まる
+    assert rc.backoffs == 3 and rc.slowdowns == 0
+
+
+def test_low_heap_backs_off():
+    rc = controller()
+    assert rc.update(True, 100, mem_free=10000) == 4000
+    assert rc.backoffs == 1
+    assert rc.mem_free_min == 10000
+    rc.update(True, 100, mem_free=50000)
+    assert rc.mem_free_min == 10000
+
+
+def test_slow_send_stretches_interval():
+    rc = controller()
+    assert rc.update(True, 1500) == 3000      # 所要時間がちょうど 50% になるまで延ばす
+    assert rc.slowdowns == 1 and rc.backoffs == 0
+    assert rc.batch == 100
+    rc = controller(busy_percent=25)
+    assert rc.update(True, 1500) == 6000
+
+
+def test_fast_send_shrinks_interval_and_grows_batch():
+    rc = controller()
+    assert rc.update(True, 100) == 1750       # 1/8 ずつ縮める
+    assert rc.batch == 100                    # 残りがなければバッチはそのまま
+    rc.update(True, 100, backlog=30)
+    assert rc.interval_ms == 1532
+    assert rc.batch == 150
+    for _ in range(30):
+        rc.update(True, 100, backlog=30)
+    assert rc.interval_ms == 500 and rc.batch == 400
+    assert rc.interval_min_seen == 500 and rc.interval_max_seen == 2000
+
+
+def test_no_shrink_past_busy_limit():
+    rc = controller()
+    # 900ms は 2000ms の 50% 以内だが、1750ms に縮めると超えるので縮めない
+    assert rc.update(True, 900) == 2000
+    assert rc.slowdowns == 0
+    for _ in range(10):
+        rc.update(True, 900)
+    assert rc.interval_ms == 2000
@@ -0,0 +1,91 @@
+import wifi
+
+
+def manager(**kw):
+    mgr = wifi.WifiManager("ssid", "pw", **kw)
+    mgr.activate()
+    return mgr
+
+
+def run(mgr, clock, ms, step_ms=10):
+    for _ in range(ms // step_ms):
+        clock.advance(step_ms * 1000)
+        mgr.step()
+
+
+def test_connects_after_delay(clock, wlan_env):
+    wlan_env.connect_delay_ms = 500
+    mgr = manager()
+    assert mgr.state == wifi.IDLE
+    assert mgr.step() == wifi.CONNECTING
+    run(mgr, clock, 400)
+    assert not mgr.isconnected()
+    run(mgr, clock, 200)
+    assert mgr.isconnected()
+    assert mgr.connects == 1 and mgr.attempts == 1
+    assert 500 <= mgr.last_connect_ms <= 520
+
+
+def test_backoff_doubles_while_ap_missing(clock, wlan_env):
+    wlan_env.set_available(False)
+    mgr = manager(backoff_min_ms=100, backoff_max_ms=400)
+    run(mgr, clock, 2000)
+    assert not mgr.isconnected()
+    assert mgr.failures >= 4
+    assert mgr.backoff_ms == 400
+    wlan_env.set_available(True)
+    run(mgr, clock, 2500)
+    assert mgr.isconnected()
+    assert mgr.backoff_ms == 100               # 接続したら元に戻す
+
+
+def test_timeout_counts_as_failure(clock, wlan_env):
+    wlan_env.connect_delay_ms = 5000
+    mgr = manager(connect_timeout_ms=1000, backoff_min_ms=100)
+    run(mgr, clock, 1200)
+    assert mgr.failures == 1
+    assert mgr.state in (wifi.BACKOFF, wifi.IDLE, wifi.CONNECTING)
+
+
+def test_reconnects_after_outage(clock, wlan_env):
+    wlan_env.connect_delay_ms = 100
+    mgr = manager(backoff_min_ms=100, poll_ms=50)
+    run(mgr, clock, 300)
+    assert mgr.isconnected()
+    wlan_env.set_available(False)
+    run(mgr, clock, 100)
+    assert not mgr.isconnected()
+    assert mgr.disconnects == 1
+    wlan_env.set_available(True)
+    run(mgr, clock, 1000)
+    assert mgr.isconnected()
+    assert mgr.connects == 2
+    assert mgr.max_outage_ms >= 100
+
+
+def test_polls_only_every_poll_ms(clock, wlan_env):
+    wlan_env.connect_delay_ms = 0
+    mgr = manager(poll_ms=200)
+    run(mgr, clock, 50)
+    assert mgr.isconnected()
+    calls = []
+    wlan = mgr.wlan
+    orig = wlan.isconnected
+    wlan.isconnected = lambda: calls.append(1) or orig()
+    try:
+        run(mgr, clock, 1000)
+    finally:
+        del wlan.isconnected
+    assert 4 <= len(calls) <= 6
+
+
+def test_step_never_activates_radio(clock, wlan_env):
+    wlan_env.connect_delay_ms = 50
+    mgr = wifi.WifiManager("ssid", "pw")
+    run(mgr, clock, 100)
+    assert mgr.state == wifi.OFF
+    assert not mgr.wlan.active() and mgr.attempts == 0
+    mgr.activate()
+    assert mgr.wlan.active()
+    run(mgr, clock, 100)
+    assert mgr.isconnected()
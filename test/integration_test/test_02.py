@@ -5,6 +5,11 @@ import urequests
 import ujson
 import gc
 
+try:
+    import sensor_log  # src/sensor_log.py をアップロードすると記録が有効になる
+except ImportError:
+    sensor_log = None
+
 # ============================================================
 # WiFi設定（ここを編集してください）
 # ============================================================
@@ -27,6 +32,11 @@ LED_PIN = "LED"
 # ============================================================
 TELEMETRY_INTERVAL_MS = 50  # 200msごとに送信（1秒間に5回）
 
+# ============================================================
+# 記録設定（tools/replay.py で再生できる）
+# ============================================================
+RECORD_FILE = "sensors.slog"  # None で記録しない
+
 # ============================================================
 # メインプログラム
 # ============================================================
@@ -66,6 +76,12 @@ sensors = [Pin(p, Pin.IN, Pin.PULL_UP) for p in SENSOR_PINS]
 led = Pin(LED_PIN, Pin.OUT)
 led.value(1)
 
+# センサー記録
+recorder = None
+if sensor_log is not None and RECORD_FILE:
+    recorder = sensor_log.Recorder(RECORD_FILE)
+    print(f"📼 記録先: {RECORD_FILE}")
+
 # テレメトリ送信関数
 def send_telemetry(sensor_values):
     """センサーデータをサーバーに送信"""
@@ -118,6 +134,13 @@ try:
         
         current_time = time.ticks_ms()
         
+        if recorder:
+            mask = 0
+            for i in range(len(values)):
+                if values[i]:
+                    mask |= 1 << i
+            recorder.append(current_time, mask)
+        
         # センサー状態を表示（500msごと）
         if time.ticks_diff(current_time, last_telemetry_time) > 500:
             print(f"センサー: {' '.join(str(v) for v in values)} | WiFi: {last_wifi_status}")
@@ -143,6 +166,8 @@ except KeyboardInterrupt:
 
 finally:
     led.value(0)
+    if recorder:
+        recorder.close()
     if wlan:
         wlan.disconnect()
         wlan.active(False)
@@ -151,6 +176,8 @@ finally:
     print(f"   送信成功: {success_count}")
     print(f"   送信失敗: {fail_count}")
     print(f"   合計: {success_count + fail_count}")
+    if recorder:
+        print(f"   記録: {recorder.count} サンプル → {RECORD_FILE}")
     if (success_count + fail_count) > 0:
         success_rate = (success_count / (success_count + fail_count)) * 100
         print(f"   成功率: {success_rate:.1f}%")
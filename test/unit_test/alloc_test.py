@@ -0,0 +1,96 @@
+# 制御ステップのメモリ確保テスト（Pico W 専用）
+#
+# src/ 内の .py（config.py も src/ のもの）と一緒に転送して実行する。
+# TELEMETRY_FORMAT（と RING_OVERFLOW）ごとに main をモジュールとして読み込み（main() は実行しない）、
+# micropython.heap_lock() 中に制御ステップを繰り返す。1バイトでもメモリを確保すると
+# MemoryError になるため、「1周期あたりの確保 0 バイト」を確認できる。
+# 最後に gc.collect() の停止時間（最大）を表示する。
+#
+# WiFi未接続のため wifi.WifiManager.step() と UDP送信は対象外。
+import gc
+import sys
+import time
+import micropython
+import config
+
+TICKS = 2000
+# (TELEMETRY_FORMAT, RING_OVERFLOW)。TICKS > RING_CAPACITY なのでバッチ形式は途中で満杯になる
+CASES = (
+    ("json", "drop_oldest"),
+    ("binary", "drop_oldest"),
+    ("batch", "drop_oldest"),
+    ("batch", "decimate"),
+    ("delta", "drop_oldest"),
+)
+# 直線・カーブ・ライン未検出を含むパターン（センサー入力の代わりに使う）
+MASKS = (0xE7, 0xE7, 0xCF, 0x9F, 0x3F, 0xFF, 0xF3, 0xF9, 0xFC, 0xE7)
+
+if sys.implementation.name != "micropython":
+    print("このテストは実機専用です（ホストでは heap_lock() が効きません）")
+    sys.exit(0)
+
+
+def run_ticks(main, n):
+    """main.sched._run() と同じ処理（GCの判定は除く）を n 周期"""
+    stats = main.sched.stats
+    for _ in range(n):
+        start = time.ticks_us()
+        main.control_step()
+        stats.record(start, time.ticks_us())
+
+
+def check(fmt, overflow):
+    config.TELEMETRY_FORMAT = fmt
+    config.RING_OVERFLOW = overflow
+    name = fmt if fmt != "batch" else f"{fmt}/{overflow}"
+    sys.modules.pop("main", None)
+    gc.collect()
+    import main
+    main.init_telemetry()
+
+    # センサー読み取りをパターン列に差し替え（実際のセンサー値に依存しないように）
+    i = [0]
+
+    def fake_read():
+        i[0] = (i[0] + 1) % len(MASKS)
+        return MASKS[i[0]]
+    main.sensors.read = fake_read
+
+    run_ticks(main, 10)  # 初回のみの確保（属性キャッシュなど）を済ませる
+    gc.collect()
+    before = gc.mem_alloc()
+    error = None
+    micropython.heap_lock()
+    try:
+        run_ticks(main, TICKS)
+    except MemoryError as e:
+        error = e
+    finally:
+        micropython.heap_unlock()
+    allocated = gc.mem_alloc() - before
+    main.stop_motors()
+
+    if error is not None:
+        print(f"❌ {name}: 制御ステップ中にメモリを確保しました（{error!r}）")
+        return False
+    if allocated:
+        print(f"❌ {name}: {TICKS} 周期で {allocated} バイト確保")
+        return False
+    print(f"✅ {name}: {TICKS} 周期で確保 0 バイト（最大実行時間 {main.sched.stats.max_exec}us）")
+    return True
+
+
+print("=" * 50)
+print("制御ステップのメモリ確保テスト")
+print("=" * 50)
+ok = True
+for fmt, overflow in CASES:
+    ok = check(fmt, overflow) and ok
+
+# GC 1回の停止時間（この時点のヒープ使用量で）
+import main
+gcc = main.gcc
+for _ in range(5):
+    gcc.collect()
+print(f"GC停止時間: 最大 {gcc.max_pause_us}us（使用中 {gc.mem_alloc()} / 空き {gc.mem_free()} バイト）")
+print("結果:", "OK" if ok else "NG")
@@ -0,0 +1,49 @@
+"""
+src/main.py の制御パラメータの既定値（ホストPC用, 標準ライブラリのみ）
+
+main.py は machine などに依存してPCでは import できないため、ソースを
+ast で読んで定数の値を取り出す。simulator.py / replay.py / sweep.py は
+ここから既定値を使うので、main.py の値を変えればツール側にも反映される。
+"""
+import ast
+import os
+
+MAIN_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "main.py")
+
+# パラメータ名 → main.py の定数名
+NAMES = {
+    "base_speed": "BASE_SPEED",
+    "kp": "KP",
+    "kd": "KD",
+    "weights": "WEIGHTS",
+    "left_correction": "LEFT_MOTOR_CORRECTION",
+    "right_correction": "RIGHT_MOTOR_CORRECTION",
+    "min_speed_factor": "MIN_SPEED_FACTOR",
+    "slowdown": "SLOWDOWN",
+}
+
+
+def _value(node):
+    # BASE_SPEED = const(8000) の const() を外す
+    if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "const":
+        node = node.args[0]
+    return ast.literal_eval(node)
+
+
+def load(path=MAIN_PY):
+    """main.py のモジュール直下の代入から既定パラメータの dict を作る"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    consts = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Name) and target.id in NAMES.values():
+                consts[target.id] = _value(node.value)
+    missing = [c for c in NAMES.values() if c not in consts]
+    if missing:
+        raise KeyError("main.py に定数がありません: " + ", ".join(missing))
+    return {key: consts[name] for key, name in NAMES.items()}
+
+
+DEFAULT_PARAMS = load()
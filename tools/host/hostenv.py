@@ -0,0 +1,203 @@
+"""
+ホストPC上で src/ と test/ のプログラムを動かすための環境
+
+    import hostenv
+    clock = hostenv.install()      # 代替モジュールを読み込めるようにし、time を仮想時計に差し替える
+    url = hostenv.serve_http()     # uasyncio.run() 内で動くローカルの代替サーバー
+    import main
+
+install() は以下を行う:
+  - このディレクトリ（machine / network / urequests / micropython / uasyncio / ujson）
+    と src/ を sys.path の先頭に追加
+  - time モジュールに ticks_ms / ticks_us / ticks_diff / ticks_add / sleep_ms / sleep_us
+    を追加し、time.sleep を仮想時計に差し替える（time.perf_counter などはそのまま）
+  - gc モジュールに mem_free / mem_alloc を追加（値は hostenv.heap_free で与える）
+  - config.LOG_STREAM（main.py のログの出力先）を StdoutStream() にする
+
+install(virtual=False) なら ticks / sleep は実時間のまま（ベンチマーク用）。
+"""
+import gc
+import os
+import socket
+import sys
+import time
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.normpath(os.path.join(HOST_DIR, "..", "..", "src"))
+
+_TIME_ATTRS = ("ticks_ms", "ticks_us", "ticks_cpu", "ticks_diff", "ticks_add",
+               "sleep", "sleep_ms", "sleep_us")
+_saved_time = {}
+
+HEAP_SIZE = 192 * 1024
+heap_free = 160 * 1024  # gc.mem_free() の戻り値（ヒープ不足の再現用に変更可）
+
+
+def _mem_free():
+    return heap_free
+
+
+def _mem_alloc():
+    return HEAP_SIZE - heap_free
+
+
+class StdoutStream:
+    """
+    ring_log.RingLog の出力先（config.LOG_STREAM）
+
+    書き込みの時点の sys.stdout へ出す（print() と順序を揃えるため先に flush する）。
+    sys.stdout がバイト列を受け付けないもの（出力の取り込み中など）に差し替えられて
+    いる間は捨てる。
+    """
+
+    def write(self, data):
+        sys.stdout.flush()
+        out = getattr(sys.stdout, "buffer", None)
+        if out is not None:
+            out.write(data)
+            out.flush()
+        return len(data)
+
+
+def install(src=True, virtual=True):
+    """代替モジュールと仮想時計を有効にし、仮想時計を返す"""
+    for path in ([SRC_DIR] if src else []) + [HOST_DIR]:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    if src:
+        import config
+        config.LOG_STREAM = StdoutStream()
+
+    import vclock
+    clock = vclock.clock
+    if not _saved_time:
+        for name in _TIME_ATTRS:
+            _saved_time[name] = getattr(time, name, None)
+    time.ticks_diff = vclock.ticks_diff
+    time.ticks_add = vclock.ticks_add
+    if virtual:
+        time.ticks_ms = clock.ticks_ms
+        time.ticks_us = clock.ticks_us
+        time.ticks_cpu = clock.ticks_us
+        time.sleep = clock.sleep
+        time.sleep_ms = clock.sleep_ms
+        time.sleep_us = clock.sleep_us
+    else:
+        ns = time.perf_counter_ns
+        sleep = _saved_time["sleep"]
+        time.ticks_ms = lambda: (ns() // 1000000) & vclock.TICKS_MAX
+        time.ticks_us = lambda: (ns() // 1000) & vclock.TICKS_MAX
+        time.ticks_cpu = time.ticks_us
+        time.sleep = sleep
+        time.sleep_ms = lambda ms: sleep(ms / 1000)
+        time.sleep_us = lambda us: sleep(us / 1000000)
+    if not hasattr(gc, "mem_free"):
+        gc.mem_free = _mem_free
+        gc.mem_alloc = _mem_alloc
+    return clock
+
+
+def uninstall():
+    """time モジュールを元に戻す（sys.path・読み込み済みモジュールはそのまま）"""
+    for name, value in _saved_time.items():
+        if value is None:
+            if hasattr(time, name):
+                delattr(time, name)
+        else:
+            setattr(time, name, value)
+    _saved_time.clear()
+    if getattr(gc, "mem_free", None) is _mem_free:
+        del gc.mem_free
+        del gc.mem_alloc
+
+
+def set_sensor_mask(pins, mask):
+    """センサーピンの入力値をビットマスク（bit i = pins[i] の値）で設定"""
+    import machine
+    for i, pin in enumerate(pins):
+        machine.inputs[pin] = (mask >> i) & 1
+
+
+class StandInServer:
+    """
+    /api/telemetry の代替。本文を読み捨てて status を返す（keep-alive 対応）
+
+    delay_ms > 0 なら応答前にその時間（仮想時計）待つ。
+    reply は応答の形式:
+      "length"    Content-Length 付き（既定）
+      "chunked"   Transfer-Encoding: chunked
+      "close"     長さなし。本文を送ったら接続を閉じる
+      "malformed" ステータス行が不正
+    per_connection > 0 なら、1本の接続でその数だけ応答したら接続を閉じる。
+    """
+
+    REPLIES = {
+        "length": b"HTTP/1.1 %d OK\r\nContent-Length: 2\r\n\r\nok",
+        "chunked": b"HTTP/1.1 %d OK\r\nTransfer-Encoding: chunked\r\n\r\n2\r\nok\r\n0\r\n\r\n",
+        "close": b"HTTP/1.1 %d OK\r\n\r\nok",
+        "malformed": b"HTTP/1.1 %d? OK\r\n\r\n",
+    }
+
+    def __init__(self, status=200, delay_ms=0, reply="length", per_connection=0):
+        if reply not in self.REPLIES:
+            raise ValueError("未対応の応答形式: " + reply)
+        self.status = status
+        self.delay_ms = delay_ms
+        self.reply = reply
+        self.per_connection = per_connection
+        self.connections = 0
+        self.requests = 0
+        self.bytes = 0
+
+    async def handle(self, reader, writer):
+        import uasyncio as asyncio
+        self.connections += 1
+        served = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line[15:])
+                await reader.readexactly(length)
+                if self.delay_ms:
+                    await asyncio.sleep_ms(self.delay_ms)
+                self.requests += 1
+                self.bytes += length
+                writer.write(self.REPLIES[self.reply] % self.status)
+                await writer.drain()
+                served += 1
+                if self.reply == "close" or served == self.per_connection:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def serve_http(status=200, delay_ms=0, reply="length", per_connection=0):
+    """
+    ローカルの代替サーバーを用意し、(URL, StandInServer) を返す
+
+    ポートはこの場で確保し、サーバー自体は次の uasyncio.run() の開始時に起動する。
+    config.API_URL を差し替えるなら main を import する前に行うこと。
+    reply・per_connection は StandInServer を参照。
+    """
+    import uasyncio as asyncio
+    server = StandInServer(status, delay_ms, reply, per_connection)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    port = sock.getsockname()[1]
+
+    async def start():
+        await asyncio.start_server(server.handle, sock=sock)
+
+    asyncio.startup_hooks.append(start)
+    return "http://127.0.0.1:{}/api/telemetry".format(port), server
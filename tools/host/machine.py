@@ -0,0 +1,184 @@
+"""
+machine モジュールのホスト用代替（Pin / ADC / PWM / Timer / mem32）
+
+入力ピンの値は inputs（ピン番号 → 0/1）または input_source（ピン番号を
+受け取って 0/1 を返す関数）で与える。どちらにもないピンはプルアップ扱いで 1。
+ADC の値は analog_source（ピン番号 → 0〜65535）で与える。未設定なら
+デジタル入力の値から白 = ADC_WHITE / 黒 = ADC_BLACK とする。
+"""
+from vclock import clock
+
+inputs = {}
+input_source = None
+analog_source = None
+
+ADC_WHITE = 60000
+ADC_BLACK = 5000
+
+GPIO_IN_ADDR = 0xD0000004
+
+
+def read_input(pin_id):
+    if input_source is not None:
+        return 1 if input_source(pin_id) else 0
+    return inputs.get(pin_id, 1)
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self._value = 0
+        if value is not None:
+            self._value = 1 if value else 0
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.__init__(self.id, mode, pull, value)
+
+    def value(self, v=None):
+        if v is None:
+            if self.mode == Pin.IN:
+                return read_input(self.id)
+            return self._value
+        self._value = 1 if v else 0
+
+    __call__ = value
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    high = on
+    low = off
+
+    def toggle(self):
+        self._value ^= 1
+
+    def irq(self, handler=None, trigger=None):
+        return None
+
+
+class ADC:
+    # ADC(n) のチャンネル番号 → GPIO（0〜3 = GPIO26〜29）
+    CHANNEL_PINS = {0: 26, 1: 27, 2: 28, 3: 29}
+
+    def __init__(self, pin):
+        if isinstance(pin, Pin):
+            self.pin_id = pin.id
+        else:
+            self.pin_id = self.CHANNEL_PINS.get(pin, pin)
+
+    def read_u16(self):
+        if analog_source is not None:
+            return max(0, min(65535, int(analog_source(self.pin_id))))
+        return ADC_WHITE if read_input(self.pin_id) else ADC_BLACK
+
+
+class PWM:
+    """duty_u16() で設定した値を保持するだけのPWM"""
+
+    def __init__(self, pin, freq=None, duty_u16=None):
+        self.pin = pin
+        self._freq = freq or 0
+        self._duty = duty_u16 or 0
+        self.writes = 0
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+        self.writes += 1
+
+    def deinit(self):
+        self._duty = 0
+
+
+class Timer:
+    """仮想時計が進んだときにコールバックを呼ぶタイマー"""
+
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        self.period_us = 0
+        if callback is not None:
+            self.init(mode=mode, freq=freq, period=period, callback=callback)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        self.deinit()
+        self.mode = mode
+        self.callback = callback
+        self.period_us = 1000000 // freq if freq > 0 else period * 1000
+        self.next_us = clock.us + self.period_us
+        clock.timers.append(self)
+
+    def fire(self):
+        if self.mode == Timer.PERIODIC:
+            self.next_us += self.period_us
+        else:
+            self.deinit()
+        if self.callback is not None:
+            self.callback(self)
+
+    def deinit(self):
+        if self in clock.timers:
+            clock.timers.remove(self)
+
+
+class _Mem32:
+    """GPIO_IN の読み取りだけを入力ピンの値から組み立てる"""
+
+    def __getitem__(self, addr):
+        if addr == GPIO_IN_ADDR:
+            value = 0
+            for pin in range(30):
+                if read_input(pin):
+                    value |= 1 << pin
+            return value
+        return 0
+
+    def __setitem__(self, addr, value):
+        pass
+
+
+mem32 = _Mem32()
+
+
+def freq(value=None):
+    return 125000000 if value is None else None
+
+
+def unique_id():
+    return b"\x00HOSTFAKE"
+
+
+def idle():
+    pass
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
@@ -0,0 +1,37 @@
+"""micropython モジュールのホスト用代替"""
+
+
+def const(x):
+    return x
+
+
+def schedule(func, arg):
+    # 実機ではバイトコードの合間に実行される。ホストではその場で実行する
+    func(arg)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=None):
+    pass
+
+
+def opt_level(level=None):
+    return 0
+
+
+def heap_lock():
+    return 0
+
+
+def heap_unlock():
+    return 0
+
+
+def native(f):
+    return f
+
+
+viper = native
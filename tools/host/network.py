@@ -0,0 +1,92 @@
+"""
+network モジュールのホスト用代替（WLAN）
+
+connect() から connect_delay_ms（仮想時間）後に接続済みになる。
+set_available(False) でアクセスポイントが消えた状態（切断）にでき、
+再び True にしても connect() を呼び直すまでは接続しない。
+"""
+from vclock import clock
+
+STA_IF = 0
+AP_IF = 1
+
+# rp2 の WLAN.status() の値
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+STAT_CONNECT_FAIL = -1
+STAT_NO_AP_FOUND = -2
+STAT_WRONG_PASSWORD = -3
+
+connect_delay_ms = 1500
+ip = "192.168.0.10"
+
+_available = True
+_epoch = 0           # 切断のたびに増える
+_interfaces = {}
+
+
+def set_available(flag):
+    global _available, _epoch
+    if _available and not flag:
+        _epoch += 1
+    _available = flag
+
+
+class WLAN:
+    def __new__(cls, interface=STA_IF):
+        # 実機と同様、同じインターフェースは同じオブジェクト
+        if interface not in _interfaces:
+            obj = super().__new__(cls)
+            obj.interface = interface
+            obj._active = False
+            obj._connecting = False
+            obj._epoch = -1
+            obj._ready_us = 0
+            obj.connects = 0
+            _interfaces[interface] = obj
+        return _interfaces[interface]
+
+    def active(self, flag=None):
+        if flag is None:
+            return self._active
+        self._active = bool(flag)
+        if not flag:
+            self._connecting = False
+
+    def connect(self, ssid=None, key=None):
+        self._connecting = True
+        self._epoch = _epoch
+        self._ready_us = clock.us + connect_delay_ms * 1000
+        self.connects += 1
+
+    def disconnect(self):
+        self._connecting = False
+
+    def isconnected(self):
+        return self.status() == STAT_GOT_IP
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -50
+        if not (self._active and self._connecting):
+            return STAT_IDLE
+        if self._epoch != _epoch:
+            return STAT_CONNECT_FAIL
+        if not _available:
+            return STAT_NO_AP_FOUND
+        if clock.us < self._ready_us:
+            return STAT_CONNECTING
+        return STAT_GOT_IP
+
+    def ifconfig(self, config=None):
+        return (ip, "255.255.255.0", "192.168.0.1", "8.8.8.8")
+
+    def config(self, *args, **kwargs):
+        if args == ("mac",):
+            return b"\x00\x00\x00\x00\x00\x00"
+        return None
+
+
+def hostname(name=None):
+    return "picow-host"
@@ -0,0 +1,124 @@
+"""
+src/ や test/ のプログラムをホストPC上で実行する
+
+    python tools/host/run.py src/main.py --seconds 30 --stand-in
+    python tools/host/run.py test/integration_test/test_01.py --seconds 10 --sensors 0xE7
+    python tools/host/run.py src/main.py --seconds 60 --replay sensors.slog
+    python tools/host/run.py src/main.py --seconds 60 --stand-in --wifi-outage 10:30 --set TELEMETRY_FORMAT=batch
+    python tools/host/run.py src/main.py --seconds 60 --stand-in --server-delay-ms 800 --heap-free 20000
+
+仮想時計が --seconds に達すると KeyboardInterrupt（Ctrl+C 相当）を発生させるため、
+各プログラムの終了処理（統計情報の表示など）まで実行される。
+"""
+import argparse
+import os
+import runpy
+import sys
+import time
+
+import hostenv
+
+
+class _At:
+    """仮想時計の指定時刻に一度だけ func を呼ぶ"""
+
+    def __init__(self, clock, seconds, func):
+        self.clock = clock
+        self.next_us = int(seconds * 1e6)
+        self.func = func
+        clock.timers.append(self)
+
+    def fire(self):
+        self.clock.timers.remove(self)
+        self.func()
+
+
+def parse_value(text):
+    try:
+        return int(text, 0)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    return {"True": True, "False": False, "None": None}.get(text, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代替モジュール上でプログラムを実行")
+    parser.add_argument("script")
+    parser.add_argument("--seconds", type=float, default=10.0, help="仮想時間でこの秒数後に停止")
+    parser.add_argument("--sensors", type=lambda s: int(s, 0), default=0xE7,
+                        help="センサーのビットマスク（固定, 既定 0xE7 = 中央2個が黒）")
+    parser.add_argument("--replay", help="センサー入力を記録ファイル（src/sensor_log.py 形式）で与える")
+    parser.add_argument("--stand-in", action="store_true",
+                        help="config.API_URL をローカルの代替サーバーに差し替える")
+    parser.add_argument("--server-delay-ms", type=int, default=0,
+                        help="代替サーバーが応答するまでの時間（仮想時間）")
+    parser.add_argument("--heap-free", type=int, help="gc.mem_free() の値[byte]")
+    parser.add_argument("--wifi-delay-ms", type=int, default=1500)
+    parser.add_argument("--wifi-outage", action="append", default=[], metavar="START:END",
+                        help="仮想時間 START〜END 秒の間アクセスポイントを消す（複数指定可）")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="config の値を上書き（例: TELEMETRY_FORMAT=batch）")
+    args = parser.parse_args()
+
+    script = os.path.abspath(args.script)
+    clock = hostenv.install()
+    if args.heap_free is not None:
+        hostenv.heap_free = args.heap_free
+    sys.path.insert(0, os.path.dirname(script))
+
+    import machine
+    import network
+    network.connect_delay_ms = args.wifi_delay_ms
+    pins = [22, 21, 28, 27, 26, 18, 17, 16]
+    hostenv.set_sensor_mask(pins, args.sensors)
+    if args.replay:
+        import sensor_log
+        records = sensor_log.load(args.replay)
+        index = {p: i for i, p in enumerate(pins)}
+        state = {"i": 0}
+
+        def source(pin):
+            t = clock.us // 1000
+            i = state["i"]
+            while i + 1 < len(records) and records[i + 1][0] <= t:
+                i += 1
+            state["i"] = i
+            return (records[i][1] >> index[pin]) & 1 if pin in index else 1
+
+        machine.input_source = source
+
+    for spec in args.wifi_outage:
+        start, end = (float(v) for v in spec.split(":"))
+        _At(clock, start, lambda: network.set_available(False))
+        _At(clock, end, lambda: network.set_available(True))
+
+    import config
+    for item in args.set:
+        key, _, value = item.partition("=")
+        setattr(config, key, parse_value(value))
+    server = None
+    if args.stand_in:
+        config.API_URL, server = hostenv.serve_http(delay_ms=args.server_delay_ms)
+
+    clock.limit_us = int(args.seconds * 1e6)
+    wall = time.perf_counter()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except KeyboardInterrupt:
+        pass
+    except SystemExit:
+        pass
+    wall = time.perf_counter() - wall
+
+    print()
+    print(f"[host] 仮想時間 {clock.seconds():.2f}s / 実時間 {wall:.2f}s")
+    if server is not None:
+        print(f"[host] 代替サーバー受信: {server.requests} 件, {server.bytes} バイト")
+
+
+if __name__ == "__main__":
+    main()
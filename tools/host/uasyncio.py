@@ -0,0 +1,86 @@
+"""
+uasyncio モジュールのホスト用代替
+
+CPython の asyncio に sleep_ms() を足したもの。run() は仮想時計で動く
+イベントループを使うため、sleep() / sleep_ms() / wait_for() の待ち時間は
+実時間ではなく仮想時計を進めて消化する（その間に machine.Timer も発火する）。
+ソケットの入出力は実際に行う。
+
+MicroPython と同様にイベントループは1つで、run() が終わっても閉じない
+（終了処理で StreamWriter.close() などを呼べるように）。new_event_loop() で作り直す。
+"""
+import asyncio as _asyncio
+import math
+import selectors
+from asyncio import *  # noqa: F401,F403
+
+from vclock import clock
+
+# 自己パイプ以外のソケットを監視しているとき、仮想時計を進める前に
+# 実際に待つ時間 [s]（ローカルの代替サーバーからの応答を取りこぼさないため）
+real_wait = 0.001
+
+# run() でメインのコルーチンより先に実行するコルーチン関数（代替サーバーの起動など）
+startup_hooks = []
+
+
+class _VirtualSelector:
+    def __init__(self):
+        self._sel = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        events = self._sel.select(0)
+        if events or timeout == 0:
+            return events
+        if len(self._sel.get_map()) > 1 and real_wait:
+            events = self._sel.select(real_wait if timeout is None else min(timeout, real_wait))
+            if events:
+                return events
+        if timeout is None:
+            return self._sel.select(None)
+        clock.advance(math.ceil(timeout * 1e6))
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self._sel, name)
+
+
+class VirtualTimeLoop(_asyncio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__(selector=_VirtualSelector())
+
+    def time(self):
+        return clock.us / 1e6
+
+
+def sleep_ms(ms):
+    return _asyncio.sleep(ms / 1000)
+
+
+_loop = None
+_hooks_done = False
+
+
+def get_event_loop():
+    global _loop
+    if _loop is None:
+        _loop = VirtualTimeLoop()
+    return _loop
+
+
+def new_event_loop():
+    global _loop, _hooks_done
+    _loop = VirtualTimeLoop()
+    _hooks_done = False
+    return _loop
+
+
+def run(coro):
+    global _hooks_done
+    loop = get_event_loop()
+    _asyncio.set_event_loop(loop)
+    if not _hooks_done:
+        _hooks_done = True
+        for hook in startup_hooks:
+            loop.run_until_complete(hook())
+    return loop.run_until_complete(coro)
@@ -0,0 +1,2 @@
+"""ujson モジュールのホスト用代替"""
+from json import dumps, loads, dump, load  # noqa: F401
@@ -0,0 +1,71 @@
+"""
+urequests モジュールのホスト用代替
+
+実際の通信はせず、handler(method, url, data, headers) が返す
+(ステータス, 本文) をレスポンスにする（既定は 200 / b"{}"）。
+各リクエストで仮想時計を latency_ms 進める。
+WiFi（network.WLAN(STA_IF)）が未接続なら実機と同じく OSError。
+"""
+import json as _json
+
+import network
+from vclock import clock
+
+handler = None
+latency_ms = 0
+count = 0
+
+
+class Response:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content if isinstance(content, bytes) else content.encode()
+        self.reason = b"OK" if status_code == 200 else b""
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def request(method, url, data=None, json=None, headers=None, timeout=None, **kwargs):
+    global count
+    if not network.WLAN(network.STA_IF).isconnected():
+        raise OSError(-2, "network unreachable")
+    if json is not None:
+        data = _json.dumps(json)
+    clock.advance(latency_ms * 1000)
+    count += 1
+    if handler is None:
+        return Response(200, b"{}")
+    status, body = handler(method, url, data, headers or {})
+    return Response(status, body)
+
+
+def head(url, **kw):
+    return request("HEAD", url, **kw)
+
+
+def get(url, **kw):
+    return request("GET", url, **kw)
+
+
+def post(url, **kw):
+    return request("POST", url, **kw)
+
+
+def put(url, **kw):
+    return request("PUT", url, **kw)
+
+
+def patch(url, **kw):
+    return request("PATCH", url, **kw)
+
+
+def delete(url, **kw):
+    return request("DELETE", url, **kw)
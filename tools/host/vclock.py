@@ -0,0 +1,76 @@
+"""
+ホスト用の仮想時計
+
+time.ticks_ms() / ticks_us() / sleep*() と machine.Timer・network.WLAN・
+uasyncio のイベントループはすべてこの時計を参照する。時間は sleep() や
+advance() を呼んだときだけ進み、その間に期限が来たタイマーの
+コールバックを時刻順に実行する。
+"""
+import math
+
+# MicroPython（rp2）の ticks は 2^30 で一周する
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+def ticks_diff(a, b):
+    return ((a - b + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+class VirtualClock:
+    def __init__(self):
+        self.us = 0
+        self.timers = []
+        self.limit_us = None   # この時刻に達したら KeyboardInterrupt（Ctrl+C 相当）
+
+    def reset(self):
+        self.us = 0
+        self.timers = []
+        self.limit_us = None
+
+    def ticks_us(self):
+        return self.us & TICKS_MAX
+
+    def ticks_ms(self):
+        return (self.us // 1000) & TICKS_MAX
+
+    def seconds(self):
+        return self.us / 1e6
+
+    def advance(self, us):
+        """us マイクロ秒進める（途中で期限が来たタイマーを実行）"""
+        target = self.us + max(0, int(us))
+        while True:
+            due = None
+            for t in self.timers:
+                if t.next_us <= target and (due is None or t.next_us < due.next_us):
+                    due = t
+            if due is None:
+                break
+            self.us = max(self.us, due.next_us)
+            due.fire()
+            self._check_limit()
+        self.us = target
+        self._check_limit()
+
+    def _check_limit(self):
+        if self.limit_us is not None and self.us >= self.limit_us:
+            self.limit_us = None
+            raise KeyboardInterrupt
+
+    def sleep(self, seconds):
+        self.advance(math.ceil(seconds * 1e6))
+
+    def sleep_ms(self, ms):
+        self.advance(ms * 1000)
+
+    def sleep_us(self, us):
+        self.advance(us)
+
+
+clock = VirtualClock()
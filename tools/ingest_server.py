@@ -0,0 +1,526 @@
+"""
+テレメトリ受信サーバー（ホストPC用, /api/telemetry のローカル代替）
+
+Pico W の send_telemetry() が送る4形式（JSON / バイナリフレーム / バッチ / 変化時のみ）を
+HTTP で、udp_task() のバイナリフレームを UDP で受け取り、列ごとの
+追記専用ファイル（1項目 = 1つの .npy）に保存する。
+
+受信したサンプルはまずメモリ上のバッファ（列ごとのNumPy配列）に溜め、
+バッファが一杯になるか --flush-interval 秒ごとに別スレッドでファイルへ追記する。
+.npy のヘッダーは固定長で、追記のたびに件数だけを書き換えるため、
+書き込み中でも np.load(..., mmap_mode="r") でそのまま読める。
+
+車体は X-Car-Id ヘッダー（なければ送信元IPアドレス）で区別し、
+car 列に番号を、cars.json に番号と名前の対応を保存する。
+
+使い方:
+    python tools/ingest_server.py runs/today [--port 8000] [--udp-port 5005]
+
+    # firmware 側: config.API_URL = "http://<PCのIP>:8000/api/telemetry"
+
+読み出し:
+    from ingest_server import load
+    cols = load("runs/today")          # {"timestamp": memmap, "sensors": ..., ...}
+"""
+import argparse
+import ast
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import telemetry_frame  # noqa: E402
+import delta_telemetry  # noqa: E402
+
+PATH = "/api/telemetry"
+MAX_BODY = 1 << 20
+REPORT_INTERVAL_S = 2.0
+
+# 保存する列（名前, dtype）。seq は JSON 形式では -1
+COLUMNS = (
+    ("car", "<u2"),
+    ("recv_us", "<i8"),        # 受信時刻（ホストの time.time_ns() // 1000）
+    ("seq", "<i4"),
+    ("timestamp", "<u4"),      # Pico W の time.ticks_ms()
+    ("sensors", "u1"),         # ビットマスク（bit i = センサー i）
+    ("left_speed", "<u2"),
+    ("right_speed", "<u2"),
+    ("error", "<f4"),
+    ("turn", "<i4"),
+    ("base_speed", "<u2"),
+)
+
+# telemetry_frame.FRAME_FORMAT と同じ並びの構造化dtype（まとめてデコードする用）
+FRAME_DTYPE = np.dtype([
+    ("version", "u1"), ("seq", "<u2"), ("ticks", "<u4"), ("mask", "u1"),
+    ("left", "<u2"), ("right", "<u2"), ("error", "<i2"), ("turn", "<i2"),
+    ("base_speed", "<u2"),
+])
+assert FRAME_DTYPE.itemsize == telemetry_frame.FRAME_SIZE
+
+
+class PayloadError(ValueError):
+    """本文が不正（400 を返す）"""
+
+
+# ---------------------------------------------------------------------------
+# 列ごとの追記ファイル
+
+HEADER_LEN = 128  # .npy ヘッダー（マジック + 長さ + dict + 空白 + 改行）の固定長
+
+
+def _npy_header(dtype, n):
+    text = "{{'descr': {!r}, 'fortran_order': False, 'shape': ({},), }}".format(dtype.str, n)
+    pad = HEADER_LEN - 10 - len(text) - 1
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", HEADER_LEN - 10) + text.encode() + b" " * pad + b"\n"
+
+
+def _read_count(path, dtype):
+    with open(path, "rb") as f:
+        head = f.read(HEADER_LEN)
+    if len(head) < HEADER_LEN or not head.startswith(b"\x93NUMPY\x01\x00"):
+        raise ValueError("列ファイルではありません: " + path)
+    info = ast.literal_eval(head[10:].decode().strip())
+    if np.dtype(info["descr"]) != dtype:
+        raise ValueError("dtype が一致しません: " + path)
+    return info["shape"][0]
+
+
+class ColumnStore:
+    """
+    1列 = 1ファイル（directory/<名前>.npy）の追記専用ストア
+
+    append() はデータを末尾に書いてからヘッダーの件数を書き換える。
+    途中で止まった場合は、開き直したときに全列で揃っている件数まで切り詰める。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.files = {}
+        counts = []
+        for name, dtype in COLUMNS:
+            dtype = np.dtype(dtype)
+            path = os.path.join(directory, name + ".npy")
+            if os.path.exists(path):
+                counts.append(_read_count(path, dtype))
+            else:
+                with open(path, "wb") as f:
+                    f.write(_npy_header(dtype, 0))
+                counts.append(0)
+        self.count = min(counts)
+        for name, dtype in COLUMNS:
+            dtype = np.dtype(dtype)
+            f = open(os.path.join(directory, name + ".npy"), "r+b")
+            f.truncate(HEADER_LEN + self.count * dtype.itemsize)
+            f.seek(0)
+            f.write(_npy_header(dtype, self.count))
+            self.files[name] = (f, dtype)
+
+    def append(self, columns, n):
+        """columns: {名前: 配列}（先頭 n 件を追記）"""
+        if n == 0:
+            return
+        for name, (f, dtype) in self.files.items():
+            f.seek(0, 2)
+            f.write(memoryview(columns[name][:n]).cast("B"))
+        self.count += n
+        for name, (f, dtype) in self.files.items():
+            f.flush()
+            f.seek(0)
+            f.write(_npy_header(dtype, self.count))
+            f.flush()
+
+    def close(self):
+        for f, _ in self.files.values():
+            f.close()
+        self.files = {}
+
+
+def load(directory, mmap=True):
+    """保存した列を {名前: 配列} で返す（mmap=True ならメモリマップ）"""
+    mode = "r" if mmap else None
+    cols = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode=mode)
+            for name, _ in COLUMNS}
+    n = min(len(c) for c in cols.values())
+    return {name: c[:n] for name, c in cols.items()}
+
+
+# ---------------------------------------------------------------------------
+# 受信バッファ
+
+class Buffer:
+    """列ごとに事前確保した配列（capacity 件分）"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.cols = {name: np.zeros(capacity, dtype) for name, dtype in COLUMNS}
+        self.n = 0
+
+    def room(self):
+        return self.capacity - self.n
+
+    def add_row(self, car, recv_us, seq, ts, mask, left, right, error, turn, base):
+        i = self.n
+        c = self.cols
+        c["car"][i] = car
+        c["recv_us"][i] = recv_us
+        c["seq"][i] = seq
+        c["timestamp"][i] = ts
+        c["sensors"][i] = mask
+        c["left_speed"][i] = left
+        c["right_speed"][i] = right
+        c["error"][i] = error
+        c["turn"][i] = turn
+        c["base_speed"][i] = base
+        self.n = i + 1
+
+    def add_frames(self, frames, car, recv_us):
+        """FRAME_DTYPE の配列を追加（room() 以下の件数であること）"""
+        i, j = self.n, self.n + len(frames)
+        c = self.cols
+        c["car"][i:j] = car
+        c["recv_us"][i:j] = recv_us
+        c["seq"][i:j] = frames["seq"]
+        c["timestamp"][i:j] = frames["ticks"]
+        c["sensors"][i:j] = frames["mask"]
+        c["left_speed"][i:j] = frames["left"]
+        c["right_speed"][i:j] = frames["right"]
+        c["error"][i:j] = frames["error"] / np.float32(telemetry_frame.ERROR_SCALE)
+        c["turn"][i:j] = frames["turn"].astype(np.int32) << telemetry_frame.TURN_SHIFT
+        c["base_speed"][i:j] = frames["base_speed"]
+        self.n = j
+
+
+def decode_delta(data):
+    """変化時のみの形式（src/delta_telemetry.py）を周期ごとに展開して FRAME_DTYPE の配列に"""
+    try:
+        runs = list(delta_telemetry.iter_runs(data))
+    except (ValueError, IndexError) as e:
+        raise PayloadError("変化時のみの形式が不正です: {}".format(e))
+    if not runs:
+        raise PayloadError("レコードがありません")
+    cols = np.array([r[:10] for r in runs], np.int64).T
+    seq0, t0, k0, run, mask, left, right, error, turn, base = cols
+    period_us = np.array([r[10] for r in runs], np.int64)
+    count = int(run.sum())
+    frames = np.zeros(count, FRAME_DTYPE)
+    # 各周期のバッチ内の周期番号 = その状態の先頭の周期番号 + 状態内の位置
+    k = np.repeat(k0, run) + np.arange(count) - np.repeat(np.cumsum(run) - run, run)
+    frames["version"] = telemetry_frame.FRAME_VERSION
+    frames["seq"] = (np.repeat(seq0, run) + k) & 0xFFFF
+    frames["ticks"] = (np.repeat(t0, run) + k * np.repeat(period_us, run) // 1000) & 0xFFFFFFFF
+    frames["mask"] = np.repeat(mask, run)
+    frames["left"] = np.repeat(left, run)
+    frames["right"] = np.repeat(right, run)
+    frames["error"] = np.repeat(error, run)
+    frames["turn"] = np.repeat(turn, run)
+    frames["base_speed"] = np.repeat(base, run)
+    return frames
+
+
+def decode_frames(data):
+    """
+    バイナリフレーム（バッチ・deflate圧縮を含む）を FRAME_DTYPE の配列に
+
+    先頭のバージョン番号が DELTA_VERSION なら変化時のみの形式として展開する。
+    """
+    if data[:1] == b"\x78":
+        try:
+            data = zlib.decompress(data)
+        except zlib.error as e:
+            raise PayloadError("展開できません: {}".format(e))
+    if data[:1] == bytes([delta_telemetry.DELTA_VERSION]):
+        return decode_delta(data)
+    if not data or len(data) % telemetry_frame.FRAME_SIZE:
+        raise PayloadError("データ長がフレーム長の倍数ではありません")
+    frames = np.frombuffer(data, FRAME_DTYPE)
+    if (frames["version"] != telemetry_frame.FRAME_VERSION).any():
+        raise PayloadError("未対応のフレームバージョン")
+    return frames
+
+
+def decode_json(data):
+    """send_telemetry() のJSON（1サンプル）を add_row() の引数の並びに"""
+    try:
+        obj = json.loads(data)
+        motor = obj["motor"]
+        control = obj["control"]
+        mask = 0
+        for i, v in enumerate(obj["sensors"]):
+            if v:
+                mask |= 1 << i
+        return (-1, obj["timestamp"], mask, motor["left_speed"], motor["right_speed"],
+                control["error"], control["turn"], control["base_speed"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise PayloadError("JSONが不正です: {!r}".format(e))
+
+
+# ---------------------------------------------------------------------------
+# サーバー
+
+class IngestServer:
+    """
+    HTTP / UDP で受け取ったサンプルをバッファに溜め、ColumnStore に書き出す
+
+    書き出しはバッファを新しいものと入れ替えてから別スレッドで行うため、
+    受信処理はファイル書き込みを待たない（書き出しは1つずつ順番に行う）。
+    """
+
+    def __init__(self, directory, buffer_samples=65536, flush_interval=1.0):
+        self.store = ColumnStore(directory)
+        self.directory = directory
+        self.buffer_samples = buffer_samples
+        self.flush_interval = flush_interval
+        self.buf = Buffer(buffer_samples)
+        self.spare = []
+        self.pending = []          # 書き出し待ちのタスク
+        self.lock = asyncio.Lock()
+        self.cars = {}
+        self.rates = {}            # 車体ごとの直近の X-Telemetry-Interval / X-Telemetry-Batch
+        cars_path = os.path.join(directory, "cars.json")
+        if os.path.exists(cars_path):
+            with open(cars_path) as f:
+                self.cars = {name: int(i) for name, i in json.load(f).items()}
+
+        # 統計
+        self.requests = 0
+        self.samples = 0
+        self.bytes = 0
+        self.errors = 0
+        self.flushes = 0
+        self.flush_ms_max = 0.0
+        self.handle_us = np.zeros(65536, np.float32)  # 直近のリクエスト処理時間（リング）
+        self.handled = 0
+
+    def car_id(self, name):
+        car = self.cars.get(name)
+        if car is None:
+            car = self.cars[name] = len(self.cars)
+            with open(os.path.join(self.directory, "cars.json"), "w") as f:
+                json.dump(self.cars, f, ensure_ascii=False, indent=1)
+        return car
+
+    # --- バッファ ---
+
+    def _rotate(self):
+        full = self.buf
+        self.buf = self.spare.pop() if self.spare else Buffer(self.buffer_samples)
+        self.pending.append(asyncio.ensure_future(self._write(full)))
+
+    async def _write(self, buf):
+        async with self.lock:
+            start = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.store.append, buf.cols, buf.n)
+            ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        if ms > self.flush_ms_max:
+            self.flush_ms_max = ms
+        buf.n = 0
+        self.spare.append(buf)
+
+    def ingest(self, data, content_type, car):
+        """本文をデコードしてバッファに追加し、サンプル数を返す"""
+        recv_us = time.time_ns() // 1000
+        if content_type.startswith(b"application/json"):
+            row = decode_json(data)
+            if self.buf.room() == 0:
+                self._rotate()
+            self.buf.add_row(car, recv_us, *row)
+            n = 1
+        else:
+            frames = decode_frames(data)
+            n = len(frames)
+            pos = 0
+            while pos < n:
+                if self.buf.room() == 0:
+                    self._rotate()
+                k = min(self.buf.room(), n - pos)
+                self.buf.add_frames(frames[pos:pos + k], car, recv_us)
+                pos += k
+        if self.buf.room() == 0:
+            self._rotate()
+        self.samples += n
+        return n
+
+    async def flush(self):
+        """バッファの残りを書き出し、書き出し中のものも含めて完了を待つ"""
+        if self.buf.n:
+            self._rotate()
+        pending, self.pending = self.pending, []
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def flush_task(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.pending = [t for t in self.pending if not t.done()]
+            if self.buf.n:
+                self._rotate()
+
+    # --- HTTP ---
+
+    async def handle_http(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        peer = peer[0] if peer else "?"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path = (line.split(None, 2) + [b"", b""])[:2]
+                length = 0
+                content_type = b""
+                encoding = b""
+                car_name = None
+                interval = batch = None
+                close = False
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.partition(b":")
+                    name = name.strip().lower()
+                    value = value.strip()
+                    if name == b"content-length":
+                        length = int(value)
+                    elif name == b"content-type":
+                        content_type = value.lower()
+                    elif name == b"content-encoding":
+                        encoding = value.lower()
+                    elif name == b"x-car-id":
+                        car_name = value.decode(errors="replace")
+                    elif name == b"x-telemetry-interval":
+                        interval = int(value)
+                    elif name == b"x-telemetry-batch":
+                        batch = int(value)
+                    elif name == b"connection":
+                        close = value.lower() == b"close"
+                if length > MAX_BODY:
+                    writer.write(b"HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                body = await reader.readexactly(length)
+                start = time.perf_counter()
+                self.requests += 1
+                self.bytes += length
+
+                if method != b"POST" or path.split(b"?")[0] != PATH.encode():
+                    status, reply = b"404 Not Found", b'{"ok":false}'
+                else:
+                    try:
+                        # deflate 指定時も decode_frames() がzlibヘッダーで判別する
+                        if encoding == b"deflate" and content_type.startswith(b"application/json"):
+                            body = zlib.decompress(body)
+                        car = self.car_id(car_name or peer)
+                        n = self.ingest(body, content_type, car)
+                        if interval is not None:
+                            self.rates[car] = (interval, batch)
+                        status, reply = b"200 OK", b'{"ok":true,"samples":%d}' % n
+                    except (PayloadError, zlib.error) as e:
+                        self.errors += 1
+                        status, reply = b"400 Bad Request", json.dumps({"ok": False, "error": str(e)}).encode()
+
+                writer.write(b"HTTP/1.1 %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n%s" % (
+                    status, len(reply), b"Connection: close\r\n" if close else b"", reply))
+                self.handle_us[self.handled & 0xFFFF] = (time.perf_counter() - start) * 1e6
+                self.handled += 1
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # --- 統計 ---
+
+    def report(self, elapsed, final=False):
+        n = min(self.handled, len(self.handle_us))
+        p99 = float(np.percentile(self.handle_us[:n], 99)) if n else 0.0
+        print("{}受信 {} 件 / {} サンプル ({:.0f} サンプル/s) | 不正 {} | 処理 p99 {:.0f}us | "
+              "書き出し {} 回, 最大 {:.1f}ms | 保存済み {}".format(
+                  "[最終] " if final else "", self.requests, self.samples,
+                  self.samples / elapsed if elapsed > 0 else 0.0, self.errors, p99,
+                  self.flushes, self.flush_ms_max, self.store.count), flush=True)
+        if final and self.rates:
+            # 送信側が自動調整した送信間隔（バイナリ形式のヘッダーから）
+            print("送信間隔: " + ", ".join(
+                "車体{} {}ms/バッチ{}".format(car, interval, batch)
+                for car, (interval, batch) in sorted(self.rates.items())), flush=True)
+
+
+class UdpProtocol(asyncio.DatagramProtocol):
+    """1データグラム = 1個以上の連結されたバイナリフレーム"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        server = self.server
+        server.requests += 1
+        server.bytes += len(data)
+        try:
+            server.ingest(data, b"", server.car_id(addr[0]))
+        except PayloadError:
+            server.errors += 1
+
+
+async def serve(args, ready=None):
+    server = IngestServer(args.output, args.buffer, args.flush_interval)
+    http = await asyncio.start_server(server.handle_http, args.host, args.port, backlog=1024)
+    transport = None
+    if args.udp_port is not None:
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: UdpProtocol(server), local_addr=(args.host, args.udp_port))
+    port = http.sockets[0].getsockname()[1]
+    if not args.quiet:
+        print("受信待機中: http://{}:{}{}{} → {}（既存 {} サンプル）".format(
+            args.host, port, PATH,
+            " / udp {}".format(args.udp_port) if args.udp_port is not None else "",
+            args.output, server.store.count), flush=True)
+    if ready is not None:
+        ready(port)
+
+    flusher = asyncio.ensure_future(server.flush_task())
+    start = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL_S)
+            if not args.quiet:
+                server.report(time.monotonic() - start)
+    finally:
+        flusher.cancel()
+        http.close()
+        if transport is not None:
+            transport.close()
+        await server.flush()
+        server.store.close()
+        server.report(time.monotonic() - start, final=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="テレメトリ受信サーバー（列ごとの .npy に保存）")
+    parser.add_argument("output", help="保存先ディレクトリ（既存なら追記）")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--udp-port", type=int, help="UDPフレームも受信する（例: 5005）")
+    parser.add_argument("--buffer", type=int, default=65536, help="1回の書き出しの最大サンプル数")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="書き出し間隔 [秒]")
+    parser.add_argument("--quiet", action="store_true", help="定期的な表示をしない")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
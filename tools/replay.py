@@ -0,0 +1,180 @@
+"""
+センサー記録の再生（ホストPC用）
+
+test/integration_test/test_02.py などで記録したセンサーパターン
+（src/sensor_log.py の形式）を src/control.py の制御則に流し込み、
+モーター指令の列を求める。制御パラメータを変えたときに、実走行の
+記録に対して出力がどう変わるかを回帰テストできる。
+
+使い方:
+    # 再生してモーター指令をCSVに保存
+    python tools/replay.py run sensors.slog -o baseline.csv
+    # パラメータを変えて再生し、保存済みの出力と比較（差があれば終了コード1）
+    python tools/replay.py run sensors.slog --kd 4000 --against baseline.csv
+    # サーバーに送られたJSON（1行1件, timestamp と sensors）を記録形式に変換
+    python tools/replay.py convert telemetry.jsonl sensors.slog
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import control  # noqa: E402
+import sensor_log  # noqa: E402
+from car_params import DEFAULT_PARAMS  # noqa: E402
+
+COLUMNS = ["t_ms", "mask", "error", "turn", "left", "right"]
+
+
+def make_controller(params):
+    p = dict(DEFAULT_PARAMS)
+    p.update(params)
+    return control.LineController(
+        p["base_speed"], p["kp"], p["kd"], p["weights"],
+        p["left_correction"], p["right_correction"],
+        p["min_speed_factor"], p["slowdown"]
+    )
+
+
+def resample(records, period_ms):
+    """制御周期ごとのパターン列に変換（各時刻で直前のレコードを保持）"""
+    if not records:
+        return []
+    out = []
+    i = 0
+    n = len(records)
+    end = records[-1][0]
+    t = 0
+    while t <= end:
+        while i + 1 < n and records[i + 1][0] <= t:
+            i += 1
+        out.append((t, records[i][1]))
+        t += period_ms
+    return out
+
+
+def replay(samples, ctl):
+    """(時刻, マスク) の列を制御則に通し、出力行のリストを返す"""
+    rows = []
+    step = ctl.step
+    append = rows.append
+    for t, mask in samples:
+        step(mask)
+        append((t, mask, ctl.error, ctl.turn, ctl.left, ctl.right))
+    return rows
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        w.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        r = csv.reader(f)
+        next(r)
+        return [tuple(int(v) for v in row) for row in r]
+
+
+def compare(rows, baseline):
+    """差のある行数と最初の差（行番号, 今回, 基準）を返す"""
+    diffs = 0
+    first = None
+    for i in range(max(len(rows), len(baseline))):
+        a = rows[i] if i < len(rows) else None
+        b = baseline[i] if i < len(baseline) else None
+        if a != b:
+            diffs += 1
+            if first is None:
+                first = (i, a, b)
+    return diffs, first
+
+
+def cmd_run(args):
+    records = sensor_log.load(args.recording)
+    if not records:
+        print("記録が空です")
+        return 1
+    params = {k: getattr(args, k) for k in ("base_speed", "kp", "kd", "min_speed_factor", "slowdown")
+              if getattr(args, k) is not None}
+    samples = records if args.raw else resample(records, 1000 // args.hz)
+    ctl = make_controller(params)
+
+    wall = time.perf_counter()
+    rows = replay(samples, ctl)
+    wall = time.perf_counter() - wall
+
+    duration = records[-1][0] / 1000
+    lost = sum(1 for r in rows if r[1] == control.LOST_MASK)
+    print(f"記録: {len(records)} レコード, {duration:.1f}s")
+    print(f"再生: {len(rows)} ステップ, {wall * 1000:.1f}ms"
+          f"（実時間の {duration / wall:.0f} 倍）")
+    print(f"ライン未検出: {lost} ステップ")
+
+    if args.output:
+        write_csv(args.output, rows)
+        print(f"出力を保存: {args.output}")
+    if args.against:
+        diffs, first = compare(rows, read_csv(args.against))
+        if diffs:
+            i, a, b = first
+            print(f"❌ {args.against} と {diffs} 行異なります（最初: {i} 行目）")
+            print(f"   今回: {a}")
+            print(f"   基準: {b}")
+            return 1
+        print(f"✅ {args.against} と一致")
+    return 0
+
+
+def cmd_convert(args):
+    rec = sensor_log.Recorder(args.output)
+    with open(args.input) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            d = json.loads(line)
+            mask = 0
+            for i, v in enumerate(d["sensors"]):
+                if v:
+                    mask |= 1 << i
+            rec.append(int(d["timestamp"]), mask)
+    rec.close()
+    print(f"{rec.count} レコードを {args.output} に変換しました")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="センサー記録の再生")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="記録を制御則に流してモーター指令を求める")
+    run.add_argument("recording")
+    run.add_argument("-o", "--output", help="モーター指令をCSVに保存")
+    run.add_argument("--against", help="保存済みCSVと比較（差があれば終了コード1）")
+    run.add_argument("--hz", type=int, default=100, help="再生時の制御周波数")
+    run.add_argument("--raw", action="store_true", help="リサンプルせず1レコード1ステップで再生")
+    run.add_argument("--base-speed", type=int)
+    run.add_argument("--kp", type=int)
+    run.add_argument("--kd", type=int)
+    run.add_argument("--min-speed-factor", type=float)
+    run.add_argument("--slowdown", type=float)
+    run.set_defaults(func=cmd_run)
+
+    conv = sub.add_parser("convert", help="JSON Lines（timestamp, sensors）を記録形式に変換")
+    conv.add_argument("input")
+    conv.add_argument("output")
+    conv.set_defaults(func=cmd_convert)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
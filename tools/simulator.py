@@ -0,0 +1,388 @@
+"""
+ライントレースカーのシミュレータ（ホストPC用, NumPy）
+
+実機を動かさずに KP / KD / WEIGHTS / BASE_SPEED などを試すためのもの。
+
+- コース: 黒線をTrueとしたラスタ画像（mm単位の解像度）
+- センサー: 8個のフォトリフレクタ。各センサーは小さな円形の受光範囲を
+  数点でサンプリングし、半分以上が黒なら 0（黒）を返す
+- 制御: src/control.py の LineController と同じ整数演算の制御則
+  （センサーパターン別テーブル + ERROR_DEN 倍の誤差）をNumPyで実行
+- モーター: dutyに比例する目標速度への一次遅れ + 不感帯。左右のゲイン差は
+  実機の LEFT_MOTOR_CORRECTION で打ち消される前提の既定値
+- 車体: 差動二輪の運動学（max_lateral_accel を指定すると、それを超える旋回は曲がりきれない）
+
+N台分のパラメータを配列で渡すと、全車を1回のNumPy演算でまとめて進める。
+
+使い方:
+    python tools/simulator.py [--seconds 60] [--cars 1] [--track track.npy]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import control  # noqa: E402
+from car_params import DEFAULT_PARAMS  # noqa: E402  src/main.py の既定値
+
+SENSOR_COUNT = control.SENSOR_COUNT
+
+# 車体・モーターの既定値（実測値がないため目安）
+DEFAULT_CAR = {
+    "track_width": 100.0,       # 左右車輪の間隔 [mm]
+    "sensor_offset": 60.0,      # 車軸からセンサー列までの距離 [mm]
+    "sensor_pitch": 8.0,        # センサー間隔 [mm]
+    "sensor_radius": 1.5,       # 受光範囲の半径 [mm]
+    "mm_per_s_per_duty": 0.04,  # duty 1 あたりの車輪速度 [mm/s]（右モーター基準）
+    "left_motor_gain": 1 / 0.77,
+    "right_motor_gain": 1.0,
+    "motor_tau": 0.05,          # モーターの時定数 [s]
+    "min_duty": 1500,           # これ未満のdutyでは車輪が回らない
+    "lost_timeout": 1.0,        # この時間ライン未検出が続いたらコースアウト [s]
+    "max_lateral_accel": None,  # 横方向の加速度の上限 [mm/s^2]（超える旋回は外側に滑る。None = 制限なし）
+}
+
+
+class Track:
+    """
+    ラスタ化したコース
+
+    image[y, x] が True の画素が黒線。ラップ計測はコース中心 center の周りの
+    回転角で行うため、中心から見て線が一周する（星形の）コースを前提とする。
+    """
+
+    def __init__(self, image, mm_per_px, start, center):
+        self.image = np.asarray(image, dtype=bool)
+        self.mm_per_px = float(mm_per_px)
+        self.start = tuple(start)      # (x, y, 向き[rad])
+        self.center = tuple(center)    # (x, y) [mm]
+
+    @property
+    def size_mm(self):
+        h, w = self.image.shape
+        return w * self.mm_per_px, h * self.mm_per_px
+
+    def is_black(self, x, y):
+        """座標 [mm] の画素が黒か（コース外は白）"""
+        h, w = self.image.shape
+        ix = np.floor(x / self.mm_per_px).astype(np.int64)
+        iy = np.floor(y / self.mm_per_px).astype(np.int64)
+        inside = (ix >= 0) & (ix < w) & (iy >= 0) & (iy < h)
+        out = np.zeros(np.shape(x), dtype=bool)
+        out[inside] = self.image[iy[inside], ix[inside]]
+        return out
+
+    @classmethod
+    def load(cls, path, mm_per_px, start, center):
+        """.npy（bool配列）または画像ファイル（暗い画素 = 黒線, Pillowが必要）から読み込む"""
+        if path.endswith(".npy"):
+            image = np.load(path)
+        else:
+            from PIL import Image
+            image = np.asarray(Image.open(path).convert("L")) < 128
+        return cls(image, mm_per_px, start, center)
+
+
+def make_track(r0=600.0, a=0.25, b=0.12, line_width=19.0, mm_per_px=1.0, margin=150.0):
+    """
+    極座標 r(φ) = r0 (1 + a cos 2φ + b sin 3φ) の閉じたコースを生成
+
+    a で楕円らしさ（直線に近い区間）、b で左右非対称のカーブを作る。
+    線からの距離は動径方向の差を法線方向に換算して求める。
+    """
+    extent = r0 * (1 + abs(a) + abs(b)) + margin
+    n = int(math.ceil(2 * extent / mm_per_px))
+    coords = (np.arange(n) + 0.5) * mm_per_px - extent
+    x, y = np.meshgrid(coords, coords)
+    rho = np.hypot(x, y)
+    phi = np.arctan2(y, x)
+    r = r0 * (1 + a * np.cos(2 * phi) + b * np.sin(3 * phi))
+    dr = r0 * (-2 * a * np.sin(2 * phi) + 3 * b * np.cos(3 * phi))
+    dist = np.abs(rho - r) * r / np.hypot(r, dr)
+    image = dist <= line_width / 2
+
+    # φ = 0 の点から反時計回り（φが増える向き）にスタート
+    r_start = r0 * (1 + a)
+    dr_start = r0 * 3 * b
+    heading = math.atan2(r_start, dr_start)
+    start = (extent + r_start, extent, heading)
+    return Track(image, mm_per_px, start, (extent, extent))
+
+
+def _broadcast(value, n, dtype):
+    arr = np.asarray(value, dtype=dtype)
+    if arr.ndim == 0:
+        arr = np.full(n, arr, dtype=dtype)
+    if arr.shape != (n,):
+        raise ValueError("パラメータの形が台数と合いません: {}".format(arr.shape))
+    return arr
+
+
+def build_tables(params, n):
+    """LineController と同じ誤差・減速係数テーブルを (台数, 256) で作る"""
+    masks = np.arange(256)
+    bits = (masks[:, None] >> np.arange(SENSOR_COUNT)) & 1
+    detected = (bits == 0).astype(np.int64)              # (256, 8)
+    count = detected.sum(axis=1)                         # (256,)
+    safe = np.maximum(count, 1)
+
+    weights = np.asarray(params["weights"], dtype=np.int64)
+    if weights.ndim == 1:
+        weights = np.broadcast_to(weights, (n, SENSOR_COUNT))
+    total = weights @ detected.T                         # (n, 256)
+    err = -(total * control.ERROR_DEN // safe)
+    err[:, count == 0] = 0
+
+    slowdown = _broadcast(params["slowdown"], n, float)
+    min_factor = _broadcast(params["min_speed_factor"], n, float)
+    sf_den = np.round(slowdown * control.ERROR_DEN).astype(np.int64)
+    sf_min = np.round(min_factor * sf_den).astype(np.int64)
+    sf = np.maximum(sf_min[:, None], sf_den[:, None] - np.abs(err))
+    return err, sf, sf_den
+
+
+class Simulator:
+    """
+    N台のライントレースカーをまとめて進めるシミュレータ
+
+    params の各値はスカラー（全車共通）または長さNの配列（車ごと）。
+    weights は長さ8、または (N, 8)。
+    """
+
+    def __init__(self, track, n=1, params=None, car=None, dt=0.01, substeps=2):
+        self.track = track
+        self.n = n
+        self.dt = dt
+        self.substeps = substeps
+        p = dict(DEFAULT_PARAMS)
+        p.update(params or {})
+        c = dict(DEFAULT_CAR)
+        c.update(car or {})
+        self.params = p
+        self.car = c
+
+        self.base = _broadcast(p["base_speed"], n, np.int64)
+        self.kp = _broadcast(p["kp"], n, np.int64)
+        self.kd = _broadcast(p["kd"], n, np.int64)
+        self.left_corr = np.round(_broadcast(p["left_correction"], n, float)
+                                  * control.CORRECTION_DEN).astype(np.int64)
+        self.right_corr = np.round(_broadcast(p["right_correction"], n, float)
+                                   * control.CORRECTION_DEN).astype(np.int64)
+        self.err_lut, self.sf_lut, self.sf_den = build_tables(p, n)
+        self.rows = np.arange(n)
+
+        # センサーの受光範囲のサンプル点（車体座標: 前方, 左方）[mm]
+        lateral = (3.5 - np.arange(SENSOR_COUNT)) * c["sensor_pitch"]
+        rad = c["sensor_radius"]
+        spots = [(0.0, 0.0), (rad, 0.0), (-rad, 0.0), (0.0, rad), (0.0, -rad)]
+        self.sample_fwd = np.array([[c["sensor_offset"] + f for f, _ in spots]] * SENSOR_COUNT)
+        self.sample_left = np.array([[lat + l for _, l in spots] for lat in lateral])
+        self.bit_weights = (1 << np.arange(SENSOR_COUNT)).astype(np.int64)
+
+        self.reset()
+
+    def reset(self):
+        n = self.n
+        x0, y0, th0 = self.track.start
+        self.x = np.full(n, float(x0))
+        self.y = np.full(n, float(y0))
+        self.th = np.full(n, float(th0))
+        self.v_left = np.zeros(n)
+        self.v_right = np.zeros(n)
+
+        self.last_error = np.zeros(n, dtype=np.int64)
+        self.last_sf = self.sf_den.copy()
+        self.error = np.zeros(n, dtype=np.int64)
+        self.turn = np.zeros(n, dtype=np.int64)
+        self.left = np.zeros(n, dtype=np.int64)
+        self.right = np.zeros(n, dtype=np.int64)
+        self.mask = np.full(n, control.LOST_MASK, dtype=np.int64)
+
+        cx, cy = self.track.center
+        self.angle = np.arctan2(self.y - cy, self.x - cx)
+        self.progress = np.zeros(n)   # 周回数（連続値）
+        self.t = 0.0
+        self.steps = 0
+        self.laps = np.zeros(n, dtype=np.int64)
+        self.lap_start = np.zeros(n)
+        self.best_lap = np.full(n, np.nan)
+        self.first_lap = np.full(n, np.nan)
+        self.line_lost_events = np.zeros(n, dtype=np.int64)
+        self.lost_time = np.zeros(n)
+        self.off_track = np.zeros(n, dtype=bool)
+        self.err_sq_sum = np.zeros(n)
+        self.turn_sign_changes = np.zeros(n, dtype=np.int64)
+        self.last_turn_sign = np.zeros(n, dtype=np.int64)
+
+    def read_sensors(self):
+        """全車のセンサーパターン（bit i = センサー i の値, 0 = 黒）"""
+        cos = np.cos(self.th)[:, None, None]
+        sin = np.sin(self.th)[:, None, None]
+        fwd = self.sample_fwd[None]
+        left = self.sample_left[None]
+        sx = self.x[:, None, None] + fwd * cos - left * sin
+        sy = self.y[:, None, None] + fwd * sin + left * cos
+        black = self.track.is_black(sx, sy).mean(axis=2) >= 0.5    # (n, 8)
+        return (~black).astype(np.int64) @ self.bit_weights
+
+    def control_step(self, mask):
+        """control.LineController.step() と同じ整数演算"""
+        lost = mask == control.LOST_MASK
+        last = self.last_error
+        e = np.where(lost, last, self.err_lut[self.rows, mask])
+        sf = np.where(lost, self.last_sf, self.sf_lut[self.rows, mask])
+        self.last_sf = sf
+
+        num = self.kp * e + self.kd * (e - last)
+        turn = np.where(num >= 0, num // control.ERROR_DEN, -(-num // control.ERROR_DEN))
+        self.last_error = e
+        self.error = e
+        self.turn = turn
+
+        base = self.base
+        turn = np.clip(turn, -base, base)
+        left = (base - turn) * sf // self.sf_den * self.left_corr // control.CORRECTION_DEN
+        right = (base + turn) * sf // self.sf_den * self.right_corr // control.CORRECTION_DEN
+        self.left = np.minimum(left, control.PWM_MAX)
+        self.right = np.minimum(right, control.PWM_MAX)
+        self.mask = mask
+
+    def physics(self, dt):
+        c = self.car
+        k = c["mm_per_s_per_duty"]
+        target_l = np.where(self.left >= c["min_duty"], self.left * k * c["left_motor_gain"], 0.0)
+        target_r = np.where(self.right >= c["min_duty"], self.right * k * c["right_motor_gain"], 0.0)
+        alpha = 1.0 - math.exp(-dt / c["motor_tau"])
+        self.v_left += (target_l - self.v_left) * alpha
+        self.v_right += (target_r - self.v_right) * alpha
+        # コースアウトした車は停止
+        self.v_left[self.off_track] = 0.0
+        self.v_right[self.off_track] = 0.0
+
+        v = (self.v_left + self.v_right) / 2
+        omega = (self.v_right - self.v_left) / c["track_width"]
+        if c["max_lateral_accel"] is not None:
+            # タイヤのグリップ: v × ω が上限を超える分は曲がりきれない
+            limit = c["max_lateral_accel"] / np.maximum(np.abs(v), 1e-6)
+            omega = np.clip(omega, -limit, limit)
+        mid = self.th + omega * dt / 2
+        self.x += v * np.cos(mid) * dt
+        self.y += v * np.sin(mid) * dt
+        self.th += omega * dt
+
+    def update_metrics(self):
+        dt = self.dt
+        lost = self.mask == control.LOST_MASK
+        was_lost = self.lost_time > 0
+        self.line_lost_events += (lost & ~was_lost & ~self.off_track)
+        self.lost_time = np.where(lost, self.lost_time + dt, 0.0)
+        self.off_track |= self.lost_time >= self.car["lost_timeout"]
+
+        e = self.error / control.ERROR_DEN
+        self.err_sq_sum += e * e
+        sign = np.sign(self.turn)
+        self.turn_sign_changes += (sign != 0) & (self.last_turn_sign != 0) & (sign != self.last_turn_sign)
+        self.last_turn_sign = np.where(sign != 0, sign, self.last_turn_sign)
+
+        # 周回（コース中心周りの回転角）
+        cx, cy = self.track.center
+        angle = np.arctan2(self.y - cy, self.x - cx)
+        d = (angle - self.angle + np.pi) % (2 * np.pi) - np.pi
+        self.angle = angle
+        self.progress += d / (2 * np.pi)
+        done = np.floor(self.progress).astype(np.int64)
+        new_lap = (done > self.laps) & ~self.off_track
+        if new_lap.any():
+            lap_time = self.t - self.lap_start
+            self.best_lap = np.where(new_lap, np.fmin(self.best_lap, lap_time), self.best_lap)
+            self.first_lap = np.where(new_lap & np.isnan(self.first_lap), self.t, self.first_lap)
+            self.lap_start = np.where(new_lap, self.t, self.lap_start)
+            self.laps = np.where(new_lap, done, self.laps)
+
+    def step(self):
+        """制御1周期分進める"""
+        mask = self.read_sensors()
+        self.control_step(mask)
+        sub = self.dt / self.substeps
+        for _ in range(self.substeps):
+            self.physics(sub)
+        self.t += self.dt
+        self.steps += 1
+        self.update_metrics()
+
+    def run(self, seconds, until_laps=None):
+        """
+        seconds 秒分進めて結果を返す
+
+        until_laps を指定すると、全車がその周回数を終えるかコースアウトした時点で打ち切る。
+        """
+        for _ in range(int(round(seconds / self.dt))):
+            self.step()
+            if until_laps is not None and np.all((self.laps >= until_laps) | self.off_track):
+                break
+        return self.results()
+
+    def results(self):
+        steps = max(self.steps, 1)
+        return {
+            "time": self.t,
+            "laps": self.laps.copy(),
+            "first_lap": self.first_lap.copy(),
+            "best_lap": self.best_lap.copy(),
+            "line_lost": self.line_lost_events.copy(),
+            "off_track": self.off_track.copy(),
+            "error_rms": np.sqrt(self.err_sq_sum / steps),
+            "turn_sign_changes": self.turn_sign_changes.copy(),
+        }
+
+
+def _format_lap(t):
+    # 1周もしていなければ nan なので "-" にする
+    return "-" if math.isnan(t) else "{:.2f}s".format(t)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ライントレースカーのシミュレータ")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--cars", type=int, default=1, help="同時に進める台数（同じパラメータ）")
+    parser.add_argument("--track", help="コース画像（.npy または画像ファイル）。省略時は生成")
+    parser.add_argument("--mm-per-px", type=float, default=1.0)
+    parser.add_argument("--start", type=float, nargs=3, metavar=("X", "Y", "TH"),
+                        help="--track 使用時のスタート位置 [mm, mm, rad]")
+    parser.add_argument("--center", type=float, nargs=2, metavar=("X", "Y"),
+                        help="--track 使用時のコース中心 [mm]")
+    args = parser.parse_args()
+
+    if args.track:
+        if args.start is None or args.center is None:
+            parser.error("--track には --start と --center が必要です")
+        track = Track.load(args.track, args.mm_per_px, args.start, args.center)
+    else:
+        track = make_track(mm_per_px=args.mm_per_px)
+
+    sim = Simulator(track, n=args.cars)
+    wall = time.perf_counter()
+    res = sim.run(args.seconds)
+    wall = time.perf_counter() - wall
+
+    print("=" * 50)
+    print("シミュレーション結果（{} 台, {:.0f} 秒）".format(args.cars, res["time"]))
+    print("=" * 50)
+    print("周回数:         {}".format(res["laps"][0]))
+    print("1周目タイム:    {}".format(_format_lap(res["first_lap"][0])))
+    print("ベストラップ:   {}".format(_format_lap(res["best_lap"][0])))
+    print("ライン見失い:   {} 回".format(res["line_lost"][0]))
+    print("コースアウト:   {}".format("あり" if res["off_track"][0] else "なし"))
+    print("誤差RMS:        {:.3f}".format(res["error_rms"][0]))
+    print("turn符号反転:   {} 回".format(res["turn_sign_changes"][0]))
+    print("実行時間:       {:.2f}s（実時間の {:.0f} 倍 x {} 台）".format(
+        wall, res["time"] / wall, args.cars))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+制御パラメータの並列スイープ（ホストPC用）
+
+simulator.py 上で KP / KD / MIN_SPEED_FACTOR / SLOWDOWN の組み合わせを評価し、
+スコア順の表と src/main.py に貼り付けられるパラメータブロックを出力する。
+
+候補はチャンクに分けてプロセスプールの全コアに配り、各チャンクの中は
+Simulator の1回の実行（N台同時）でまとめて評価する。
+
+スコア（小さいほど良い）:
+    ベストラップ[s] + LOST_WEIGHT × ライン見失い回数 + OSC_WEIGHT × 振動[Hz]
+振動は turn の符号反転回数/秒。規定周回を終えられなかった候補は失格（inf）。
+
+使い方:
+    python tools/sweep.py                                   # 既定のグリッド
+    python tools/sweep.py --kp 6000:14000:9 --kd 0:6000:7   # 開始:終了:個数
+    python tools/sweep.py --adaptive 3 --samples 256        # グリッド後に上位周辺を再探索
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import simulator  # noqa: E402
+
+AXES = ("kp", "kd", "min_speed_factor", "slowdown")
+
+# 既定の探索範囲（開始, 終了, 個数）
+DEFAULT_GRID = {
+    "kp": (5000, 13000, 5),
+    "kd": (0, 6000, 4),
+    "min_speed_factor": (0.2, 0.5, 4),
+    "slowdown": (5, 15, 3),
+}
+
+LOST_WEIGHT = 2.0   # ライン見失い1回あたりのペナルティ [s]
+OSC_WEIGHT = 0.05   # 振動 1Hz あたりのペナルティ [s]
+
+_track = None
+
+
+def parse_axis(text):
+    """'a:b:n'（等間隔 n 個）または 'a,b,c'（列挙）を値のリストにする"""
+    if ":" in text:
+        start, stop, count = text.split(":")
+        return list(np.linspace(float(start), float(stop), int(count)))
+    return [float(v) for v in text.split(",")]
+
+
+def normalize(cand):
+    """実機で使える値に丸める（KP/KD は整数）"""
+    return {
+        "kp": int(round(cand["kp"])),
+        "kd": int(round(cand["kd"])),
+        "min_speed_factor": round(float(cand["min_speed_factor"]), 2),
+        "slowdown": round(float(cand["slowdown"]), 2),
+    }
+
+
+def grid(axes):
+    cands = [{}]
+    for name in AXES:
+        cands = [dict(c, **{name: v}) for c in cands for v in axes[name]]
+    return [normalize(c) for c in cands]
+
+
+def evaluate(job):
+    """ワーカープロセス: 候補のチャンクを1回のシミュレーションで評価"""
+    global _track
+    cands, fixed, seconds, laps = job
+    if _track is None:
+        _track = simulator.make_track()
+    params = dict(fixed)
+    for name in AXES:
+        params[name] = [c[name] for c in cands]
+    sim = simulator.Simulator(_track, n=len(cands), params=params)
+    res = sim.run(seconds, until_laps=laps)
+    out = []
+    for i, c in enumerate(cands):
+        finished = res["laps"][i] >= laps and not res["off_track"][i]
+        lap = float(res["best_lap"][i])
+        osc = res["turn_sign_changes"][i] / res["time"]
+        lost = int(res["line_lost"][i])
+        score = lap + LOST_WEIGHT * lost + OSC_WEIGHT * osc if finished else math.inf
+        out.append(dict(c, score=score, lap=lap, lost=lost, osc=osc,
+                        error_rms=float(res["error_rms"][i]), finished=bool(finished)))
+    return out
+
+
+def run_pool(pool, cands, fixed, seconds, laps, chunk):
+    jobs = [(cands[i:i + chunk], fixed, seconds, laps) for i in range(0, len(cands), chunk)]
+    results = []
+    for part in pool.map(evaluate, jobs):
+        results.extend(part)
+    return results
+
+
+def refine(ranked, bounds, samples, spread, rng):
+    """上位候補の周辺を正規分布でサンプリング（範囲内にクリップ）"""
+    top = [r for r in ranked[:max(1, samples // 16)] if r["finished"]] or ranked[:1]
+    cands = []
+    for k in range(samples):
+        center = top[k % len(top)]
+        c = {}
+        for name in AXES:
+            lo, hi = bounds[name]
+            width = (hi - lo) * spread or abs(center[name]) * spread
+            c[name] = float(np.clip(rng.normal(center[name], width), lo, hi))
+        cands.append(normalize(c))
+    return cands
+
+
+def print_table(ranked, count):
+    print(f"{'順位':>4} {'スコア':>8} {'ラップ[s]':>9} {'見失い':>6} {'振動[Hz]':>8} {'誤差RMS':>7}"
+          f" {'KP':>6} {'KD':>6} {'最低速度':>8} {'減速':>6}")
+    for i, r in enumerate(ranked[:count]):
+        score = f"{r['score']:.2f}" if r["finished"] else "失格"
+        print(f"{i + 1:>4} {score:>8} {r['lap']:>9.2f} {r['lost']:>6} {r['osc']:>8.2f} {r['error_rms']:>7.3f}"
+              f" {r['kp']:>6} {r['kd']:>6} {r['min_speed_factor']:>8} {r['slowdown']:>6}")
+
+
+def print_block(best, base_speed):
+    print("# ---- src/main.py に貼り付け ----")
+    print(f"# tools/sweep.py: スコア {best['score']:.2f}, ベストラップ {best['lap']:.2f}s,"
+          f" 見失い {best['lost']} 回 (BASE_SPEED = {base_speed})")
+    print(f"KP = {best['kp']}")
+    print(f"KD = {best['kd']}")
+    print(f"MIN_SPEED_FACTOR = {best['min_speed_factor']}")
+    print(f"SLOWDOWN = {best['slowdown']:g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="制御パラメータの並列スイープ")
+    for name in AXES:
+        start, stop, count = DEFAULT_GRID[name]
+        parser.add_argument("--" + name.replace("_", "-"), default=f"{start}:{stop}:{count}",
+                            help="開始:終了:個数 または a,b,c")
+    parser.add_argument("--base-speed", type=int, default=simulator.DEFAULT_PARAMS["base_speed"])
+    parser.add_argument("--laps", type=int, default=2, help="評価する周回数")
+    parser.add_argument("--seconds", type=float, default=60.0, help="1候補あたりの最大シミュレーション時間")
+    parser.add_argument("--adaptive", type=int, default=0, help="グリッド後の再探索ラウンド数")
+    parser.add_argument("--samples", type=int, default=128, help="再探索1ラウンドあたりの候補数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=32, help="1ジョブで同時に評価する候補数")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--csv", help="全候補の結果をCSVに保存")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    axes = {name: parse_axis(getattr(args, name)) for name in AXES}
+    bounds = {name: (min(v), max(v)) for name, v in axes.items()}
+    fixed = {"base_speed": args.base_speed}
+    rng = np.random.default_rng(args.seed)
+
+    wall = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        cands = grid(axes)
+        print(f"グリッド: {len(cands)} 候補, {args.workers} ワーカー")
+        results += run_pool(pool, cands, fixed, args.seconds, args.laps, args.chunk)
+        spread = 0.15
+        for r in range(args.adaptive):
+            ranked = sorted(results, key=lambda x: x["score"])
+            cands = refine(ranked, bounds, args.samples, spread, rng)
+            print(f"再探索 {r + 1}/{args.adaptive}: {len(cands)} 候補 (幅 {spread:.3f})")
+            results += run_pool(pool, cands, fixed, args.seconds, args.laps, args.chunk)
+            spread /= 2
+    wall = time.perf_counter() - wall
+
+    ranked = sorted(results, key=lambda x: x["score"])
+    finished = sum(r["finished"] for r in ranked)
+    print(f"評価: {len(ranked)} 候補（完走 {finished}）, {wall:.1f}s")
+    print()
+    print_table(ranked, args.top)
+    print()
+    if ranked[0]["finished"]:
+        print_block(ranked[0], args.base_speed)
+    else:
+        print("完走した候補がありません。--seconds を増やすか範囲を見直してください。")
+
+    if args.csv:
+        keys = list(AXES) + ["score", "lap", "lost", "osc", "error_rms", "finished"]
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=keys)
+            w.writeheader()
+            w.writerows(ranked)
+        print(f"結果を保存: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
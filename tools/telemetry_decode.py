@@ -0,0 +1,112 @@
+"""
+バイナリテレメトリフレームのデコーダ（ホストPC用）
+
+フォーマットの定義は src/telemetry_frame.py を参照。
+バッチ送信（TELEMETRY_FORMAT = "batch"）の本文は、deflate圧縮の有無を
+自動判別してデコードする。変化時のみの形式（TELEMETRY_FORMAT = "delta",
+src/delta_telemetry.py）は先頭のバージョン番号で判別し、毎周期のフレームと
+同じ形に展開する。
+
+使い方:
+    python tools/telemetry_decode.py frames.bin > frames.jsonl
+"""
+import json
+import os
+import struct
+import sys
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import telemetry_frame  # noqa: E402
+import delta_telemetry  # noqa: E402
+
+SENSOR_COUNT = 8
+
+
+class FrameError(ValueError):
+    """フレームが壊れている、または未対応のバージョン"""
+
+
+def unpack_sensors(mask):
+    """ビットマスクをセンサー値のリストに戻す"""
+    return [(mask >> i) & 1 for i in range(SENSOR_COUNT)]
+
+
+def decode(buf, offset=0):
+    """
+    buf[offset:] のフレームを1つデコードし、send_telemetry() のJSONと
+    同じ形の dict を返す（シーケンス番号は "seq" に入る）
+    """
+    if len(buf) - offset < telemetry_frame.FRAME_SIZE:
+        raise FrameError("フレームが短すぎます")
+    (version, seq, ticks, mask, left, right,
+     error, turn, base_speed) = struct.unpack_from(telemetry_frame.FRAME_FORMAT, buf, offset)
+    if version != telemetry_frame.FRAME_VERSION:
+        raise FrameError("未対応のフレームバージョン: {}".format(version))
+    return to_dict(seq, ticks, mask, left, right, error, turn, base_speed)
+
+
+def to_dict(seq, ticks, mask, left, right, error, turn, base_speed):
+    """フレームの各項目（error・turn は量子化値のまま）を dict に"""
+    return {
+        "seq": seq,
+        "timestamp": ticks,
+        "sensors": unpack_sensors(mask),
+        "motor": {
+            "left_speed": left,
+            "right_speed": right,
+        },
+        "control": {
+            "error": error / telemetry_frame.ERROR_SCALE,
+            "turn": turn << telemetry_frame.TURN_SHIFT,
+            "base_speed": base_speed,
+        },
+    }
+
+
+def iter_frames(buf):
+    """連結されたフレーム列を順にデコード"""
+    size = telemetry_frame.FRAME_SIZE
+    if len(buf) % size:
+        raise FrameError("データ長がフレーム長の倍数ではありません")
+    for offset in range(0, len(buf), size):
+        yield decode(buf, offset)
+
+
+def decode_delta(data):
+    """変化時のみの形式のバッチ（連結可）を周期ごとの dict のリストに展開"""
+    try:
+        return [to_dict(*t) for t in delta_telemetry.iter_ticks(data)]
+    except (ValueError, IndexError) as e:
+        raise FrameError("変化時のみの形式が不正です: {}".format(e))
+
+
+def decode_batch(data):
+    """
+    バッチ送信の本文をデコードしてフレームのリストを返す
+
+    先頭バイトがzlibヘッダー（0x78）なら展開してからデコードする。
+    展開後の先頭バイト（バージョン番号）が DELTA_VERSION なら変化時のみの形式として展開する。
+    フレームの先頭はバージョン番号なので衝突しない。
+    """
+    if data[:1] == b"\x78":
+        data = zlib.decompress(data)
+    if data[:1] == bytes([delta_telemetry.DELTA_VERSION]):
+        return decode_delta(data)
+    return list(iter_frames(data))
+
+
+def main(argv):
+    if len(argv) != 2:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    with open(argv[1], "rb") as f:
+        data = f.read()
+    for frame in decode_batch(data):
+        print(json.dumps(frame, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
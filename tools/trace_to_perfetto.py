@@ -0,0 +1,79 @@
+"""
+プロファイラのスパンCSVを Chrome trace 形式（JSON）に変換（ホストPC用）
+
+Pico W で config.PROFILE_TRACE_SPANS > 0 にして実行すると、終了時に
+trace.csv（ステージ名,開始us,処理時間us）が保存される。これをPCに
+コピーして変換し、https://ui.perfetto.dev または chrome://tracing で開く。
+
+ステージ名の "." より前（control / debug / telemetry）がトラックになる。
+
+使い方:
+    mpremote cp :trace.csv .
+    python tools/trace_to_perfetto.py trace.csv trace.json
+"""
+import csv
+import json
+import sys
+
+# MicroPython の time.ticks_us() は 2^30 で一周する
+TICKS_PERIOD = 1 << 30
+
+
+def load_spans(path):
+    """CSVを読み、ticks_us の周回を補正した (ステージ名, 開始us, 処理時間us) のリストを返す"""
+    spans = []
+    offset = 0
+    prev = None
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            start = int(row["start_us"])
+            if prev is not None and start + offset < prev - TICKS_PERIOD // 2:
+                offset += TICKS_PERIOD
+            start += offset
+            prev = start
+            spans.append((row["stage"], start, int(row["dur_us"])))
+    return spans
+
+
+def to_chrome_trace(spans):
+    if not spans:
+        return {"traceEvents": []}
+    origin = min(start for _, start, _ in spans)
+    tracks = {}
+    events = []
+    for name, start, dur in spans:
+        group = name.split(".", 1)[0]
+        tid = tracks.setdefault(group, len(tracks) + 1)
+        events.append({
+            "name": name,
+            "cat": group,
+            "ph": "X",
+            "ts": start - origin,
+            "dur": dur,
+            "pid": 1,
+            "tid": tid,
+        })
+    for group, tid in tracks.items():
+        events.append({
+            "name": "thread_name",
+            "ph": "M",
+            "pid": 1,
+            "tid": tid,
+            "args": {"name": group},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main(argv):
+    if len(argv) != 3:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    spans = load_spans(argv[1])
+    with open(argv[2], "w") as f:
+        json.dump(to_chrome_trace(spans), f)
+    print("{} スパンを {} に書き出しました".format(len(spans), argv[2]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,126 @@
+"""
+UDPテレメトリ受信機（ホストPC用）
+
+Pico W が TELEMETRY_TRANSPORT = "udp" で送るバイナリフレームを受信し、
+シーケンス番号から欠落・順序入れ替わりを集計しながらファイルに保存する。
+保存ファイルはフレームを連結したもので、tools/telemetry_decode.py でデコードできる。
+
+使い方:
+    python tools/udp_receiver.py run.bin [--port 5005] [--jsonl run.jsonl]
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import telemetry_frame  # noqa: E402
+import telemetry_decode  # noqa: E402
+
+REPORT_INTERVAL_S = 2.0
+
+
+class SeqTracker:
+    """
+    16bitシーケンス番号による欠落の集計
+
+    期待値より先の番号が来たら間の数を欠落とし、後ろの番号（遅延到着）が
+    来たら欠落から1つ戻して reordered に数える。
+    """
+
+    def __init__(self):
+        self.expected = None
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+
+    def update(self, seq):
+        self.received += 1
+        if self.expected is None:
+            self.expected = (seq + 1) & 0xFFFF
+            return
+        delta = (seq - self.expected) & 0xFFFF
+        if delta < 0x8000:
+            self.lost += delta
+            self.expected = (seq + 1) & 0xFFFF
+        else:
+            self.reordered += 1
+            if self.lost > 0:
+                self.lost -= 1
+
+    @property
+    def loss_rate(self):
+        total = self.received + self.lost
+        return self.lost / total if total else 0.0
+
+
+def report(tracker, elapsed, final=False):
+    rate = tracker.received / elapsed if elapsed > 0 else 0.0
+    print("{}受信 {} | 欠落 {} ({:.2%}) | 入れ替わり {} | {:.0f} フレーム/秒".format(
+        "[最終] " if final else "",
+        tracker.received, tracker.lost, tracker.loss_rate, tracker.reordered, rate,
+    ), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDPテレメトリ受信機")
+    parser.add_argument("output", help="受信フレームの保存先（.bin）")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--jsonl", help="デコード結果をJSON Linesでも保存")
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((args.host, args.port))
+    sock.settimeout(0.5)
+
+    tracker = SeqTracker()
+    size = telemetry_frame.FRAME_SIZE
+    bad = 0
+    jsonl = open(args.jsonl, "w") if args.jsonl else None
+    print("受信待機中: {}:{} → {}".format(args.host, args.port, args.output))
+
+    start = time.monotonic()
+    last_report = start
+    with open(args.output, "ab") as out:
+        try:
+            while True:
+                try:
+                    data, _ = sock.recvfrom(2048)
+                except socket.timeout:
+                    data = b""
+                # 1データグラムに複数フレームが連結されていてもよい
+                if data and len(data) % size == 0:
+                    out.write(data)
+                    for offset in range(0, len(data), size):
+                        try:
+                            frame = telemetry_decode.decode(data, offset)
+                        except telemetry_decode.FrameError:
+                            bad += 1
+                            continue
+                        tracker.update(frame["seq"])
+                        if jsonl:
+                            jsonl.write(json.dumps(frame) + "\n")
+                elif data:
+                    bad += 1
+
+                now = time.monotonic()
+                if now - last_report >= REPORT_INTERVAL_S:
+                    last_report = now
+                    report(tracker, now - start)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if jsonl:
+                jsonl.close()
+            report(tracker, time.monotonic() - start, final=True)
+            if bad:
+                print("不正なデータグラム: {}".format(bad))
+
+
+if __name__ == "__main__":
+    main()